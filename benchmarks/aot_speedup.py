@@ -0,0 +1,47 @@
+"""Run time of the loops of benchmarks.vm_throughput in the virtual machine
+against the same TAC compiled ahead of time to a Python function, with and
+without optimizations, and the time to compile it.
+
+Usage: python -m benchmarks.aot_speedup [iterations]
+"""
+import gc
+import sys
+import time
+
+from benchmarks.vm_throughput import Compile, ForProgram, NestedProgram, NullOutput
+from compiler import optimizer
+from compiler.aot import CompiledProgram
+from compiler.vm import VirtualMachine
+
+
+def Best(run):
+    best = None
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        run(NullOutput())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+
+def Measure(name, instructions):
+    vmElapsed = Best(VirtualMachine(instructions).run)
+    start = time.perf_counter()
+    compiled = CompiledProgram(instructions)
+    compileElapsed = time.perf_counter() - start
+    aotElapsed = Best(compiled.run)
+    print(f'{name:>11} {len(instructions):>6} {vmElapsed:>8.3f} {compileElapsed * 1e3:>10.2f} '
+          f'{aotElapsed:>8.3f} {vmElapsed / aotElapsed:>8.1f}x')
+
+
+def Run():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f'{"program":>11} {"instr":>6} {"vm s":>8} {"compile ms":>10} {"aot s":>8} {"speedup":>9}')
+    for name, program in (('for', ForProgram(iterations)), ('nested', NestedProgram(iterations))):
+        Measure(name, Compile(program))
+        Measure(f'{name} -O', optimizer.optimize(Compile(program)))
+
+
+if __name__ == '__main__':
+    Run()
@@ -0,0 +1,74 @@
+"""Memory held by the AST, in bytes per node, for the compact slotted
+ASTNode against the previous dict based layout.
+
+Usage: python -m benchmarks.ast_memory [statements]
+"""
+import gc
+import sys
+import tracemalloc
+
+from compiler import parser as parserModule
+from compiler import walker
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+class LegacyASTNode:
+    """The AST node layout before slots: a __dict__ and a list per node."""
+
+    def __init__(self, type, children=None, variableType=None, variableValue=None,
+                 variableName=None, symbolTable=None, lineno=None):
+        self.type = type
+        if children:
+            self.children = children
+        else:
+            self.children = []
+        self.variableType = variableType
+        self.variableValue = variableValue
+        self.variableName = variableName
+        self.symbolTable = symbolTable
+        self.lineno = lineno
+
+
+def GenerateProgram(statements):
+    lines = ['int a = 1;', 'float b = 2.5;']
+    for i in range(statements):
+        lines.append(f'if (a < {i}) {{ a = a * 2 + {i}; }} else {{ print(b); }}')
+    return '\n'.join(lines)
+
+
+def Measure(program, nodeClass):
+    lines = program.splitlines()
+    tokens = Lexer().tokenize(program)
+    parser = Parser(lines)
+    original = parserModule.ASTNode
+    parserModule.ASTNode = nodeClass
+    try:
+        gc.collect()
+        tracemalloc.start()
+        root = parser.parseProgram(program, tokens)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    finally:
+        parserModule.ASTNode = original
+    nodes = 0
+
+    def count(node):
+        nonlocal nodes
+        nodes += 1
+
+    walker.walk(root, count)
+    return used, nodes
+
+
+def Run():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    program = GenerateProgram(statements)
+    for name, nodeClass in (('dict nodes', LegacyASTNode), ('slotted nodes', parserModule.ASTNode)):
+        used, nodes = Measure(program, nodeClass)
+        print(f'{name:14} {nodes:9} nodes {used / 1e6:8.2f} MB {used / nodes:7.1f} bytes/node')
+
+
+if __name__ == '__main__':
+    Run()
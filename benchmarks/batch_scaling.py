@@ -0,0 +1,52 @@
+"""Files per second of batch compilation of generated programs with an
+increasing number of worker processes, up to one per core.
+
+Usage: python -m benchmarks.batch_scaling [files]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from compiler import batch
+
+
+def Program(seed):
+    lines = [f'int s = {seed};']
+    for i in range(40):
+        lines.append(f'int v{i} = s * {i + 1} + {seed % 7};')
+        lines.append(f'if (v{i} > {i * 10}) {{\n    s = s + v{i} - {i};\n}}')
+    lines.append('for (int i = 0; i < 10; i = i + 1) {\n    s = s - i;\n}')
+    lines.append('print(s);')
+    return '\n'.join(lines)
+
+
+def Run():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    cores = os.cpu_count() or 1
+    jobs = [1]
+    while jobs[-1] * 2 <= cores:
+        jobs.append(jobs[-1] * 2)
+    if jobs[-1] != cores:
+        jobs.append(cores)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for seed in range(files):
+            path = os.path.join(directory, f'program{seed}.txt')
+            with open(path, 'w') as f:
+                f.write(Program(seed))
+            paths.append(path)
+        print(f'{files} files, {cores} cores')
+        print(f'{"jobs":>5} {"seconds":>8} {"files/s":>9} {"speedup":>8}')
+        base = None
+        for count in jobs:
+            start = time.perf_counter()
+            results = batch.compileBatch(paths, jobs=count)
+            elapsed = time.perf_counter() - start
+            assert all(result.ok for result in results)
+            base = base or elapsed
+            print(f'{count:>5} {elapsed:>8.2f} {files / elapsed:>9.1f} {base / elapsed:>7.2f}x')
+
+
+if __name__ == '__main__':
+    Run()
@@ -0,0 +1,49 @@
+"""Compile time of generated programs without the compile cache against
+misses that fill it, hits on its on-disk store from a new process and hits
+in memory.
+
+Usage: python -m benchmarks.cache_hits [files]
+"""
+import sys
+import tempfile
+import time
+
+from benchmarks.batch_scaling import Program
+from compiler import pipeline
+from compiler.cache import CompileCache
+
+
+def Measure(compile, sources):
+    start = time.perf_counter()
+    for source in sources:
+        compile(source)
+    return time.perf_counter() - start
+
+
+def Run():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sources = [Program(seed) for seed in range(files)]
+    pipeline.warmUp()
+    with tempfile.TemporaryDirectory() as directory:
+        filled = CompileCache(directory, memoryEntries=files)
+        # Only the memory tier of filled holds the entries, a new cache
+        # reads them back from disk.
+        fresh = CompileCache(directory, memoryEntries=files)
+        rows = [
+            ('uncached', lambda: Measure(pipeline.compileSource, sources)),
+            ('miss', lambda: Measure(filled.compile, sources)),
+            ('disk hit', lambda: Measure(fresh.compile, sources)),
+            ('memory hit', lambda: Measure(fresh.compile, sources)),
+        ]
+        print(f'{files} files')
+        print(f'{"case":<11} {"seconds":>8} {"ms/file":>8} {"speedup":>8}')
+        base = None
+        for name, measure in rows:
+            elapsed = measure()
+            base = base or elapsed
+            print(f'{name:<11} {elapsed:>8.3f} {elapsed / files * 1e3:>8.3f} {base / elapsed:>7.1f}x')
+        print(f'stats: {fresh.stats}')
+
+
+if __name__ == '__main__':
+    Run()
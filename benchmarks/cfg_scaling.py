@@ -0,0 +1,60 @@
+"""Time per instruction to build the control flow graph of a program and
+compute its reverse postorder, dominators and natural loops, from 1k to
+hundreds of thousands of instructions.
+
+Usage: python -m benchmarks.cfg_scaling [max_loops]
+"""
+import gc
+import sys
+import time
+
+from compiler.cfg import ControlFlowGraph
+from compiler.parser import Parser
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+
+
+def LoopProgram(loops):
+    # Loops holding an if/else, nested two levels every few loops.
+    lines = ['int a = 0;']
+    for i in range(loops):
+        lines.append('while (a < 1) {')
+        if i % 4 == 0:
+            lines.append('for (int i = 0; i < 2; i = i + 1) {')
+        lines.append('if (a == 0) {\na = 1;\n}\nelse {\na = 2;\n}')
+        if i % 4 == 0:
+            lines.append('}')
+        lines.append('}')
+    return '\n'.join(lines)
+
+
+def Compile(program):
+    lines = program.splitlines()
+    root = Parser(lines).parseProgram(program)
+    SemanticAnalyzer(root, lines).checkSemantics()
+    return TACProcessor(root).generateIR()
+
+
+def Run():
+    maxLoops = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f'{"instr":>8} {"blocks":>8} {"loops":>7} {"build s":>8} {"dom s":>8} '
+          f'{"loops s":>8} {"us/instr":>8}')
+    loops = 100
+    while loops <= maxLoops:
+        instructions = Compile(LoopProgram(loops))
+        gc.collect()
+        start = time.perf_counter()
+        cfg = ControlFlowGraph(instructions)
+        built = time.perf_counter()
+        cfg.immediateDominators()
+        dominated = time.perf_counter()
+        found = cfg.naturalLoops()
+        end = time.perf_counter()
+        print(f'{len(instructions):>8} {len(cfg.blocks):>8} {len(found):>7} '
+              f'{built - start:>8.3f} {dominated - built:>8.3f} {end - dominated:>8.3f} '
+              f'{(end - start) / len(instructions) * 1e6:>8.2f}')
+        loops *= 10
+
+
+if __name__ == '__main__':
+    Run()
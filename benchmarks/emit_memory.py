@@ -0,0 +1,57 @@
+"""Peak memory and time of writing the TAC of growing programs to a file,
+collecting every line in a list with its end of line appended against
+streaming them through the buffered emitter.
+
+Usage: python -m benchmarks.emit_memory [max_statements]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.program_scaling import FlatProgram
+from compiler import emit
+from compiler.ir import serialize
+from compiler.pipeline import compileSource
+
+
+def WriteList(path, instructions):
+    taclines = serialize(instructions)
+    for i in range(len(taclines)):
+        taclines[i] = taclines[i] + '\n'
+    with open(path, 'w') as f:
+        f.writelines(taclines)
+
+
+def WriteStream(path, instructions):
+    emit.writeLines(path, emit.instructionLines(instructions))
+
+
+def Measure(write, path, instructions):
+    tracemalloc.start()
+    start = time.perf_counter()
+    write(path, instructions)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def Run():
+    maxStatements = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f'{"statements":>10} {"instructions":>12} {"list MB":>8} {"stream MB":>9} {"list s":>7} {"stream s":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'program.output')
+        statements = 1000
+        while statements <= maxStatements:
+            instructions = compileSource(FlatProgram(statements))
+            listTime, listPeak = Measure(WriteList, path, instructions)
+            streamTime, streamPeak = Measure(WriteStream, path, instructions)
+            print(f'{statements:>10} {len(instructions):>12} {listPeak / 2**20:>8.2f} '
+                  f'{streamPeak / 2**20:>9.2f} {listTime:>7.3f} {streamTime:>8.3f}')
+            statements *= 10
+
+
+if __name__ == '__main__':
+    Run()
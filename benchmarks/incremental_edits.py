@@ -0,0 +1,86 @@
+"""Edit to output latency of the incremental compiler against a full
+rebuild, on a generated program with edits of a single line.
+
+Usage: python -m benchmarks.incremental_edits [lines]
+"""
+import sys
+import time
+
+from compiler import pipeline
+from compiler.incremental import IncrementalCompiler
+from compiler.ir import serialize
+
+
+def Chunk(k):
+    return [
+        f'int v{k} = {k % 97};',
+        f'int w{k} = v{k} * 2 + 1;',
+        f'if (w{k} > 50) {{',
+        f'    print(w{k} - v{k});',
+        '}',
+        f'total = total + w{k};',
+    ]
+
+
+def Program(lines):
+    program = ['int total = 0;']
+    k = 0
+    while len(program) < lines:
+        program.extend(Chunk(k))
+        k += 1
+    program.append('print(total);')
+    return program
+
+
+def Edits(program):
+    middle = len(program) // 2
+    # Start of the chunk around the middle.
+    chunk = 1 + (middle - 1) // 6 * 6
+    k = (chunk - 1) // 6
+    edits = []
+    changed = list(program)
+    changed[chunk + 3] = f'    print(w{k} + v{k});'
+    edits.append(('change a print', changed))
+    changed = list(program)
+    changed[chunk + 1] = f'int w{k} = v{k} * 2 + 1 * 1;'
+    edits.append(('add temporals', changed))
+    changed = list(program)
+    changed.insert(chunk, f'print({k});')
+    edits.append(('insert a line', changed))
+    changed = list(program)
+    del changed[chunk + 2:chunk + 5]
+    edits.append(('delete an if', changed))
+    changed = list(program)
+    changed[chunk] = f'int v{k} = {k % 97 + 1};'
+    # total carries the value to every chunk after it.
+    edits.append(('value flows', changed))
+    return edits
+
+
+def Run():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    program = Program(lines)
+    source = '\n'.join(program)
+    pipeline.warmUp()
+    compiler = IncrementalCompiler()
+    start = time.perf_counter()
+    compiler.compile(source)
+    print(f'{len(program)} lines, {len(compiler.units)} units, first build {time.perf_counter() - start:.2f} s')
+    print(f'{"edit":<16} {"full s":>8} {"incr ms":>9} {"units":>7} {"speedup":>9}')
+    for name, changed in Edits(program):
+        changedSource = '\n'.join(changed)
+        start = time.perf_counter()
+        expected = serialize(pipeline.compileSource(changedSource))
+        full = time.perf_counter() - start
+        # Every edit starts from the original program.
+        compiler.compile(source)
+        start = time.perf_counter()
+        output = serialize(compiler.compile(changedSource))
+        incremental = time.perf_counter() - start
+        assert output == expected
+        print(f'{name:<16} {full:>8.2f} {incremental * 1e3:>9.1f} {compiler.rebuilt:>7} '
+              f'{full / incremental:>8.1f}x')
+
+
+if __name__ == '__main__':
+    Run()
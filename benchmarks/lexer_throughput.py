@@ -0,0 +1,77 @@
+"""Tokens per second of the PLY lexer against the master regex scanner with
+its compact token buffer, lexing alone and lexing plus parsing, and the
+memory the tokens of each take.
+
+Usage: python -m benchmarks.lexer_throughput [statements]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+from compiler.scanner import Scanner
+
+
+def GenerateProgram(statements):
+    lines = ['int total = 0;', 'float scale = 1.5;', 'string name = "total";']
+    for i in range(statements):
+        if i % 4 == 0:
+            lines.append(f'if (total >= {i} and total != {i * 2}) {{')
+            lines.append(f'    total = total - {i} * 2;')
+            lines.append('} else {')
+            lines.append(f'    scale = scale * {i}.25;')
+            lines.append('}')
+        else:
+            lines.append(f'total = (total + {i}) ^ 2 / {i + 1};')
+    lines.append('print(total);')
+    return '\n'.join(lines)
+
+
+def Measure(function, repeat=3):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def PeakMemory(function):
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def Run():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    program = GenerateProgram(statements)
+    lines = program.splitlines()
+    tokens = len(Scanner().scan(program))
+    # Builds the lexer regexes and parse tables outside the measurements.
+    parserInstance = Parser(lines)
+    backends = [('ply', Lexer), ('regex', Scanner)]
+    print(f'program size: {len(program) / 1e6:.2f} MB, {tokens} tokens')
+    print(f'{"lexer":>6} {"lex (s)":>9} {"tokens/s":>12} {"lex+parse (s)":>14} {"memory (MB)":>12}')
+    results = {}
+    for name, lexerClass in backends:
+        lexSeconds = Measure(lambda: lexerClass().tokenize(program))
+        parseSeconds = Measure(lambda: parserInstance.parseStatements(
+            program, lexerClass().tokenize(program)))
+        memory = PeakMemory(lambda: lexerClass().tokenize(program))
+        results[name] = lexSeconds
+        print(f'{name:>6} {lexSeconds:9.3f} {tokens / lexSeconds:12,.0f} {parseSeconds:14.3f} '
+              f'{memory / 1e6:12.1f}')
+    print(f'lexing speedup: {results["ply"] / results["regex"]:.1f}x')
+
+
+if __name__ == '__main__':
+    Run()
@@ -0,0 +1,60 @@
+"""Front end time of the CLI pipeline when the program is lexed twice (one
+pass to find errors, one inside the parser) against a single token stream.
+
+Usage: python -m benchmarks.lexing_passes [statements]
+"""
+import gc
+import sys
+import time
+
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+def GenerateProgram(statements):
+    lines = ['int a = 1;']
+    for i in range(statements):
+        lines.append(f'a = a + {i} * 2;')
+    return '\n'.join(lines)
+
+
+def DoublePass(program, lines):
+    lexerInstance = Lexer()
+    lexer = lexerInstance.createLexer()
+    lexer.input(program)
+    while lexer.token():
+        pass
+    return Parser(lines).parseProgram(program)
+
+
+def SinglePass(program, lines):
+    tokens = Lexer().tokenize(program)
+    return Parser(lines).parseProgram(program, tokens)
+
+
+def Measure(pipeline, program, lines, repeat=3):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        pipeline(program, lines)
+        elapsed = time.perf_counter() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def Run():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    program = GenerateProgram(statements)
+    lines = program.splitlines()
+    before = Measure(DoublePass, program, lines)
+    after = Measure(SinglePass, program, lines)
+    print(f'program size: {len(program) / 1e6:.2f} MB')
+    print(f'lex + reparse: {before:8.3f} s')
+    print(f'single pass:   {after:8.3f} s')
+    print(f'saved:         {(before - after) / before * 100:8.1f} %')
+
+
+if __name__ == '__main__':
+    Run()
@@ -0,0 +1,81 @@
+"""Executed instructions and run time of hot loops in the virtual machine
+with the optimization pipeline with and without loop invariant code
+motion.
+
+Usage: python -m benchmarks.loop_invariants [iterations]
+"""
+import gc
+import sys
+import time
+
+from compiler import optimizer
+from compiler.parser import Parser
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+from compiler.vm import VirtualMachine
+
+
+class NullOutput:
+    def write(self, text):
+        pass
+
+
+def ForProgram(iterations):
+    return f'''int x = 3;
+int y = 4;
+int s = 0;
+for (int i = 0; i < {iterations}; i = i+1) {{
+    s = s + x * y + 3;
+    if (s > 1000) {{
+        s = s - (x + y) * 100;
+    }}
+}}
+print(s);'''
+
+
+def NestedProgram(iterations):
+    return f'''float scale = 2.5;
+int n = 10;
+float total = 0.0;
+int j = 0;
+while (j < {iterations // 10}) {{
+    for (int i = 0; i < n; i = i+1) {{
+        total = total + scale * n - (scale + 1.0) * i;
+    }}
+    j = j + 1;
+}}
+print(total);'''
+
+
+def Compile(program):
+    lines = program.splitlines()
+    root = Parser(lines).parseProgram(program)
+    SemanticAnalyzer(root, lines).checkSemantics()
+    return TACProcessor(root).generateIR()
+
+
+def Measure(instructions):
+    vm = VirtualMachine(instructions)
+    best = None
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        executed = vm.run(NullOutput())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return executed, best
+
+
+def Run():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    withoutLicm = [name for name in optimizer.PASSES if name != 'licm']
+    print(f'{"program":>8} {"executed":>10} {"run s":>8} {"licm exec":>10} {"licm s":>8} {"speedup":>8}')
+    for name, program in (('for', ForProgram(iterations)), ('nested', NestedProgram(iterations))):
+        executed, elapsed = Measure(optimizer.optimize(Compile(program), withoutLicm))
+        hoistedExecuted, hoistedElapsed = Measure(optimizer.optimize(Compile(program)))
+        print(f'{name:>8} {executed:>10} {elapsed:>8.3f} {hoistedExecuted:>10} '
+              f'{hoistedElapsed:>8.3f} {elapsed / hoistedElapsed:>7.2f}x')
+
+
+if __name__ == '__main__':
+    Run()
@@ -0,0 +1,73 @@
+"""Instructions removed from every program in examples/ by each
+optimization pass alone and by the whole pipeline, the hits of every
+peephole pattern in the whole pipeline and the temporals every program
+needs before and after reusing them.
+
+Usage: python -m benchmarks.optimization_report [examples_dir]
+"""
+import os
+import sys
+
+from compiler import liveness, optimizer
+from compiler.ir import Temp
+from compiler.parser import Parser
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+
+
+def Compile(program):
+    lines = program.splitlines()
+    root = Parser(lines).parseProgram(program)
+    SemanticAnalyzer(root, lines).checkSemantics()
+    return TACProcessor(root).generateIR()
+
+
+def Run():
+    examples = sys.argv[1] if len(sys.argv) > 1 else 'examples'
+    names = list(optimizer.PASSES) + ['all']
+    print(f'{"program":>16} {"instr":>6} ' +
+          ' '.join(f'{name:>9}' for name in names))
+    totals = [0] * (len(names) + 1)
+    peepholeHits = {}
+    tempRows = []
+    for fileName in sorted(os.listdir(examples)):
+        if not fileName.endswith('.txt'):
+            continue
+        with open(os.path.join(examples, fileName)) as f:
+            program = f.read()
+        counts = [len(Compile(program))]
+        for name in names[:-1]:
+            counts.append(
+                counts[0] - len(optimizer.optimize(Compile(program), [name])))
+        instructions = Compile(program)
+        for name, function in optimizer.PASSES.items():
+            if name == 'peephole':
+                peephole = optimizer.PeepholeOptimizer()
+                instructions = peephole.optimize(instructions)
+                for pattern, hits in peephole.hits.items():
+                    peepholeHits[pattern] = peepholeHits.get(pattern, 0) + hits
+            else:
+                instructions = function(instructions)
+        counts.append(counts[0] - len(instructions))
+        generated = Compile(program)
+        temps = set(instruction.dst for instruction in generated
+                    if isinstance(instruction.dst, Temp))
+        tempRows.append((fileName[:-4], len(temps), liveness.peakLiveTemps(generated),
+                         liveness.peakLiveTemps(optimizer.optimize(generated))))
+        totals = [total + count for total, count in zip(totals, counts)]
+        print(f'{fileName[:-4]:>16} {counts[0]:>6} ' +
+              ' '.join(f'{-count:>9}' for count in counts[1:]))
+    print(f'{"total":>16} {totals[0]:>6} ' +
+          ' '.join(f'{-count:>9}' for count in totals[1:]))
+    print()
+    print(f'{"peephole pattern":>16} {"hits":>6}')
+    for pattern, hits in peepholeHits.items():
+        print(f'{pattern:>16} {hits:>6}')
+    print()
+    print(f'{"program":>16} {"temps":>6} {"peak":>6} {"peak -O":>8}')
+    for name, temps, peak, optimizedPeak in tempRows:
+        print(f'{name:>16} {temps:>6} {peak:>6} {optimizedPeak:>8}')
+
+
+if __name__ == '__main__':
+    Run()
@@ -0,0 +1,48 @@
+"""Per-compile setup cost of the lexer and parser, with and without the
+shared table cache.
+
+Usage: python -m benchmarks.parser_setup [iterations]
+"""
+import sys
+import time
+
+import ply.lex as lex
+import ply.yacc as yacc
+
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+def UncachedSetup():
+    lex.lex(module=Lexer())
+    parser = Parser.__new__(Parser)
+    parser.tokens = Lexer.tokens
+    parser.start = 'program'
+    yacc.yacc(module=parser, debug=False, write_tables=False,
+              errorlog=yacc.NullLogger())
+
+
+def CachedSetup():
+    Parser([])
+
+
+def Measure(setup, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        setup()
+    return (time.perf_counter() - start) / iterations
+
+
+def Run():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    # Warm up so the cached numbers exclude the one-time table build.
+    CachedSetup()
+    before = Measure(UncachedSetup, max(1, iterations // 10))
+    after = Measure(CachedSetup, iterations)
+    print(f'uncached setup: {before * 1e6:10.1f} us/compile')
+    print(f'cached setup:   {after * 1e6:10.1f} us/compile')
+    print(f'speedup:        {before / after:10.1f}x')
+
+
+if __name__ == '__main__':
+    Run()
@@ -0,0 +1,53 @@
+"""Parse time of flat programs and long elif chains from 1k to 1M
+statements. Linear construction keeps the time per statement flat.
+
+Usage: python -m benchmarks.program_scaling [max_statements]
+"""
+import gc
+import sys
+import time
+
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+def FlatProgram(statements):
+    lines = ['int a = 0;']
+    for i in range(statements - 1):
+        lines.append(f'a = a + {i};')
+    return '\n'.join(lines)
+
+
+def ElifProgram(statements):
+    lines = ['int a = 0;', 'if (a == 0) {', 'a = 1;', '}']
+    for i in range(statements - 1):
+        lines.append(f'elif (a == {i}) {{')
+        lines.append('a = 1;')
+        lines.append('}')
+    return '\n'.join(lines)
+
+
+def Measure(program):
+    lines = program.splitlines()
+    tokens = Lexer().tokenize(program)
+    parser = Parser(lines)
+    gc.collect()
+    start = time.perf_counter()
+    parser.parseProgram(program, tokens)
+    return time.perf_counter() - start
+
+
+def Run():
+    maxStatements = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f'{"statements":>12} {"flat s":>10} {"us/stmt":>8} {"elif s":>10} {"us/elif":>8}')
+    statements = 1000
+    while statements <= maxStatements:
+        flat = Measure(FlatProgram(statements))
+        elif_ = Measure(ElifProgram(statements))
+        print(f'{statements:>12} {flat:>10.3f} {flat / statements * 1e6:>8.2f} '
+              f'{elif_:>10.3f} {elif_ / statements * 1e6:>8.2f}')
+        statements *= 10
+
+
+if __name__ == '__main__':
+    Run()
@@ -0,0 +1,71 @@
+"""Latency of compiling the programs in examples/ through a warm compile
+server on a Unix socket against cold `python -m compiler` runs.
+
+Usage: python -m benchmarks.server_latency [requests]
+"""
+import glob
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from compiler.server import CompileClient
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+# Every cold run starts an interpreter, a few are enough.
+COLD_RUNS = 5
+
+
+def WaitForSocket(path, process):
+    while not os.path.exists(path):
+        if process.poll() != None:
+            raise RuntimeError('The compile server exited')
+        time.sleep(0.01)
+
+
+def Run():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.txt'))):
+            paths.append(shutil.copy(path, directory))
+        socketPath = os.path.join(directory, 'compiler.sock')
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-m', 'compiler', '--serve', socketPath],
+                                   stdout=subprocess.DEVNULL)
+        try:
+            WaitForSocket(socketPath, process)
+            startup = time.perf_counter() - start
+            print(f'server startup {startup * 1e3:.1f} ms')
+            print(f'{"program":>16} {"cold ms":>9} {"warm ms":>9} {"p95 ms":>8} {"speedup":>8}')
+            with CompileClient(socketPath) as client:
+                for path in paths:
+                    cold = []
+                    for _ in range(COLD_RUNS):
+                        start = time.perf_counter()
+                        subprocess.run([sys.executable, '-m', 'compiler', path],
+                                       stdout=subprocess.DEVNULL, check=False)
+                        cold.append(time.perf_counter() - start)
+                    with open(path) as f:
+                        source = f.read()
+                    warm = []
+                    for _ in range(requests):
+                        start = time.perf_counter()
+                        client.compile(source)
+                        warm.append(time.perf_counter() - start)
+                    warm.sort()
+                    coldMedian = statistics.median(cold)
+                    warmMedian = statistics.median(warm)
+                    name = os.path.splitext(os.path.basename(path))[0]
+                    print(f'{name:>16} {coldMedian * 1e3:>9.1f} {warmMedian * 1e3:>9.3f} '
+                          f'{warm[int(len(warm) * 0.95)] * 1e3:>8.3f} {coldMedian / warmMedian:>7.0f}x')
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    Run()
@@ -0,0 +1,76 @@
+"""Instructions per second of the virtual machine on loops shaped like
+examples/test_for.txt, and the cost of loading a program.
+
+Usage: python -m benchmarks.vm_throughput [iterations]
+"""
+import gc
+import sys
+import time
+
+from compiler.parser import Parser
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+from compiler.vm import VirtualMachine
+
+
+class NullOutput:
+    def write(self, text):
+        pass
+
+
+def ForProgram(iterations):
+    return f'''int s = 0;
+for (int i = 0; i < {iterations}; i = i+1) {{
+    int a = 5;
+    s = s + a * i;
+    if (s > 100) {{
+        s = s - 100;
+    }}
+}}
+print(s);'''
+
+
+def NestedProgram(iterations):
+    return f'''float total = 0.0;
+int j = 0;
+while (j < {iterations // 100}) {{
+    for (int i = 0; i < 100; i = i+1) {{
+        total = total + i / 2.0;
+    }}
+    j = j + 1;
+}}
+print(total);'''
+
+
+def Compile(program):
+    lines = program.splitlines()
+    root = Parser(lines).parseProgram(program)
+    SemanticAnalyzer(root, lines).checkSemantics()
+    return TACProcessor(root).generateIR()
+
+
+def Measure(name, program):
+    instructions = Compile(program)
+    start = time.perf_counter()
+    vm = VirtualMachine(instructions)
+    load = time.perf_counter() - start
+    best = None
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        executed = vm.run(NullOutput())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    print(f'{name:>8} {len(instructions):>6} {load * 1e6:>9.1f} {executed:>10} '
+          f'{best:>8.3f} {executed / best / 1e6:>8.2f}')
+
+
+def Run():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f'{"program":>8} {"instr":>6} {"load us":>9} {"executed":>10} {"run s":>8} {"Minstr/s":>8}')
+    Measure('for', ForProgram(iterations))
+    Measure('nested', NestedProgram(iterations))
+
+
+if __name__ == '__main__':
+    Run()
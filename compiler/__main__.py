@@ -1,78 +1,262 @@
 import argparse
 import sys
 import os
-from compiler.lexer import Lexer
+import time
+from compiler import batch, emit, server, walker, watch
+from compiler.aot import CompiledProgram
+from compiler.cache import CompileCache
+from compiler.ir import serialize
 
 from compiler.logger import Logger
+from compiler.optimizer import optimize
 from compiler.parser import Parser, ParserError
+from compiler.pipeline import LEXERS, lexerErrorMessage
 from compiler.semantics import SemanticAnalyzer, SemanticError
 from compiler.tac import TACProcessor
+from compiler.vm import VirtualMachine, VMError
 
 
-def PrintAST(logger, current, depth):
-    spaces = '\t'*depth
-    logger.LogDebug(f'{spaces}-{current.type.name}')
-    if current.variableType != None:
-        logger.LogDebug(f'{spaces}| Type: {current.variableType}')
-    if current.variableName != None:
-        logger.LogDebug(f'{spaces}| Name: {current.variableName}')
-    if current.variableValue != None:
-        logger.LogDebug(f'{spaces}| Value: {current.variableValue}')
-    for c in current.children:
-        PrintAST(logger, c, depth+1)
+def PrintAST(logger, root, depth):
+    def enter(current):
+        nonlocal depth
+        spaces = '\t'*depth
+        logger.LogDebug(f'{spaces}-{current.type.name}')
+        if current.variableType != None:
+            logger.LogDebug(f'{spaces}| Type: {current.variableType}')
+        if current.variableName != None:
+            logger.LogDebug(f'{spaces}| Name: {current.variableName}')
+        if current.variableValue != None:
+            logger.LogDebug(f'{spaces}| Value: {current.variableValue}')
+        depth += 1
 
+    def leave(current):
+        nonlocal depth
+        depth -= 1
 
-def PrintSymbolTable(logger, current, depth):
-    spaces = '\t'*depth
-    logger.LogDebug(f'{spaces}-{current.table}')
-    for c in current.children:
-        PrintSymbolTable(logger, c, depth+1)
+    walker.walk(root, enter, leave)
+
+
+def PrintSymbolTable(logger, root, depth):
+    def enter(current):
+        nonlocal depth
+        spaces = '\t'*depth
+        logger.LogDebug(f'{spaces}-{current.table}')
+        depth += 1
+
+    def leave(current):
+        nonlocal depth
+        depth -= 1
+
+    walker.walk(root, enter, leave)
+
+
+def Emit(logger, args, output, taclines, instructions):
+    if (args.run or args.aot):
+        logger.LogSuccess('Successfully compiled!')
+        try:
+            if (args.aot):
+                compiledProgram = CompiledProgram(instructions)
+                if (args.verbose):
+                    logger.LogDebug(compiledProgram.source)
+                compiledProgram.run()
+            else:
+                VirtualMachine(instructions).run()
+        except VMError as e:
+            logger.LogError(str(e))
+            sys.exit(1)
+        return
+    if (args.tacprint):
+        tacBanner = '=' * 10
+        logger.LogDebug(f'{tacBanner} TAC {tacBanner}')
+        i = 1
+        for line in (taclines if taclines != None else serialize(instructions)):
+            logger.LogDebug(f'{i})\t{line}')
+            i += 1
+    else:
+        try:
+            # Lines are formatted as they are written, the text of the
+            # whole program is never held.
+            emit.writeLines(output, taclines if taclines != None else emit.instructionLines(instructions))
+        except OSError:
+            logger.LogError('Error ocurred when writing the file')
+            sys.exit(1)
+        if output == emit.STANDARD_STREAM:
+            return
+    logger.LogSuccess('Successfully compiled!')
+
+
+def RunBatch(logger, args):
+    paths = batch.expandPaths(args.file_path)
+    start = time.perf_counter()
+    results = batch.compileBatch(paths, args.optimize, args.jobs, args.cache, LEXERS[args.lexer])
+    elapsed = time.perf_counter() - start
+    failed = 0
+    for result in results:
+        line = f'{result.seconds * 1e3:>9.1f} ms  {result.path}'
+        if result.ok:
+            logger.LogSuccess(f'OK     {line} ({result.instructions} instructions)')
+        else:
+            failed += 1
+            logger.LogError(f'{line}\n{result.message}')
+    rate = len(results) / elapsed if elapsed > 0 else 0.0
+    summary = f'{len(results)} files, {len(results) - failed} compiled, {failed} failed ' \
+        f'in {elapsed:.2f} s ({rate:.1f} files/s)'
+    if args.cache:
+        hits = sum(1 for result in results if result.cached)
+        summary += f', cache {hits} hits {len(results) - hits} misses'
+    if failed:
+        logger.LogError(summary)
+        sys.exit(1)
+    logger.LogSuccess(summary)
+
+
+def RunWatch(logger, args):
+    watcher = watch.Watcher(args.file_path, args.optimize)
+
+    def report(results, seconds):
+        failed = 0
+        for result in results:
+            line = f'{result.seconds * 1e3:>9.1f} ms  {result.path}'
+            if result.ok:
+                logger.LogSuccess(f'OK     {line} ({result.instructions} instructions)')
+            else:
+                failed += 1
+                logger.LogError(f'{line}\n{result.message}')
+        logger.LogSuccess(f'[{time.strftime("%H:%M:%S")}] Rebuilt {len(results)} files, '
+                          f'{failed} failed, in {seconds * 1e3:.1f} ms')
+
+    logger.LogSuccess(f'Watching {", ".join(args.file_path)}, press Ctrl+C to stop')
+    try:
+        watcher.run(report)
+    except KeyboardInterrupt:
+        pass
+
+
+def RunClient(logger, args):
+    # Same output as compiling in process, without paying for startup.
+    try:
+        with server.CompileClient(args.connect) as client:
+            for file_path in batch.expandPaths(args.file_path):
+                with open(file_path, 'r') as f:
+                    response = client.compile(f.read(), args.optimize)
+                if not response['ok']:
+                    logger.LogError(f'{file_path}: {response["error"]}')
+                    sys.exit(1)
+                emit.writeLines(batch.outputPath(file_path), response['tac'])
+    except (EOFError, BrokenPipeError, ConnectionResetError):
+        logger.LogError(f'Compile server at {args.connect}: connection closed')
+        sys.exit(1)
+    except (OSError, server.ProtocolError) as e:
+        logger.LogError(f'Compile server at {args.connect}: {e}')
+        sys.exit(1)
+    logger.LogSuccess('Successfully compiled!')
 
 
 def Run():
     # Parse arguments
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "file_path", help="Location of the file to compile, relative to current location.")
+        "file_path", nargs='*',
+        help="Location of the file to compile, relative to current location, - for stdin. "
+             "Batch mode takes many paths, glob patterns and @manifest files.")
     parser.add_argument(
         "-v", "--verbose", help="Add output prints to show debug elements.", action="store_true")
     parser.add_argument(
         "-tac", "--tacprint", help="Outputs the TAC as a print instead of a file.", action="store_true")
+    parser.add_argument(
+        "-o", "--output", help="Writes the TAC to this file instead of the .output file next to the source, "
+                               "- for stdout (the default for stdin).")
+    parser.add_argument(
+        "-O", "--optimize", help="Optimizes the TAC before writing or running it.", action="store_true")
+    parser.add_argument(
+        "--run", help="Runs the compiled program instead of writing the TAC file.", action="store_true")
+    parser.add_argument(
+        "--aot", help="Runs the program compiled ahead of time to a Python function instead of the VM.", action="store_true")
+    parser.add_argument(
+        "--batch", help="Compiles every file given in parallel and prints a summary, "
+                        "implied by several paths.", action="store_true")
+    parser.add_argument(
+        "-j", "--jobs", help="Processes used by batch mode, one per core by default.", type=int)
+    parser.add_argument(
+        "--serve", metavar="SOCKET", help="Runs a compile server on a Unix socket until SIGINT or SIGTERM.")
+    parser.add_argument(
+        "--connect", metavar="SOCKET", help="Compiles the files through the compile server on a Unix socket.")
+    parser.add_argument(
+        "--watch", help="Recompiles the files, and the source files in the directories, every time they change.",
+        action="store_true")
+    parser.add_argument(
+        "--cache", metavar="DIR", help="Reuses the compilations of unchanged sources stored in DIR.")
+    parser.add_argument(
+        "--lexer", help="Lexer backend, regex is a hand written one faster than the PLY lexer.",
+        choices=sorted(LEXERS), default='ply')
     args = parser.parse_args()
-    file_path = args.file_path
 
     # Create logger
     logger = Logger(args.verbose)
 
+    if args.serve:
+        logger.LogSuccess(f'Serving compile requests on {args.serve}')
+        try:
+            server.serve(args.serve, CompileCache(args.cache) if args.cache else None, LEXERS[args.lexer])
+        except OSError as e:
+            logger.LogError(f'Compile server at {args.serve}: {e}')
+            sys.exit(1)
+        return
+    if not args.file_path:
+        parser.error('the following arguments are required: file_path')
+    if (args.connect or args.watch) and args.lexer != 'ply':
+        # The server picks the lexer of --connect, watch mode only has an
+        # incremental compiler for the PLY tokens.
+        parser.error('--lexer is not supported with --connect or --watch')
+    if args.connect:
+        RunClient(logger, args)
+        return
+    if args.watch:
+        RunWatch(logger, args)
+        return
+
+    if args.batch or len(args.file_path) > 1:
+        RunBatch(logger, args)
+        return
+    file_path = args.file_path[0]
+    output = args.output
+    if output == None:
+        output = emit.STANDARD_STREAM if file_path == emit.STANDARD_STREAM else batch.outputPath(file_path)
+    if output == emit.STANDARD_STREAM and not (args.run or args.aot or args.tacprint):
+        # Nothing but the TAC goes down the pipe, diagnostics and debug
+        # output included.
+        logger.stream = sys.stderr
+
     # Open file
-    if not os.path.isfile(file_path):
+    if file_path != emit.STANDARD_STREAM and not os.path.isfile(file_path):
         logger.LogError(f'{file_path} does not exist or is not a file.')
         sys.exit(1)
     try:
-        f = open(file_path, 'r')
-        program = f.read()
+        program = emit.readSource(file_path)
         lines = program.splitlines()
-        f.close()
     except FileNotFoundError:
         logger.LogError(f'{file_path} could not be opened!')
         sys.exit(1)
 
-    lexerInstance = Lexer()
-    lexer = lexerInstance.createLexer()
-    lexer.input(program)
-    while True:
-        tok = lexer.token()
-        if lexerInstance.n_errors != 0:
-            errorMessage = f'Invalid token \'{lexerInstance.errorToken}\' at line {lexerInstance.errorLine}'
-            errorLine = lines[lexerInstance.errorLine]
-            logger.LogError(f'{errorMessage}:\n\t{errorLine}')
+    if args.cache and not args.verbose:
+        # Hits skip the front end, verbose output needs the AST.
+        cache = CompileCache(args.cache, keepIR=args.run or args.aot)
+        entry = cache.compile(program, args.optimize, LEXERS[args.lexer])
+        if entry.error != None:
+            logger.LogError(entry.error)
             sys.exit(1)
-        if not tok:
-            break
+        Emit(logger, args, output, entry.tac, entry.instructions)
+        return
+
+    lexerInstance = LEXERS[args.lexer]()
+    tokens = lexerInstance.tokenize(program)
+    if lexerInstance.n_errors != 0:
+        logger.LogError(lexerErrorMessage(lexerInstance, lines))
+        sys.exit(1)
 
     parserInstance = Parser(lines)
     try:
-        root = parserInstance.parseProgram(program)
+        root = parserInstance.parseProgram(program, tokens)
         if (args.verbose):
             PrintAST(logger, root, 0)
             logger.LogDebug('Symbol Tables:')
@@ -85,28 +269,10 @@ def Run():
             logger.LogDebug('Symbol Tables after semantics:')
             PrintSymbolTable(logger, parserInstance.symbolTable, 0)
         tacProcessor = TACProcessor(root)
-        taclines = tacProcessor.generateTAC()
-        if (args.tacprint):
-            tacBanner = '=' * 10
-            logger.LogDebug(f'{tacBanner} TAC {tacBanner}')
-            i = 1
-            for line in taclines:
-                logger.LogDebug(f'{i})\t{line}')
-                i += 1
-        else:
-            try:
-                filename = file_path.split('.')[0]
-                f = open(f'{filename}.output', 'w')
-                # We add the end of line first so the writelines functions
-                # handle end of line character for us based on the OS.
-                for i in range(len(taclines)):
-                    taclines[i] = taclines[i] + '\n'
-                f.writelines(taclines)
-                f.close()
-            except:
-                logger.LogError('Error ocurred when writing the file')
-                sys.exit(1)
-        logger.LogSuccess('Successfully compiled!')
+        instructions = tacProcessor.generateIR()
+        if (args.optimize):
+            instructions = optimize(instructions)
+        Emit(logger, args, output, None, instructions)
     except ParserError:
         logger.LogError(parserInstance.first_error)
     except SemanticError:
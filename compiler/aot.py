@@ -0,0 +1,322 @@
+import math
+import operator
+import sys
+from typing import List, TextIO
+from compiler import ir, operators
+from compiler.cfg import ControlFlowGraph
+from compiler.ir import Constant, Instruction, Opcode, Temp
+from compiler.parser import VariableTypes
+from compiler.vm import VMError
+
+
+# Python operator of the evaluators that behave like it, operations whose
+# rule evaluates with anything else call the evaluator.
+INLINE_OPERATORS = {
+    operator.add: '+',
+    operator.sub: '-',
+    operator.mul: '*',
+    operator.truediv: '/',
+    pow: '**',
+    operator.eq: '==',
+    operator.ne: '!=',
+    operator.ge: '>=',
+    operator.le: '<=',
+    operator.gt: '>',
+    operator.lt: '<',
+}
+# and/or of two bools, the evaluators only differ from Python on numbers.
+BOOL_OPERATORS = {
+    Opcode.AND: 'and',
+    Opcode.OR: 'or',
+}
+UNARY_FORMATS = {
+    Opcode.NEG: '-{0}',
+    Opcode.NOT: 'not {0}',
+    Opcode.TO_FLOAT: 'toFloat({0})',
+}
+# Opcodes that do nothing at run time.
+NO_OPS = frozenset([Opcode.DECLARE, Opcode.LABEL])
+# Name of the function in the generated source.
+FUNCTION_NAME = 'program'
+
+
+class _Unstructured(Exception):
+    """Control flow that does not nest as while loops."""
+
+
+class CompiledProgram:
+    """TAC lowered ahead of time to a single Python function.
+
+    Variables and temporals become locals of the function, so running does
+    no register indexing or instruction dispatch. Natural loops become
+    while loops: jumps to their header continue and jumps right after them
+    break. Forward jumps (the branches of an if) set a counter of the loop
+    body, and the blocks they skip are guarded by it. Programs whose
+    control flow does not nest like that, or nests deeper than Python
+    allows, run in a single dispatch loop over the basic blocks instead.
+
+    Values, printed text and errors are the same as the VirtualMachine's.
+    """
+
+    def __init__(self, instructions: List[Instruction]) -> None:
+        self.instructions = instructions
+        self.structured = True
+        try:
+            self._compile(structured=True)
+        except (_Unstructured, SyntaxError, RecursionError, MemoryError):
+            self.structured = False
+            self._compile(structured=False)
+
+    def _compile(self, structured: bool) -> None:
+        self.names = {}
+        self.temps = 0
+        self.variables = []
+        self.helpers = {}
+        self.types = {}
+        self.lines = []
+        self.pcCount = 0
+        self.cfg = ControlFlowGraph(self.instructions)
+        self._findRealPositions()
+        if structured:
+            self._emitScope(self._buildLoopTree(), 1, False)
+        else:
+            self._emitDispatch()
+        names = list(self.names.values())
+        parameters = ['write'] + [f'{name}={name}' for name in self.helpers]
+        header = [f'def {FUNCTION_NAME}({", ".join(parameters)}):']
+        for start in range(0, len(names), 100):
+            header.append('    ' + ' = '.join(names[start:start + 100]) + ' = None')
+        result = ', '.join(f'{variable!r}: {self.names[variable]}' for variable in self.variables)
+        self.source = '\n'.join(header + self.lines + [f'    return {{{result}}}', ''])
+        namespace = dict(self.helpers)
+        exec(compile(self.source, f'<{FUNCTION_NAME}>', 'exec'), namespace)
+        self.function = namespace[FUNCTION_NAME]
+
+    def _findRealPositions(self) -> None:
+        # Position of the first instruction doing something at or after
+        # every position, jumps to the same one go to the same place.
+        instructions = self.instructions
+        real = [len(instructions)] * (len(instructions) + 1)
+        for i in range(len(instructions) - 1, -1, -1):
+            real[i] = real[i + 1] if instructions[i].opcode in NO_OPS else i
+        self.real = real
+
+    def _buildLoopTree(self):
+        """Loops as (first block, last block, children) ranges nested in a
+        root range covering the program."""
+        blocks = self.cfg.blocks
+        ranges = []
+        for loop in self.cfg.naturalLoops():
+            first = loop.header.index
+            last = max(loop.blocks)
+            if min(loop.blocks) != first or len(loop.blocks) != last - first + 1:
+                raise _Unstructured()
+            ranges.append((first, last))
+        root = (0, len(blocks) - 1, [])
+        stack = [root]
+        for first, last in sorted(ranges, key=lambda r: (r[0], -r[1])):
+            while stack[-1] is not root and stack[-1][1] < first:
+                stack.pop()
+            if last > stack[-1][1]:
+                raise _Unstructured()
+            node = (first, last, [])
+            stack[-1][2].append(node)
+            stack.append(node)
+        return root
+
+    def _emit(self, indent: int, line: str) -> None:
+        self.lines.append('    ' * indent + line)
+
+    def _newCounter(self) -> str:
+        self.pcCount += 1
+        return f'pc{self.pcCount - 1}'
+
+    def _emitScope(self, node, indent: int, isLoop: bool) -> None:
+        """Emits the blocks of a range, a loop range inside while True."""
+        first, last, children = node
+        blocks = self.cfg.blocks
+        if isLoop:
+            self._emit(indent, 'while True:')
+            indent += 1
+        # Units of the scope: its blocks and the loops nested right in it.
+        units = []
+        childAt = {child[0]: child for child in children}
+        index = first
+        while index <= last:
+            child = childAt.get(index)
+            if child != None:
+                units.append(child)
+                index = child[1] + 1
+            else:
+                units.append(index)
+                index += 1
+        ordinals = {}
+        for ordinal, unit in enumerate(units):
+            start = blocks[unit if isinstance(unit, int) else unit[0]].start
+            ordinals.setdefault(self.real[start], ordinal)
+        start = self.real[blocks[first].start] if blocks else 0
+        end = self.real[blocks[last].end] if blocks else 0
+        if not isLoop:
+            ordinals.setdefault(end, len(units))
+        # Action of the jump ending every block unit, forward jumps give the
+        # ordinal of the unit they go to.
+        actions = {}
+        # Forward jumps starting minus ending at every ordinal.
+        crossed = [0] * (len(units) + 1)
+        for ordinal, unit in enumerate(units):
+            if not isinstance(unit, int):
+                continue
+            instruction = self.instructions[blocks[unit].end - 1]
+            if instruction.opcode not in ir.JUMP_OPS:
+                continue
+            target = self.real[self.cfg.labelBlocks[instruction.dst].start]
+            if isLoop and target == start:
+                actions[unit] = 'continue'
+            elif isLoop and target == end:
+                actions[unit] = 'break'
+            elif ordinals.get(target, -1) > ordinal:
+                actions[unit] = ordinals[target]
+                crossed[ordinal + 1] += 1
+                crossed[ordinals[target]] -= 1
+            else:
+                raise _Unstructured()
+        counter = self._newCounter() if any(crossed) else None
+        if counter != None:
+            self._emit(indent, f'{counter} = 0')
+        pending = 0
+        for ordinal, unit in enumerate(units):
+            pending += crossed[ordinal]
+            bodyIndent = indent
+            if pending:
+                self._emit(indent, f'if {counter} <= {ordinal}:')
+                bodyIndent += 1
+            size = len(self.lines)
+            if isinstance(unit, int):
+                self._emitBlock(blocks[unit], bodyIndent, actions.get(unit), counter)
+            else:
+                self._emitScope(unit, bodyIndent, True)
+            if pending and len(self.lines) == size:
+                self._emit(bodyIndent, 'pass')
+        if isLoop and self.lines[-1] != '    ' * indent + 'continue':
+            self._emit(indent, 'break')
+
+    def _emitDispatch(self) -> None:
+        """Every block guarded by the block counter in one while loop, jumps
+        set the counter and restart the loop."""
+        blocks = self.cfg.blocks
+        self._emit(1, 'pc = 0')
+        self._emit(1, 'while True:')
+        for block in blocks:
+            self._emit(2, f'if pc <= {block.index}:')
+            size = len(self.lines)
+            instruction = self.instructions[block.end - 1]
+            action = None
+            if instruction.opcode in ir.JUMP_OPS:
+                action = ('goto', self.cfg.labelBlocks[instruction.dst].index)
+            self._emitBlock(block, 3, action, 'pc')
+            if len(self.lines) == size:
+                self._emit(3, 'pass')
+        self._emit(2, 'break')
+
+    def _emitBlock(self, block, indent: int, action, counter: str) -> None:
+        for i in range(block.start, block.end):
+            instruction = self.instructions[i]
+            opcode = instruction.opcode
+            if opcode == Opcode.DECLARE:
+                self.types[instruction.dst] = instruction.type
+            elif opcode in ir.JUMP_OPS:
+                self._emitJump(instruction, indent, action, counter)
+            elif opcode == Opcode.PRINT:
+                left = instruction.left
+                if isinstance(left, Constant):
+                    text = f'{left.value}\n'
+                    self._emit(indent, f'write({text!r})')
+                else:
+                    self._emit(indent, f"write(f'{{{self._operand(left)}}}\\n')")
+            elif opcode in ir.VALUE_OPS:
+                self._emit(indent, f'{self._operand(instruction.dst)} = {self._expression(instruction)}')
+                self.types[instruction.dst] = instruction.type
+
+    def _emitJump(self, instruction: Instruction, indent: int, action, counter: str) -> None:
+        if isinstance(action, tuple):
+            statements = [f'{counter} = {action[1]}', 'continue']
+        elif isinstance(action, int):
+            statements = [f'{counter} = {action}']
+        else:
+            statements = [action]
+        if instruction.opcode == Opcode.GOTO:
+            for statement in statements:
+                self._emit(indent, statement)
+            return
+        condition = self._operand(instruction.left)
+        if instruction.opcode == Opcode.IFNOT:
+            condition = f'not {condition}'
+        self._emit(indent, f'if {condition}:')
+        for statement in statements:
+            self._emit(indent + 1, statement)
+
+    def _expression(self, instruction: Instruction) -> str:
+        opcode = instruction.opcode
+        left = self._operand(instruction.left)
+        if opcode == Opcode.COPY:
+            return left
+        if opcode in UNARY_FORMATS:
+            if opcode == Opcode.TO_FLOAT:
+                self.helpers['toFloat'] = float
+            return UNARY_FORMATS[opcode].format(left)
+        right = self._operand(instruction.right)
+        leftType = self._getType(instruction.left)
+        rightType = self._getType(instruction.right)
+        rule = operators.lookup(ir.BINARY_OPERATIONS[opcode], leftType, rightType)
+        if rule == None:
+            raise VMError(f'No operation for {ir.formatInstruction(instruction)}')
+        if rule.evaluate in INLINE_OPERATORS:
+            return f'{left} {INLINE_OPERATORS[rule.evaluate]} {right}'
+        if opcode in BOOL_OPERATORS and leftType == rightType == VariableTypes.BOOL:
+            return f'{left} {BOOL_OPERATORS[opcode]} {right}'
+        return f'{self._helper(rule.evaluate)}({left}, {right})'
+
+    def _getType(self, operand) -> VariableTypes:
+        if isinstance(operand, Constant):
+            return operand.type
+        return self.types.get(operand)
+
+    def _helper(self, value) -> str:
+        for name, helper in self.helpers.items():
+            if helper is value:
+                return name
+        name = f'f{len(self.helpers)}'
+        self.helpers[name] = value
+        return name
+
+    def _operand(self, operand) -> str:
+        if isinstance(operand, Constant):
+            value = operand.value
+            if isinstance(value, float) and not math.isfinite(value):
+                return self._helper(value)
+            text = repr(value)
+            return f'({text})' if text.startswith('-') else text
+        name = self.names.get(operand)
+        if name == None:
+            if isinstance(operand, Temp):
+                name = f't{self.temps}'
+                self.temps += 1
+            else:
+                name = f'v_{operand}'
+                self.variables.append(operand)
+            self.names[operand] = name
+        return name
+
+    def run(self, output: TextIO = None) -> None:
+        """Runs the program, print writes a line to output (stdout by
+        default)."""
+        write = (output if output != None else sys.stdout).write
+        try:
+            self.values = self.function(write)
+        # ValueError: ints too long to print.
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise VMError(f'Compiled program failed: {e}') from e
+
+    def getValue(self, name: str):
+        """Value of a variable after run."""
+        return self.values[name]
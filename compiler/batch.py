@@ -0,0 +1,133 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+from compiler import emit, pipeline
+from compiler.cache import CompileCache
+from compiler.lexer import Lexer
+
+# Characters that make a path argument a glob pattern.
+GLOB_CHARACTERS = frozenset('*?[')
+# Cache of the worker process, set by _initWorker.
+_workerCache = None
+
+
+class FileResult:
+    """Outcome of compiling one file of a batch."""
+    __slots__ = ('path', 'ok', 'message', 'seconds', 'instructions', 'cached')
+
+    def __init__(self, path: str, ok: bool, message: str = '', seconds: float = 0.0,
+                 instructions: int = 0, cached: bool = False) -> None:
+        self.path = path
+        self.ok = ok
+        # Compile error of a failed file.
+        self.message = message
+        self.seconds = seconds
+        # Number of TAC instructions written.
+        self.instructions = instructions
+        # Taken from the compile cache.
+        self.cached = cached
+
+    def __repr__(self) -> str:
+        return f'FileResult({self.path!r}, {self.ok})'
+
+
+def _readManifest(path: str) -> List[str]:
+    with open(path, 'r') as f:
+        entries = [line.strip() for line in f]
+    # Entries are relative to the manifest, blank lines and # comments are
+    # skipped.
+    directory = os.path.dirname(path)
+    return [os.path.join(directory, entry) for entry in entries
+            if entry and not entry.startswith('#')]
+
+
+def expandPaths(arguments: List[str]) -> List[str]:
+    """Files named by the arguments: paths, glob patterns (** included)
+    and @manifest files listing more of them. Duplicates are dropped and
+    the order of the arguments is kept."""
+    paths = []
+    seen = set()
+    pending = list(reversed(arguments))
+    while pending:
+        argument = pending.pop()
+        if argument.startswith('@'):
+            pending.extend(reversed(_readManifest(argument[1:])))
+            continue
+        if GLOB_CHARACTERS.intersection(argument):
+            matches = sorted(glob.glob(argument, recursive=True))
+        else:
+            matches = [argument]
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def outputPath(path: str) -> str:
+    return f'{os.path.splitext(path)[0]}.output'
+
+
+def compileFile(path: str, optimized: bool = False, cache: CompileCache = None,
+                lexerClass: type = Lexer) -> FileResult:
+    """Compiles one file into its .output file, failures are returned
+    instead of raised so the batch keeps going."""
+    start = time.perf_counter()
+    cached = False
+    try:
+        with open(path, 'r') as f:
+            program = f.read()
+        if cache != None:
+            entry, cached = cache.lookup(program, optimized, lexerClass)
+            if entry.error != None:
+                raise pipeline.CompileError(entry.error)
+            taclines = entry.tac
+        else:
+            taclines = emit.instructionLines(pipeline.compileSource(program, optimized, lexerClass))
+        count = emit.writeLines(outputPath(path), taclines)
+    except pipeline.CompileError as e:
+        return FileResult(path, False, str(e), time.perf_counter() - start, cached=cached)
+    except Exception as e:
+        return FileResult(path, False, f'{type(e).__name__}: {e}', time.perf_counter() - start)
+    return FileResult(path, True, seconds=time.perf_counter() - start,
+                      instructions=count, cached=cached)
+
+
+def _initWorker(cacheDirectory: str) -> None:
+    global _workerCache
+    pipeline.warmUp()
+    _workerCache = CompileCache(cacheDirectory) if cacheDirectory != None else None
+
+
+def _compileChunk(paths: List[str], optimized: bool, lexerClass: type) -> List[FileResult]:
+    return [compileFile(path, optimized, _workerCache, lexerClass) for path in paths]
+
+
+def compileBatch(paths: List[str], optimized: bool = False, jobs: int = None,
+                 cacheDirectory: str = None, lexerClass: type = Lexer) -> List[FileResult]:
+    """Compiles every file on a pool of jobs processes (one per core by
+    default), results are in the order of paths.
+
+    Every worker builds the lexer and the parse tables once when it starts.
+    Files are sent in chunks, several per worker, so the pool spends its
+    time compiling rather than passing messages. With a cacheDirectory the
+    workers share a CompileCache on disk. Files are lexed by lexerClass.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    jobs = min(jobs, len(paths))
+    if jobs <= 1:
+        # In process, the worker globals are left alone.
+        pipeline.warmUp()
+        cache = CompileCache(cacheDirectory) if cacheDirectory != None else None
+        return [compileFile(path, optimized, cache, lexerClass) for path in paths]
+    chunkSize = max(1, min(64, len(paths) // (jobs * 4)))
+    chunks = [paths[i:i + chunkSize] for i in range(0, len(paths), chunkSize)]
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_initWorker,
+                             initargs=(cacheDirectory,)) as executor:
+        for chunk in executor.map(_compileChunk, chunks, [optimized] * len(chunks),
+                                  [lexerClass] * len(chunks)):
+            results.extend(chunk)
+    return results
@@ -0,0 +1,196 @@
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+from compiler import pipeline
+from compiler.ir import Instruction, serialize
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+_compilerVersion = None
+
+
+def compilerVersion() -> str:
+    """Hash of the compiler modules, any change to the compiler gives new
+    cache keys."""
+    global _compilerVersion
+    if _compilerVersion == None:
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(directory, '*.py'))):
+            if os.path.basename(path).startswith('test_'):
+                continue
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _compilerVersion = digest.hexdigest()
+    return _compilerVersion
+
+
+class CacheEntry:
+    """Result of compiling one source: its TAC lines, or the diagnostic of
+    an invalid program, and the IR when it was kept."""
+    __slots__ = ('tac', 'error', 'instructions')
+
+    def __init__(self, tac: List[str] = None, error: str = None,
+                 instructions: List[Instruction] = None) -> None:
+        self.tac = tac
+        self.error = error
+        self.instructions = instructions
+
+
+class CompileCache:
+    """Two tier content addressed cache of compilations.
+
+    Entries are keyed by a hash of the source, the compiler version, the
+    lexer and grammar signatures and the options. The most recently used
+    ones stay in memory, all of them are pickled under directory (when
+    given) and the least recently used files are removed once they take
+    more than maxBytes. Only point directory to a place other users cannot
+    write, the entries are unpickled.
+
+    Hits skip the whole front end. Every counter of stats is kept per
+    instance and is safe to update from several threads.
+    """
+
+    def __init__(self, directory: str = None, memoryEntries: int = 256,
+                 maxBytes: int = 64 * 1024 * 1024, keepIR: bool = False) -> None:
+        self.directory = directory
+        self.memoryEntries = memoryEntries
+        self.maxBytes = maxBytes
+        # Entries also hold the instructions, needed to run them.
+        self.keepIR = keepIR
+        self.memory = OrderedDict()
+        self.stats = dict.fromkeys(
+            ('hits', 'misses', 'memoryHits', 'diskHits', 'evictions'), 0)
+        self.lock = threading.Lock()
+        self.diskBytes = None
+        self.prefix = hashlib.sha256(' '.join(
+            (compilerVersion(), Lexer.specSignature(), Parser.grammarSignature())).encode()).digest()
+        if directory != None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, source: str, optimized: bool = False) -> str:
+        digest = hashlib.sha256(self.prefix)
+        digest.update(b'O' if optimized else b'-')
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.entry')
+
+    def _count(self, *names: str) -> None:
+        with self.lock:
+            for name in names:
+                self.stats[name] += 1
+
+    def get(self, key: str) -> CacheEntry:
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry != None:
+                self.memory.move_to_end(key)
+        if entry != None and self._isComplete(entry):
+            self._count('hits', 'memoryHits')
+            return entry
+        if self.directory != None:
+            entry = self._load(key)
+            if entry != None and self._isComplete(entry):
+                self._remember(key, entry)
+                self._count('hits', 'diskHits')
+                return entry
+        self._count('misses')
+        return None
+
+    def _isComplete(self, entry: CacheEntry) -> bool:
+        return not self.keepIR or entry.error != None or entry.instructions != None
+
+    def _load(self, key: str) -> CacheEntry:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            # The modification time orders the files for eviction.
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        return entry if isinstance(entry, CacheEntry) else None
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        with self.lock:
+            self.memory[key] = entry
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memoryEntries:
+                self.memory.popitem(last=False)
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        self._remember(key, entry)
+        if self.directory == None:
+            return
+        # Written aside and renamed, readers never see half an entry.
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(temporary)
+            os.replace(temporary, self._path(key))
+        except OSError:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            return
+        with self.lock:
+            if self.diskBytes != None:
+                self.diskBytes += size
+        self._evict()
+
+    def _diskUsage(self) -> list:
+        files = []
+        with os.scandir(self.directory) as entries:
+            for item in entries:
+                if item.name.endswith('.entry'):
+                    stat = item.stat()
+                    files.append((stat.st_mtime, stat.st_size, item.path))
+        return files
+
+    def _evict(self) -> None:
+        with self.lock:
+            if self.diskBytes != None and self.diskBytes <= self.maxBytes:
+                return
+            files = self._diskUsage()
+            total = sum(size for _, size, _ in files)
+            if total > self.maxBytes:
+                # Down to 90% so the next writes do not scan again.
+                for _, size, path in sorted(files):
+                    if total <= self.maxBytes * 0.9:
+                        break
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    self.stats['evictions'] += 1
+            self.diskBytes = total
+
+    def compile(self, source: str, optimized: bool = False, lexerClass: type = Lexer) -> CacheEntry:
+        """Entry of a source, compiled only when it is not cached."""
+        return self.lookup(source, optimized, lexerClass)[0]
+
+    def lookup(self, source: str, optimized: bool = False,
+               lexerClass: type = Lexer) -> Tuple[CacheEntry, bool]:
+        """Entry of a source and whether it was cached. Every lexer backend
+        gives the same tokens, entries are shared by them."""
+        key = self.key(source, optimized)
+        entry = self.get(key)
+        if entry != None:
+            return entry, True
+        try:
+            instructions = pipeline.compileSource(source, optimized, lexerClass)
+        except pipeline.CompileError as e:
+            entry = CacheEntry(error=str(e))
+        else:
+            entry = CacheEntry(serialize(instructions),
+                               instructions=instructions if self.keepIR else None)
+        self.put(key, entry)
+        return entry, False
@@ -0,0 +1,207 @@
+from typing import List
+from compiler import ir
+from compiler.ir import Instruction, Opcode
+
+
+class BasicBlock:
+    """Instructions start to end (exclusive) of the program, only the first
+    one can be a LABEL and only the last one a jump."""
+    __slots__ = ('index', 'start', 'end', 'successors', 'predecessors')
+
+    def __init__(self, index: int, start: int, end: int) -> None:
+        self.index = index
+        self.start = start
+        self.end = end
+        self.successors = []
+        self.predecessors = []
+
+    def __repr__(self) -> str:
+        return f'BasicBlock({self.index}, {self.start}:{self.end})'
+
+
+class Loop:
+    """Natural loop, the blocks dominated by header that reach one of the
+    latches (the sources of the back edges) without leaving through it."""
+    __slots__ = ('header', 'latches', 'blocks')
+
+    def __init__(self, header: BasicBlock) -> None:
+        self.header = header
+        self.latches = []
+        # Indexes of the blocks of the loop, header included.
+        self.blocks = set([header.index])
+
+    def __repr__(self) -> str:
+        return f'Loop({self.header.index}, {sorted(self.blocks)})'
+
+
+class ControlFlowGraph:
+    """Basic blocks of a TAC program with their dominators and loops.
+
+    Every analysis runs without recursion in time linear in the size of
+    the program (dominators converge in a couple of passes over the
+    reverse postorder of structured code), so it scales to programs with
+    hundreds of thousands of instructions.
+    """
+
+    def __init__(self, instructions: List[Instruction]) -> None:
+        self.instructions = instructions
+        self.blocks = []
+        self.entry = None
+        self._rpo = None
+        self._idom = None
+        self._treeNumbers = None
+        self._buildBlocks()
+
+    def _buildBlocks(self) -> None:
+        instructions = self.instructions
+        leaders = [0] if instructions else []
+        for i, instruction in enumerate(instructions):
+            if instruction.opcode == Opcode.LABEL and i != 0 and leaders[-1] != i:
+                leaders.append(i)
+            elif instruction.opcode in ir.JUMP_OPS and i + 1 < len(instructions):
+                leaders.append(i + 1)
+        labelBlocks = {}
+        for index, start in enumerate(leaders):
+            end = leaders[index + 1] if index + 1 < len(leaders) else len(instructions)
+            block = BasicBlock(index, start, end)
+            self.blocks.append(block)
+            if instructions[start].opcode == Opcode.LABEL:
+                labelBlocks[instructions[start].dst] = block
+        for block in self.blocks:
+            last = instructions[block.end - 1]
+            targets = []
+            if last.opcode != Opcode.GOTO and block.index + 1 < len(self.blocks):
+                targets.append(self.blocks[block.index + 1])
+            if last.opcode in ir.JUMP_OPS:
+                target = labelBlocks[last.dst]
+                if target not in targets:
+                    targets.append(target)
+            for target in targets:
+                block.successors.append(target)
+                target.predecessors.append(block)
+        self.labelBlocks = labelBlocks
+        if self.blocks:
+            self.entry = self.blocks[0]
+
+    def blockInstructions(self, block: BasicBlock) -> List[Instruction]:
+        return self.instructions[block.start:block.end]
+
+    def reversePostorder(self) -> List[BasicBlock]:
+        """Blocks reachable from the entry, each one before its successors
+        except along back edges."""
+        if self._rpo != None:
+            return self._rpo
+        order = []
+        if self.entry != None:
+            visited = [False] * len(self.blocks)
+            visited[self.entry.index] = True
+            stack = [(self.entry, iter(self.entry.successors))]
+            while stack:
+                block, successors = stack[-1]
+                for successor in successors:
+                    if not visited[successor.index]:
+                        visited[successor.index] = True
+                        stack.append((successor, iter(successor.successors)))
+                        break
+                else:
+                    stack.pop()
+                    order.append(block)
+        order.reverse()
+        self._rpo = order
+        return order
+
+    def immediateDominators(self) -> list:
+        """Immediate dominator of every block by index, the entry has itself
+        and unreachable blocks None (Cooper, Harvey and Kennedy)."""
+        if self._idom != None:
+            return self._idom
+        order = self.reversePostorder()
+        rpoNumber = [None] * len(self.blocks)
+        for number, block in enumerate(order):
+            rpoNumber[block.index] = number
+        idom = [None] * len(self.blocks)
+        if order:
+            idom[order[0].index] = order[0].index
+        changed = True
+        while changed:
+            changed = False
+            for block in order[1:]:
+                newIdom = None
+                for predecessor in block.predecessors:
+                    p = predecessor.index
+                    if idom[p] == None:
+                        continue
+                    if newIdom == None:
+                        newIdom = p
+                        continue
+                    # Intersect the two dominator chains.
+                    a, b = p, newIdom
+                    while a != b:
+                        while rpoNumber[a] > rpoNumber[b]:
+                            a = idom[a]
+                        while rpoNumber[b] > rpoNumber[a]:
+                            b = idom[b]
+                    newIdom = a
+                if idom[block.index] != newIdom:
+                    idom[block.index] = newIdom
+                    changed = True
+        self._idom = idom
+        return idom
+
+    def _numberDominatorTree(self) -> list:
+        # Preorder entry and exit numbers of the dominator tree, a block
+        # dominates another when its interval contains the other's.
+        idom = self.immediateDominators()
+        children = [[] for _ in self.blocks]
+        for index, parent in enumerate(idom):
+            if parent != None and parent != index:
+                children[parent].append(index)
+        numbers = [None] * len(self.blocks)
+        if self.entry == None:
+            return numbers
+        counter = 0
+        stack = [(self.entry.index, False)]
+        while stack:
+            index, done = stack.pop()
+            if done:
+                numbers[index] = (numbers[index], counter)
+                counter += 1
+                continue
+            numbers[index] = counter
+            counter += 1
+            stack.append((index, True))
+            for child in children[index]:
+                stack.append((child, False))
+        return numbers
+
+    def dominates(self, dominator: BasicBlock, block: BasicBlock) -> bool:
+        if self._treeNumbers == None:
+            self._treeNumbers = self._numberDominatorTree()
+        outer = self._treeNumbers[dominator.index]
+        inner = self._treeNumbers[block.index]
+        if outer == None or inner == None:
+            return False
+        return outer[0] <= inner[0] and inner[1] <= outer[1]
+
+    def naturalLoops(self) -> List[Loop]:
+        """Natural loops ordered by header, back edges sharing a header
+        form one loop. Inner loops are listed apart from the loops
+        containing them."""
+        idom = self.immediateDominators()
+        loops = {}
+        for block in self.reversePostorder():
+            for successor in block.successors:
+                if not self.dominates(successor, block):
+                    continue
+                loop = loops.get(successor.index)
+                if loop == None:
+                    loop = loops[successor.index] = Loop(successor)
+                loop.latches.append(block)
+                pending = [block]
+                while pending:
+                    current = pending.pop()
+                    if current.index in loop.blocks or idom[current.index] == None:
+                        continue
+                    loop.blocks.add(current.index)
+                    pending.extend(current.predecessors)
+        return [loops[index] for index in sorted(loops)]
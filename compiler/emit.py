@@ -0,0 +1,69 @@
+import contextlib
+import os
+import secrets
+import sys
+from typing import Iterable, Iterator, List, TextIO
+from compiler.ir import Instruction, formatInstruction
+
+# Path that stands for stdin as input and stdout as output.
+STANDARD_STREAM = '-'
+# Bytes buffered before the output file is written to.
+BUFFER_SIZE = 1 << 20
+
+
+def readSource(path: str) -> str:
+    if path == STANDARD_STREAM:
+        return sys.stdin.read()
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def instructionLines(instructions: List[Instruction]) -> Iterator[str]:
+    """Text lines of the program formatted one at a time, serialize
+    without the list."""
+    return map(formatInstruction, instructions)
+
+
+def _createTemporary(path: str) -> str:
+    directory, name = os.path.split(path)
+    while True:
+        temporary = os.path.join(directory, f'.{name}.{secrets.token_hex(4)}.tmp')
+        try:
+            # Created like open would, with the permissions the umask allows.
+            os.close(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        except FileExistsError:
+            continue
+        return temporary
+
+
+@contextlib.contextmanager
+def openOutput(path: str) -> Iterator[TextIO]:
+    """Text stream to path, or stdout for -.
+
+    Files are written aside and renamed over path when the block ends
+    without an exception, readers see the previous file or the whole new
+    one and an error leaves no partial output behind.
+    """
+    if path == STANDARD_STREAM:
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    temporary = _createTemporary(path)
+    try:
+        with open(temporary, 'w', buffering=BUFFER_SIZE) as f:
+            yield f
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def writeLines(path: str, lines: Iterable[str]) -> int:
+    """Streams lines to path (see openOutput), returns how many."""
+    count = 0
+    with openOutput(path) as f:
+        for line in lines:
+            # Text mode writes the end of line of the OS.
+            f.write(line + '\n')
+            count += 1
+    return count
@@ -0,0 +1,333 @@
+from typing import Dict, List
+from compiler import pipeline, walker
+from compiler.ir import Instruction, Label, Temp
+from compiler.lexer import Lexer, LexerTypes
+from compiler.optimizer import optimize
+from compiler.parser import ASTNode, ASTTypes, Parser, ParserError, SymbolTable, Variable
+from compiler.semantics import SemanticAnalyzer, SemanticError
+from compiler.tac import TACProcessor
+
+# Tokens that continue an if statement after its closing brace.
+_IF_CONTINUATIONS = frozenset([LexerTypes.ELIF.name, LexerTypes.ELSE.name])
+
+
+class _Rebuild(Exception):
+    """The edit cannot be applied to the previous compilation."""
+
+
+class _Unit:
+    """Top level statements on a run of lines no other statement shares,
+    the granularity of recompilation."""
+    __slots__ = ('start', 'end', 'names', 'effects', 'instructions',
+                 'temps', 'labels', 'tempBase', 'labelBase')
+
+    def __init__(self, start: int, end: int) -> None:
+        # First and last line, numbered from 1.
+        self.start = start
+        self.end = end
+        # Every variable name the statements mention.
+        self.names = None
+        # Name -> (type, value) of the global variables they mention, as
+        # the semantic pass leaves them.
+        self.effects = None
+        self.instructions = None
+        # Temporals and labels of the instructions, numbered from
+        # tempBase and labelBase.
+        self.temps = None
+        self.labels = None
+        self.tempBase = 0
+        self.labelBase = 0
+
+    def renumber(self, tempBase: int, labelBase: int) -> None:
+        if tempBase != self.tempBase:
+            for temp in self.temps:
+                temp.index += tempBase - self.tempBase
+            self.tempBase = tempBase
+        if labelBase != self.labelBase:
+            for label in self.labels:
+                label.index += labelBase - self.labelBase
+            self.labelBase = labelBase
+
+
+def _statementGroups(tokens: list) -> List[List[int]]:
+    """[first line, last line, statements] of every run of top level
+    statements sharing lines."""
+    groups = []
+    braces = parens = 0
+    start = None
+    for i, tok in enumerate(tokens):
+        if start == None:
+            start = tok.lineno
+        kind = tok.type
+        if kind == '(':
+            parens += 1
+        elif kind == ')':
+            parens -= 1
+        elif kind == '{':
+            braces += 1
+        elif kind == '}':
+            braces -= 1
+        if braces != 0 or parens != 0:
+            continue
+        if kind == LexerTypes.SENTENCE_END.name or (
+                kind == '}' and (i + 1 == len(tokens) or tokens[i + 1].type not in _IF_CONTINUATIONS)):
+            if groups and groups[-1][1] >= start:
+                groups[-1][1] = tok.lineno
+                groups[-1][2] += 1
+            else:
+                groups.append([start, tok.lineno, 1])
+            start = None
+    return groups
+
+
+def _sameEffect(a, b) -> bool:
+    if a == None or b == None:
+        return a == b
+    # repr tells 0.0 from -0.0 and True from 1.
+    return a[0] == b[0] and repr(a[1]) == repr(b[1])
+
+
+def _numbered(instructions: List[Instruction], kind: type) -> list:
+    found = {}
+    for instruction in instructions:
+        for operand in (instruction.dst, instruction.left, instruction.right):
+            if isinstance(operand, kind):
+                found[id(operand)] = operand
+    return list(found.values())
+
+
+class IncrementalCompiler:
+    """Recompiles a program after edits reusing the previous compilation.
+
+    The program is split into units, runs of top level statements on
+    lines of their own. An edit is located by the lines the old and new
+    source have in common at both ends, only the units it touches (and the
+    one before, which may be an if the edit adds branches to) are lexed
+    and parsed again. The semantic pass tracks the values of variables, so
+    a unit after the edit is checked again only when it mentions a global
+    variable whose type or value at that point changed, and that stops as
+    soon as no change is left. The TAC of the other units is kept, shifting
+    the numbers of their temporals and labels when the units before them
+    use a different amount, so the output always matches a full compile.
+
+    Edits that do not split into whole statements and invalid programs fall
+    back to a full compile, which gives the usual diagnostic. The state of
+    the last valid program is kept, the next edit is diffed against it.
+    """
+
+    def __init__(self, optimized: bool = False) -> None:
+        self.optimized = optimized
+        self.lines = None
+        self.units = None
+        self.parser = Parser([])
+        # Units lexed, parsed and checked again by the last compile.
+        self.rebuilt = 0
+
+    def compile(self, source: str) -> List[Instruction]:
+        """TAC of source, raises CompileError like pipeline.compileSource.
+        The temporals and labels of the instructions are numbered again by
+        the next compile, serialize them before."""
+        lines = source.splitlines()
+        units = None
+        if self.units != None:
+            try:
+                units = self._update(lines)
+            except _Rebuild:
+                # Raises the diagnostic of invalid programs before paying
+                # for a build unit by unit.
+                pipeline.compileSource(source)
+        if units == None:
+            try:
+                units = self._build(source, lines)
+            except _Rebuild:
+                instructions = pipeline.compileSource(source)
+                # Not split into statements, the next edit compiles it all.
+                self.lines = self.units = None
+                self.rebuilt = 1
+                return optimize(instructions) if self.optimized else instructions
+        self.lines = lines
+        self.units = units
+        instructions = [instruction for unit in units for instruction in unit.instructions]
+        if self.optimized:
+            instructions = optimize(instructions)
+        return instructions
+
+    def _build(self, source: str, lines: List[str]) -> List['_Unit']:
+        lexerInstance = Lexer()
+        tokens = lexerInstance.tokenize(source)
+        if lexerInstance.n_errors != 0 or len(tokens) == 0:
+            raise _Rebuild()
+        units = self._parseUnits(source, tokens, lines, {})
+        self._renumber(units, 0)
+        self.rebuilt = len(units)
+        return units
+
+    def _parseUnits(self, text: str, tokens, lines: List[str], env: Dict[str, tuple]) -> List['_Unit']:
+        """Parses and checks text, lines of the program, into units."""
+        self.parser.proglines = lines
+        try:
+            statements = self.parser.parseStatements(text, tokens).children
+        except ParserError:
+            raise _Rebuild()
+        groups = _statementGroups(tokens.tokens)
+        if sum(group[2] for group in groups) != len(statements):
+            raise _Rebuild()
+        units = []
+        position = 0
+        for start, end, count in groups:
+            unit = _Unit(start, end)
+            self._check(unit, statements[position:position + count], lines, env)
+            env.update(unit.effects)
+            units.append(unit)
+            position += count
+        return units
+
+    def _check(self, unit: '_Unit', statements: List[ASTNode], lines: List[str], env: Dict[str, tuple]) -> None:
+        """Symbol table, semantic and TAC passes of the statements of a
+        unit, with env holding the global variables before it."""
+        names = set()
+
+        def collect(node):
+            if node.variableName != None:
+                names.add(node.variableName)
+
+        for statement in statements:
+            walker.walk(statement, collect)
+        # Only the variables the unit mentions are needed to check it.
+        globalTable = SymbolTable({}, None)
+        for name in names:
+            if name in env:
+                variable = Variable(env[name][0], None)
+                variable.value = env[name][1]
+                globalTable.slots.append(variable)
+                globalTable.table[name] = variable
+        root = ASTNode(ASTTypes.BLOCK, list(statements), symbolTable=globalTable)
+        try:
+            self.parser.bindStatements(root)
+            SemanticAnalyzer(root, lines).checkSemantics()
+        except (ParserError, SemanticError):
+            raise _Rebuild()
+        unit.names = frozenset(names)
+        unit.effects = {name: (variable.type, variable.value)
+                        for name, variable in globalTable.table.items()}
+        unit.instructions = TACProcessor(root).generateIR()
+        unit.temps = _numbered(unit.instructions, Temp)
+        unit.labels = _numbered(unit.instructions, Label)
+        unit.tempBase = 0
+        unit.labelBase = 0
+
+    def _reparse(self, unit: '_Unit', lines: List[str], env: Dict[str, tuple]) -> None:
+        text = '\n'.join(lines[unit.start - 1:unit.end])
+        lexerInstance = Lexer()
+        tokens = lexerInstance.tokenize(text, unit.start)
+        self.parser.proglines = lines
+        try:
+            statements = self.parser.parseStatements(text, tokens).children
+        except ParserError:
+            raise _Rebuild()
+        self._check(unit, statements, lines, env)
+
+    def _update(self, lines: List[str]) -> List['_Unit']:
+        old = self.lines
+        units = self.units
+        shortest = min(len(old), len(lines))
+        prefix = 0
+        while prefix < shortest and old[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < shortest - prefix and old[-1 - suffix] == lines[-1 - suffix]:
+            suffix += 1
+        first = prefix + 1
+        oldLast = len(old) - suffix
+        newLast = len(lines) - suffix
+        delta = len(lines) - len(old)
+        if first > oldLast and first > newLast:
+            self.rebuilt = 0
+            return units
+
+        # Units touching the changed lines, and the one before them.
+        low = _firstUnit(units, lambda unit: unit.end >= first)
+        high = _firstUnit(units, lambda unit: unit.start > oldLast)
+        low = max(0, low - 1)
+        start = first
+        end = oldLast
+        if high > low:
+            start = min(start, units[low].start)
+            end = max(end, units[high - 1].end)
+
+        env = {}
+        for unit in units[:low]:
+            env.update(unit.effects)
+        text = '\n'.join(lines[start - 1:end + delta])
+        lexerInstance = Lexer()
+        tokens = lexerInstance.tokenize(text, start)
+        if lexerInstance.n_errors != 0:
+            raise _Rebuild()
+        replaced = self._parseUnits(text, tokens, lines, env) if len(tokens) else []
+        rebuilt = len(replaced)
+
+        # Variables whose type or value after the edit changed.
+        oldEffects = {}
+        for unit in units[low:high]:
+            oldEffects.update(unit.effects)
+        newEffects = {}
+        for unit in replaced:
+            newEffects.update(unit.effects)
+        changed = {name for name in oldEffects.keys() | newEffects.keys()
+                   if not _sameEffect(oldEffects.get(name), newEffects.get(name))}
+        # The units of the last valid program are left untouched until
+        # nothing can fail, the ones checked again are replaced.
+        rest = units[high:]
+        kept = []
+        for i, unit in enumerate(rest):
+            if not changed:
+                kept.extend(rest[i:])
+                break
+            if unit.names.isdisjoint(changed):
+                env.update(unit.effects)
+                kept.append(unit)
+                continue
+            fresh = _Unit(unit.start + delta, unit.end + delta)
+            self._reparse(fresh, lines, env)
+            rebuilt += 1
+            for name in unit.effects.keys() | fresh.effects.keys():
+                if _sameEffect(unit.effects.get(name), fresh.effects.get(name)):
+                    changed.discard(name)
+                else:
+                    changed.add(name)
+            env.update(fresh.effects)
+            rest[i] = fresh
+        units = units[:low] + replaced + rest
+        if not units:
+            # Empty programs are invalid.
+            raise _Rebuild()
+        for unit in kept:
+            unit.start += delta
+            unit.end += delta
+        self._renumber(units, low)
+        self.rebuilt = rebuilt
+        return units
+
+    def _renumber(self, units: List['_Unit'], position: int) -> None:
+        tempBase = labelBase = 0
+        if position > 0:
+            previous = units[position - 1]
+            tempBase = previous.tempBase + len(previous.temps)
+            labelBase = previous.labelBase + len(previous.labels)
+        for unit in units[position:]:
+            unit.renumber(tempBase, labelBase)
+            tempBase += len(unit.temps)
+            labelBase += len(unit.labels)
+
+
+def _firstUnit(units: List['_Unit'], isAfter) -> int:
+    """Index of the first unit isAfter holds for, it must hold for every
+    unit after it."""
+    low, high = 0, len(units)
+    while low < high:
+        middle = (low + high) // 2
+        if isAfter(units[middle]):
+            high = middle
+        else:
+            low = middle + 1
+    return low
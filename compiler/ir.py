@@ -0,0 +1,178 @@
+from enum import Enum
+from typing import List
+from compiler import operators
+from compiler.parser import ASTTypes, VariableTypes
+
+
+class Opcode(Enum):
+    DECLARE = 0
+    COPY = 1
+    ADD = 2
+    SUB = 3
+    MUL = 4
+    DIV = 5
+    POW = 6
+    EQ = 7
+    NE = 8
+    GE = 9
+    LE = 10
+    GT = 11
+    LT = 12
+    AND = 13
+    OR = 14
+    NEG = 15
+    NOT = 16
+    TO_FLOAT = 17
+    PRINT = 18
+    LABEL = 19
+    GOTO = 20
+    IFGOTO = 21
+    IFNOT = 22
+
+
+# Opcode of every binary operation of the AST.
+BINARY_OPCODES = {
+    ASTTypes.SUM: Opcode.ADD,
+    ASTTypes.SUBSTRACT: Opcode.SUB,
+    ASTTypes.MULTIPLICATION: Opcode.MUL,
+    ASTTypes.DIVISION: Opcode.DIV,
+    ASTTypes.EXPONENT: Opcode.POW,
+    ASTTypes.CMP_EQUAL: Opcode.EQ,
+    ASTTypes.CMP_NOT_EQUAL: Opcode.NE,
+    ASTTypes.CMP_GREATER_EQUAL: Opcode.GE,
+    ASTTypes.CMP_LESS_EQUAL: Opcode.LE,
+    ASTTypes.CMP_GREATER: Opcode.GT,
+    ASTTypes.CMP_LESS: Opcode.LT,
+    ASTTypes.AND_OP: Opcode.AND,
+    ASTTypes.OR_OP: Opcode.OR,
+}
+# AST operation of every binary opcode, used to reach operators.RULES.
+BINARY_OPERATIONS = {opcode: opType for opType, opcode in BINARY_OPCODES.items()}
+BINARY_OPS = frozenset(BINARY_OPCODES.values())
+# Opcodes that write a value into dst.
+VALUE_OPS = BINARY_OPS | {Opcode.COPY, Opcode.NEG, Opcode.NOT, Opcode.TO_FLOAT}
+# Opcodes whose dst is a Label.
+JUMP_OPS = frozenset([Opcode.GOTO, Opcode.IFGOTO, Opcode.IFNOT])
+# Jumps taken depending on their left operand.
+CONDITIONAL_JUMP_OPS = frozenset([Opcode.IFGOTO, Opcode.IFNOT])
+
+
+class Temp:
+    """Temporal value of the TAC, printed as t<index>.
+
+    The index can be set after the temporal is used, the generator numbers
+    temporals in the order the text output always did even when it emits
+    their instructions in another order.
+    """
+    __slots__ = ('index',)
+
+    def __init__(self, index: int = None) -> None:
+        self.index = index
+
+    def __str__(self) -> str:
+        return f't{self.index}'
+
+    def __repr__(self) -> str:
+        return f'Temp({self.index})'
+
+
+class Label:
+    """Jump target of the TAC, printed as L<index>. Numbered like Temp."""
+    __slots__ = ('index',)
+
+    def __init__(self, index: int = None) -> None:
+        self.index = index
+
+    def __str__(self) -> str:
+        return f'L{self.index}'
+
+    def __repr__(self) -> str:
+        return f'Label({self.index})'
+
+
+class Constant:
+    """Literal operand with its language type."""
+    __slots__ = ('value', 'type')
+
+    def __init__(self, value, type: VariableTypes) -> None:
+        self.value = value
+        self.type = type
+
+    def __eq__(self, other) -> bool:
+        # The python type is compared too so True, 1 and 1.0 stay apart,
+        # and the text so 0.0 and -0.0 do.
+        return isinstance(other, Constant) and self.type == other.type and \
+            type(self.value) == type(other.value) and self.value == other.value and \
+            str(self.value) == str(other.value)
+
+    def __hash__(self) -> int:
+        return hash((self.type, self.value))
+
+    def __str__(self) -> str:
+        if self.type == VariableTypes.STRING:
+            return f'"{self.value}"'
+        return f'{self.value}'
+
+    def __repr__(self) -> str:
+        return f'Constant({self.value!r}, {self.type.name})'
+
+
+class Instruction:
+    """One TAC instruction.
+
+    Operands are variable names (str), Temp or Constant. dst is the
+    variable or Temp written by the instruction, or the Label of LABEL,
+    GOTO, IFGOTO and IFNOT (jumps when left is false). type is the
+    VariableTypes of the written value, or of the declared variable for
+    DECLARE.
+    """
+    __slots__ = ('opcode', 'dst', 'left', 'right', 'type')
+
+    def __init__(self, opcode: Opcode, dst=None, left=None, right=None, type: VariableTypes = None) -> None:
+        self.opcode = opcode
+        self.dst = dst
+        self.left = left
+        self.right = right
+        self.type = type
+
+    def __repr__(self) -> str:
+        return f'Instruction({self.opcode.name}, {self.dst!r}, {self.left!r}, {self.right!r})'
+
+
+def isTemp(operand) -> bool:
+    return isinstance(operand, Temp)
+
+
+def isConstant(operand) -> bool:
+    return isinstance(operand, Constant)
+
+
+def formatInstruction(instruction: Instruction) -> str:
+    opcode = instruction.opcode
+    if opcode in BINARY_OPS:
+        mnemonic = operators.MNEMONICS[BINARY_OPERATIONS[opcode]]
+        return f'{instruction.dst} = {instruction.left} {mnemonic} {instruction.right}'
+    if opcode == Opcode.COPY:
+        return f'{instruction.dst} = {instruction.left}'
+    if opcode == Opcode.DECLARE:
+        return f'declare{instruction.type.name.lower()} {instruction.dst}'
+    if opcode == Opcode.NEG:
+        return f'{instruction.dst} = -{instruction.left}'
+    if opcode == Opcode.NOT:
+        return f'{instruction.dst} = not {instruction.left}'
+    if opcode == Opcode.TO_FLOAT:
+        return f'{instruction.dst} = toFloat {instruction.left}'
+    if opcode == Opcode.PRINT:
+        return f'print {instruction.left}'
+    if opcode == Opcode.LABEL:
+        return f'LABEL {instruction.dst}'
+    if opcode == Opcode.GOTO:
+        return f'GOTO {instruction.dst}'
+    if opcode == Opcode.IFNOT:
+        return f'{instruction.left} IFNOTGOTO {instruction.dst}'
+    return f'{instruction.left} IFGOTO {instruction.dst}'
+
+
+def serialize(instructions: List[Instruction]) -> List[str]:
+    """Text lines of the program, as written to the .output files."""
+    return [formatInstruction(instruction) for instruction in instructions]
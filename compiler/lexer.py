@@ -1,7 +1,14 @@
+import hashlib
+import threading
 import ply.lex as lex
 
 from enum import Enum
 
+# Master regexes shared by every Lexer in the process, keyed by spec hash.
+_lexerSpecs = {}
+_specSignatures = {}
+_lexerSpecsLock = threading.Lock()
+
 
 class LexerTypes(Enum):
     INTNUM = 1
@@ -29,6 +36,31 @@ class LexerTypes(Enum):
     SENTENCE_END = 23
 
 
+class TokenStream:
+    """Tokens from a single lexing pass, replayed to the parser."""
+
+    def __init__(self, tokens: list) -> None:
+        self.tokens = tokens
+        self.position = 0
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __bool__(self) -> bool:
+        # yacc falls back to the global PLY lexer for a false lexer.
+        return True
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def token(self):
+        if self.position >= len(self.tokens):
+            return None
+        tok = self.tokens[self.position]
+        self.position += 1
+        return tok
+
+
 class Lexer:
     # List of literals to avoid writing simple regexp for each one.
     literals = ['+', '-', '*', '/', '=', '^',
@@ -75,6 +107,7 @@ class Lexer:
         self.n_errors = 0
         self.errorToken = ''
         self.errorLine = -1
+        self.errorColumn = -1
 
     def t_STRING(self, t):
         r'"([^"\n]|(\\"))*"'
@@ -105,9 +138,52 @@ class Lexer:
     def t_error(self, t):
         self.n_errors += 1
         self.errorLine = t.lexer.lineno - 1
+        self.errorColumn = t.lexpos - t.lexer.lexdata.rfind('\n', 0, t.lexpos)
         self.errorToken = t.value[0]
         t.lexer.skip(1)
 
+    def tokenize(self, program: str, firstLine: int = 1) -> TokenStream:
+        """Lexes the whole program once, stopping at the first invalid token.
+        Lines are numbered from firstLine, for programs cut out of a file."""
+        self.n_errors = 0
+        lexer = self.createLexer()
+        lexer.lineno = firstLine
+        lexer.input(program)
+        tokens = []
+        while True:
+            tok = lexer.token()
+            if self.n_errors != 0 or not tok:
+                break
+            tokens.append(tok)
+        return TokenStream(tokens)
+
+    @classmethod
+    def specSignature(cls) -> str:
+        """Hash of everything that determines the lexer regexes."""
+        if cls in _specSignatures:
+            return _specSignatures[cls]
+        parts = [' '.join(cls.tokens), ' '.join(cls.literals),
+                 repr(sorted(cls.reserved.items())), cls.t_ignore]
+        for name in sorted(dir(cls)):
+            if name.startswith('t_') and name != 't_ignore':
+                rule = getattr(cls, name)
+                parts.append(f'{name}:{rule if isinstance(rule, str) else rule.__doc__}')
+        signature = hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+        _specSignatures[cls] = signature
+        return signature
+
     def createLexer(self):
-        lexer = lex.lex(module=self)
+        signature = self.specSignature()
+        prototype = _lexerSpecs.get(signature)
+        if prototype == None:
+            with _lexerSpecsLock:
+                prototype = _lexerSpecs.get(signature)
+                if prototype == None:
+                    prototype = lex.lex(module=self)
+                    _lexerSpecs[signature] = prototype
+        # The clone shares the compiled regexes but gets its own position,
+        # line number and rule bindings to this instance. PLY only rebinds
+        # the state tables, begin() refreshes the active rules from them.
+        lexer = prototype.clone(self)
+        lexer.begin(lexer.lexstate)
         return lexer
@@ -0,0 +1,130 @@
+import heapq
+from typing import List, Tuple
+from compiler import ir
+from compiler.cfg import ControlFlowGraph
+from compiler.ir import Instruction, Temp
+
+
+def liveTemps(cfg: ControlFlowGraph) -> Tuple[list, list]:
+    """Temporals live at the start and at the end of every block, by block
+    index (backward dataflow iterated until nothing changes)."""
+    blocks = cfg.blocks
+    used = []
+    defined = []
+    for block in blocks:
+        blockUsed = set()
+        blockDefined = set()
+        for instruction in cfg.blockInstructions(block):
+            for operand in (instruction.left, instruction.right):
+                if isinstance(operand, Temp) and operand not in blockDefined:
+                    blockUsed.add(operand)
+            if instruction.opcode in ir.VALUE_OPS and isinstance(instruction.dst, Temp):
+                blockDefined.add(instruction.dst)
+        used.append(blockUsed)
+        defined.append(blockDefined)
+    liveIn = [set() for _ in blocks]
+    liveOut = [set() for _ in blocks]
+    changed = True
+    while changed:
+        changed = False
+        # Going backwards most blocks see their successors already done.
+        for block in reversed(blocks):
+            index = block.index
+            out = set()
+            for successor in block.successors:
+                out |= liveIn[successor.index]
+            if out != liveOut[index]:
+                liveOut[index] = out
+            newIn = used[index] | (out - defined[index])
+            if newIn != liveIn[index]:
+                liveIn[index] = newIn
+                changed = True
+    return liveIn, liveOut
+
+
+def liveIntervals(instructions: List[Instruction]) -> dict:
+    """Temporal -> (first, last) position where it is live.
+
+    Instruction i reads its operands at position 2i and writes its dst at
+    2i + 1, so a temporal read for the last time by the instruction that
+    writes another one does not overlap it. A temporal live through a block
+    covers the whole block, so loops keep their temporals alive on every
+    iteration.
+    """
+    cfg = ControlFlowGraph(instructions)
+    liveIn, liveOut = liveTemps(cfg)
+    intervals = {}
+
+    def extend(temp, position):
+        interval = intervals.get(temp)
+        if interval == None:
+            intervals[temp] = (position, position)
+        elif position < interval[0]:
+            intervals[temp] = (position, interval[1])
+        elif position > interval[1]:
+            intervals[temp] = (interval[0], position)
+
+    for block in cfg.blocks:
+        for temp in liveIn[block.index]:
+            extend(temp, 2 * block.start)
+        for temp in liveOut[block.index]:
+            extend(temp, 2 * block.end)
+        for i in range(block.start, block.end):
+            instruction = instructions[i]
+            for operand in (instruction.left, instruction.right):
+                if isinstance(operand, Temp):
+                    extend(operand, 2 * i)
+            if instruction.opcode in ir.VALUE_OPS and isinstance(instruction.dst, Temp):
+                extend(instruction.dst, 2 * i + 1)
+    return intervals
+
+
+def colorIntervals(intervals: dict) -> dict:
+    """Temporal -> smallest slot not used by an overlapping temporal (linear
+    scan over the intervals sorted by start). The slot count is the peak
+    of live temporals, which is the minimum for intervals."""
+    colors = {}
+    # (end, color) of the temporals holding a slot.
+    active = []
+    free = []
+    slots = 0
+    for temp, (start, end) in sorted(intervals.items(), key=lambda item: item[1]):
+        while active and active[0][0] < start:
+            heapq.heappush(free, heapq.heappop(active)[1])
+        if free:
+            color = heapq.heappop(free)
+        else:
+            color = slots
+            slots += 1
+        colors[temp] = color
+        heapq.heappush(active, (end, color))
+    return colors
+
+
+def peakLiveTemps(instructions: List[Instruction]) -> int:
+    """Most temporals live at the same time in the program."""
+    colors = colorIntervals(liveIntervals(instructions))
+    return max(colors.values()) + 1 if colors else 0
+
+
+def reuseTemps(instructions: List[Instruction]) -> List[Instruction]:
+    """Renames the temporals to t0...tN-1, where N is the peak of live
+    temporals. Temporals whose lifetimes do not overlap share a name."""
+    colors = colorIntervals(liveIntervals(instructions))
+    temps = [Temp(i) for i in range(max(colors.values()) + 1 if colors else 0)]
+
+    def rename(operand):
+        if isinstance(operand, Temp):
+            return temps[colors[operand]]
+        return operand
+
+    result = []
+    for instruction in instructions:
+        dst = rename(instruction.dst)
+        left = rename(instruction.left)
+        right = rename(instruction.right)
+        if dst is not instruction.dst or left is not instruction.left or right is not instruction.right:
+            instruction = Instruction(
+                instruction.opcode, dst, left, right, instruction.type)
+        result.append(instruction)
+    return result
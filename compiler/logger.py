@@ -1,3 +1,6 @@
+from typing import TextIO
+
+
 class Logger:
     # ANSI Escape Codes
     OK = '\033[94m'
@@ -5,18 +8,20 @@ class Logger:
     ERROR = '\033[91m'
     ENDC = '\033[0m'
 
-    def __init__(self, debug: bool) -> None:
+    def __init__(self, debug: bool, stream: TextIO = None) -> None:
         self.debug = debug
+        # Messages go to stdout when None.
+        self.stream = stream
 
     def LogDebug(self, message: str):
         if (self.debug):
-            print(self._CreateMessage(self.DEBUG, message))
+            print(self._CreateMessage(self.DEBUG, message), file=self.stream)
 
     def LogError(self, message: str):
-        print(self._CreateMessage(self.ERROR, f'ERROR: {message}'))
+        print(self._CreateMessage(self.ERROR, f'ERROR: {message}'), file=self.stream)
 
     def LogSuccess(self, message: str):
-        print(self._CreateMessage(self.OK, message))
+        print(self._CreateMessage(self.OK, message), file=self.stream)
 
     def _CreateMessage(self, escapeCode: str, message) -> str:
         return f'{escapeCode}{message}{self.ENDC}'
@@ -0,0 +1,181 @@
+import operator
+from typing import Callable
+from compiler.parser import ASTTypes, VariableTypes
+
+
+class OperatorRule:
+    """Typing and evaluation of one operator for one pair of operand types."""
+    __slots__ = ('resultType', 'coerceLeft', 'coerceRight', 'evaluate',
+                 'mnemonic', 'negativeExponent')
+
+    def __init__(self, resultType: VariableTypes, evaluate: Callable, mnemonic: str,
+                 coerceLeft: bool = False, coerceRight: bool = False) -> None:
+        self.resultType = resultType
+        # Operands wrapped in INT_TO_FLOAT before evaluating.
+        self.coerceLeft = coerceLeft
+        self.coerceRight = coerceRight
+        self.evaluate = evaluate
+        self.mnemonic = mnemonic
+        # Rule used instead when the exponent value is negative.
+        self.negativeExponent = None
+
+
+ALGEBRA_OPS = frozenset([ASTTypes.SUM, ASTTypes.SUBSTRACT, ASTTypes.MULTIPLICATION,
+                         ASTTypes.DIVISION, ASTTypes.EXPONENT, ASTTypes.UMINUS])
+COMPARISON_OPS = frozenset([ASTTypes.CMP_EQUAL, ASTTypes.CMP_NOT_EQUAL, ASTTypes.CMP_GREATER_EQUAL,
+                            ASTTypes.CMP_LESS_EQUAL, ASTTypes.CMP_GREATER, ASTTypes.CMP_LESS])
+BOOL_OPS = frozenset([ASTTypes.AND_OP, ASTTypes.OR_OP])
+# Operations whose result is a bool.
+CONDITION_OPS = COMPARISON_OPS | BOOL_OPS
+# Operations typed and evaluated through RULES.
+RULE_OPS = ALGEBRA_OPS | COMPARISON_OPS | BOOL_OPS
+# Nodes that compute a value into a temporal.
+EXPRESSION_OPS = RULE_OPS | {ASTTypes.INT_TO_FLOAT}
+
+NUM_TYPES = (VariableTypes.INT, VariableTypes.FLOAT)
+ALL_TYPES = (VariableTypes.INT, VariableTypes.FLOAT,
+             VariableTypes.STRING, VariableTypes.BOOL)
+
+# TAC operator of every operation.
+MNEMONICS = {
+    ASTTypes.SUM: '+',
+    ASTTypes.SUBSTRACT: '-',
+    ASTTypes.MULTIPLICATION: '*',
+    ASTTypes.DIVISION: '/',
+    ASTTypes.EXPONENT: '^',
+    ASTTypes.UMINUS: '-',
+    ASTTypes.CMP_EQUAL: '==',
+    ASTTypes.CMP_NOT_EQUAL: '!=',
+    ASTTypes.CMP_GREATER_EQUAL: '>=',
+    ASTTypes.CMP_LESS_EQUAL: '<=',
+    ASTTypes.CMP_GREATER: '>',
+    ASTTypes.CMP_LESS: '<',
+    ASTTypes.AND_OP: 'and',
+    ASTTypes.OR_OP: 'or',
+}
+
+# Semantic error of an operation whose operand types have no rule.
+ERRORS = {
+    ASTTypes.SUM: 'Cannot sum values "{0}" and "{1}"',
+    ASTTypes.SUBSTRACT: 'Cannot substract values "{0}" and "{1}"',
+    ASTTypes.MULTIPLICATION: 'Cannot multiply values "{0}" and "{1}"',
+    ASTTypes.DIVISION: 'Cannot divide values "{0}" and "{1}"',
+    ASTTypes.EXPONENT: 'Cannot get the exponent of "{0}" ^ "{1}"',
+    ASTTypes.UMINUS: 'Invalid operation "-{0}"',
+    ASTTypes.CMP_EQUAL: 'Cannot do "{0}" == "{1}". Mismatching types.',
+    ASTTypes.CMP_NOT_EQUAL: 'Cannot do "{0}" != "{1}". Mismatching types',
+    ASTTypes.CMP_GREATER_EQUAL: 'Cannot do "{0}" >= "{1}". Mismatching types',
+    ASTTypes.CMP_LESS_EQUAL: 'Cannot do "{0}" <= "{1}". Mismatching types',
+    ASTTypes.CMP_GREATER: 'Cannot do "{0}" > "{1}". Mismatching types',
+    ASTTypes.CMP_LESS: 'Cannot do "{0}" < "{1}". Mismatching types',
+    ASTTypes.AND_OP: 'Cannot perform boolean operation on "{0}" and "{1}"',
+    ASTTypes.OR_OP: 'Cannot perform boolean operation on "{0}" and "{1}"',
+}
+
+
+def _divide(left, right):
+    val = left / right
+    # Exact divisions stay integers, the semantic pass promotes the rest.
+    if val.is_integer():
+        return int(val)
+    return val
+
+
+def _asBool(value):
+    # This is done to perform operations like "0 and True"
+    # in Python and return bool.
+    if value == 0:
+        return False
+    return value
+
+
+ARITHMETIC_EVALUATORS = {
+    ASTTypes.SUM: operator.add,
+    ASTTypes.SUBSTRACT: operator.sub,
+    ASTTypes.MULTIPLICATION: operator.mul,
+    ASTTypes.DIVISION: _divide,
+    ASTTypes.EXPONENT: pow,
+}
+COMPARISON_EVALUATORS = {
+    ASTTypes.CMP_EQUAL: operator.eq,
+    ASTTypes.CMP_NOT_EQUAL: operator.ne,
+    ASTTypes.CMP_GREATER_EQUAL: operator.ge,
+    ASTTypes.CMP_LESS_EQUAL: operator.le,
+    ASTTypes.CMP_GREATER: operator.gt,
+    ASTTypes.CMP_LESS: operator.lt,
+}
+BOOL_EVALUATORS = {
+    ASTTypes.AND_OP: lambda left, right: _asBool(left) and _asBool(right),
+    ASTTypes.OR_OP: lambda left, right: _asBool(left) or _asBool(right),
+}
+
+
+def _numericRule(opType: ASTTypes, leftType: VariableTypes, rightType: VariableTypes) -> OperatorRule:
+    """INT op INT stays INT, any FLOAT operand converts the INT side."""
+    isFloat = VariableTypes.FLOAT in (leftType, rightType)
+    evaluate = ARITHMETIC_EVALUATORS[opType]
+    if isFloat and opType == ASTTypes.DIVISION:
+        # FLOAT results stay floats even when the division is exact.
+        evaluate = operator.truediv
+    return OperatorRule(
+        VariableTypes.FLOAT if isFloat else VariableTypes.INT,
+        evaluate, MNEMONICS[opType],
+        coerceLeft=isFloat and leftType == VariableTypes.INT,
+        coerceRight=isFloat and rightType == VariableTypes.INT)
+
+
+def _buildRules() -> dict:
+    rules = {}
+    for opType in ARITHMETIC_EVALUATORS:
+        for leftType in NUM_TYPES:
+            for rightType in NUM_TYPES:
+                rules[(opType, leftType, rightType)] = _numericRule(
+                    opType, leftType, rightType)
+    # A negative exponent makes INT ^ INT a FLOAT operation.
+    intExponent = rules[(ASTTypes.EXPONENT,
+                         VariableTypes.INT, VariableTypes.INT)]
+    intExponent.negativeExponent = OperatorRule(
+        VariableTypes.FLOAT, pow, MNEMONICS[ASTTypes.EXPONENT], coerceLeft=True, coerceRight=True)
+    # Anything but a bool concatenates with a string.
+    for leftType in ALL_TYPES:
+        for rightType in ALL_TYPES:
+            if VariableTypes.STRING in (leftType, rightType) and VariableTypes.BOOL not in (leftType, rightType):
+                rules[(ASTTypes.SUM, leftType, rightType)] = OperatorRule(
+                    VariableTypes.STRING, lambda left, right: str(left) + str(right), MNEMONICS[ASTTypes.SUM])
+    for opType, evaluate in COMPARISON_EVALUATORS.items():
+        for leftType in ALL_TYPES:
+            for rightType in ALL_TYPES:
+                if opType in (ASTTypes.CMP_EQUAL, ASTTypes.CMP_NOT_EQUAL):
+                    # Equality only rejects numbers against strings.
+                    valid = not ((leftType in NUM_TYPES and rightType == VariableTypes.STRING) or
+                                 (rightType in NUM_TYPES and leftType == VariableTypes.STRING))
+                else:
+                    valid = leftType in NUM_TYPES and rightType in NUM_TYPES
+                if valid:
+                    rules[(opType, leftType, rightType)] = OperatorRule(
+                        VariableTypes.BOOL, evaluate, MNEMONICS[opType])
+    for opType, evaluate in BOOL_EVALUATORS.items():
+        for leftType in ALL_TYPES:
+            for rightType in ALL_TYPES:
+                if (leftType == VariableTypes.BOOL and rightType in NUM_TYPES + (VariableTypes.BOOL,)) or \
+                        (rightType == VariableTypes.BOOL and leftType in NUM_TYPES):
+                    rules[(opType, leftType, rightType)] = OperatorRule(
+                        VariableTypes.BOOL, evaluate, MNEMONICS[opType])
+    # Unary minus only has a left operand.
+    for valueType in NUM_TYPES:
+        rules[(ASTTypes.UMINUS, valueType, None)] = OperatorRule(
+            valueType, lambda value, _: -value, MNEMONICS[ASTTypes.UMINUS])
+    return rules
+
+
+# (operation, left type, right type) -> OperatorRule, a missing key is a
+# semantic error.
+RULES = _buildRules()
+
+
+def lookup(opType: ASTTypes, leftType: VariableTypes, rightType: VariableTypes = None) -> OperatorRule:
+    return RULES.get((opType, leftType, rightType))
+
+
+def errorMessage(opType: ASTTypes, leftValue, rightValue=None) -> str:
+    return ERRORS[opType].format(leftValue, rightValue)
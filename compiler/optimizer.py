@@ -0,0 +1,715 @@
+import itertools
+import math
+import operator
+from typing import List
+from compiler import ir, liveness, operators
+from compiler.cfg import ControlFlowGraph
+from compiler.ir import Constant, Instruction, Opcode, Temp
+from compiler.parser import VariableTypes
+
+
+# Python type a folded value must have to become a Constant of each type,
+# results that do not fit (an INT division with a remainder, an INT ^ INT
+# with a negative exponent) are left for run time like the VM computes them.
+VALUE_TYPES = {
+    VariableTypes.INT: int,
+    VariableTypes.FLOAT: float,
+    VariableTypes.STRING: str,
+    VariableTypes.BOOL: bool,
+}
+
+UNARY_EVALUATORS = {
+    Opcode.NEG: operator.neg,
+    Opcode.NOT: operator.not_,
+    Opcode.TO_FLOAT: float,
+}
+
+
+def countTempDefinitions(instructions: List[Instruction]) -> dict:
+    counts = {}
+    for instruction in instructions:
+        if instruction.opcode in ir.VALUE_OPS and isinstance(instruction.dst, Temp):
+            counts[instruction.dst] = counts.get(instruction.dst, 0) + 1
+    return counts
+
+
+def _evaluate(instruction: Instruction, left: Constant, right: Constant) -> Constant:
+    """Folds an instruction with constant operands, None if it cannot."""
+    opcode = instruction.opcode
+    try:
+        if opcode in ir.BINARY_OPS:
+            rule = operators.lookup(
+                ir.BINARY_OPERATIONS[opcode], left.type, right.type)
+            if rule == None:
+                return None
+            value = rule.evaluate(left.value, right.value)
+        else:
+            value = UNARY_EVALUATORS[opcode](left.value)
+    except (ArithmeticError, TypeError):
+        return None
+    if type(value) != VALUE_TYPES.get(instruction.type):
+        return None
+    return Constant(value, instruction.type)
+
+
+def foldConstants(instructions: List[Instruction]) -> List[Instruction]:
+    """Constant folding and propagation.
+
+    Operations on constants are evaluated with the same rules as the
+    semantic pass and the VM. A temporal defined once with a constant is
+    removed and replaced by the constant everywhere. Variables are
+    replaced by their constant value until the next LABEL, where control
+    flow joins and the value is no longer known.
+    """
+    definitions = countTempDefinitions(instructions)
+    temps = {}
+    variables = {}
+
+    def substitute(operand):
+        if isinstance(operand, Temp):
+            return temps.get(operand, variables.get(operand, operand))
+        return variables.get(operand, operand)
+
+    result = []
+    for instruction in instructions:
+        opcode = instruction.opcode
+        if opcode == Opcode.LABEL:
+            variables.clear()
+            result.append(instruction)
+            continue
+        if opcode == Opcode.DECLARE:
+            variables.pop(instruction.dst, None)
+            result.append(instruction)
+            continue
+        if opcode in (Opcode.GOTO, Opcode.IFGOTO, Opcode.IFNOT, Opcode.PRINT):
+            left = substitute(instruction.left)
+            if left is not instruction.left:
+                instruction = Instruction(
+                    opcode, instruction.dst, left, type=instruction.type)
+            result.append(instruction)
+            continue
+        dst = instruction.dst
+        left = substitute(instruction.left)
+        right = substitute(instruction.right)
+        value = None
+        if opcode == Opcode.COPY:
+            if isinstance(left, Constant):
+                value = left
+        elif isinstance(left, Constant) and (right == None or isinstance(right, Constant)):
+            value = _evaluate(instruction, left, right)
+        if value != None and definitions.get(dst) == 1:
+            temps[dst] = value
+            continue
+        if value != None:
+            variables[dst] = value
+            instruction = Instruction(
+                Opcode.COPY, dst, value, type=instruction.type)
+        else:
+            variables.pop(dst, None)
+            if left is not instruction.left or right is not instruction.right:
+                instruction = Instruction(
+                    opcode, dst, left, right, instruction.type)
+        result.append(instruction)
+    return result
+
+
+def _hasSideEffects(instruction: Instruction) -> bool:
+    """Whether the instruction can fail at run time. Exponents fail on 0 ^
+    a negative and overflow floats, divisions fail on 0 and, like
+    conversions to float, overflow on big ints. Strings concatenate ints
+    that can exceed the digits limit of str. Only INT ^ a non negative
+    constant and FLOAT / a constant other than 0 are known not to fail."""
+    opcode = instruction.opcode
+    right = instruction.right
+    if opcode == Opcode.POW:
+        return not (instruction.type == VariableTypes.INT and isinstance(right, Constant)
+                    and right.type == VariableTypes.INT and right.value >= 0)
+    if opcode == Opcode.DIV:
+        return not (instruction.type == VariableTypes.FLOAT and isinstance(right, Constant)
+                    and right.value != 0)
+    if opcode == Opcode.ADD:
+        return instruction.type == VariableTypes.STRING
+    return opcode == Opcode.TO_FLOAT
+
+
+def _removeUnreachable(instructions: List[Instruction]) -> List[Instruction]:
+    labels = {}
+    for i, instruction in enumerate(instructions):
+        if instruction.opcode == Opcode.LABEL:
+            labels[instruction.dst] = i
+    reachable = [False] * len(instructions)
+    pending = [0] if instructions else []
+    while pending:
+        i = pending.pop()
+        # Walk the fall through path, queueing jump targets on the way.
+        while i < len(instructions) and not reachable[i]:
+            reachable[i] = True
+            instruction = instructions[i]
+            if instruction.opcode in ir.JUMP_OPS:
+                pending.append(labels[instruction.dst])
+                if instruction.opcode == Opcode.GOTO:
+                    break
+            i += 1
+    return [instruction for i, instruction in enumerate(instructions) if reachable[i]]
+
+
+def eliminateDeadCode(instructions: List[Instruction]) -> List[Instruction]:
+    """Dead and unreachable code elimination.
+
+    Jumps on a constant condition become a GOTO or disappear, then
+    everything no path reaches is dropped, which removes the branches of
+    constant conditions and the code after loops that never exit.
+    Temporals that are never read and labels no jump uses are removed last.
+    """
+    result = []
+    for instruction in instructions:
+        if instruction.opcode in ir.CONDITIONAL_JUMP_OPS and isinstance(instruction.left, Constant):
+            if bool(instruction.left.value) != (instruction.opcode == Opcode.IFGOTO):
+                continue
+            instruction = Instruction(Opcode.GOTO, instruction.dst)
+        result.append(instruction)
+    result = _removeUnreachable(result)
+    # Remove temporals with no uses, which can leave the temporals they
+    # read without uses too.
+    definitions = countTempDefinitions(result)
+    definedAt = {}
+    uses = {}
+    for i, instruction in enumerate(result):
+        if definitions.get(instruction.dst) == 1:
+            definedAt[instruction.dst] = i
+        for operand in (instruction.left, instruction.right):
+            if isinstance(operand, Temp):
+                uses[operand] = uses.get(operand, 0) + 1
+    dead = set()
+    pending = [i for temp, i in definedAt.items() if not uses.get(temp)]
+    while pending:
+        i = pending.pop()
+        instruction = result[i]
+        if _hasSideEffects(instruction):
+            continue
+        dead.add(i)
+        for operand in (instruction.left, instruction.right):
+            if isinstance(operand, Temp):
+                uses[operand] -= 1
+                if uses[operand] == 0 and operand in definedAt:
+                    pending.append(definedAt[operand])
+    targets = set(instruction.dst for instruction in result
+                  if instruction.opcode in ir.JUMP_OPS)
+    return [instruction for i, instruction in enumerate(result)
+            if i not in dead and (instruction.opcode != Opcode.LABEL or instruction.dst in targets)]
+
+
+# Operations whose operands can be swapped. + only commutes for numbers
+# and `and`/`or` only for two bools, their results depend on the order
+# otherwise ("a" + "b", 5 and true).
+COMMUTATIVE_OPS = frozenset([Opcode.ADD, Opcode.MUL, Opcode.EQ, Opcode.NE,
+                             Opcode.AND, Opcode.OR])
+
+
+def _operandKey(operand):
+    if isinstance(operand, Temp):
+        return (1, operand.index)
+    if isinstance(operand, Constant):
+        return (2, operand.type.value, repr(operand.value))
+    return (0, operand)
+
+
+def _valueKey(instruction: Instruction, left, right, types: dict) -> tuple:
+    opcode = instruction.opcode
+    if opcode in COMMUTATIVE_OPS:
+        if opcode == Opcode.ADD:
+            swap = instruction.type in operators.NUM_TYPES
+        elif opcode in (Opcode.AND, Opcode.OR):
+            swap = _getType(left, types) == VariableTypes.BOOL and \
+                _getType(right, types) == VariableTypes.BOOL
+        else:
+            swap = True
+        if swap and _operandKey(right) < _operandKey(left):
+            left, right = right, left
+    return (opcode, left, right)
+
+
+def _getType(operand, types: dict) -> VariableTypes:
+    if isinstance(operand, Constant):
+        return operand.type
+    return types.get(operand)
+
+
+def numberValues(instructions: List[Instruction]) -> List[Instruction]:
+    """Local value numbering.
+
+    Inside a block (from a LABEL to the next one, the fall through of an
+    IFGOTO continues the block) an operation already computed into a
+    temporal is not computed again, later uses read the first temporal.
+    Writing a variable forgets the values computed from it.
+    """
+    definitions = countTempDefinitions(instructions)
+    types = {}
+    # Temporal -> earlier temporal holding the same value.
+    replaced = {}
+    # (opcode, left, right) -> temporal holding the result.
+    available = {}
+    # Variable -> keys of available that read it.
+    readers = {}
+
+    def forget(variable):
+        for key in readers.pop(variable, ()):
+            available.pop(key, None)
+
+    result = []
+    for instruction in instructions:
+        opcode = instruction.opcode
+        if opcode == Opcode.LABEL:
+            available.clear()
+            readers.clear()
+            result.append(instruction)
+            continue
+        left = replaced.get(instruction.left, instruction.left)
+        right = replaced.get(instruction.right, instruction.right)
+        if left is not instruction.left or right is not instruction.right:
+            instruction = Instruction(
+                opcode, instruction.dst, left, right, instruction.type)
+        if opcode == Opcode.DECLARE:
+            types[instruction.dst] = instruction.type
+            forget(instruction.dst)
+        elif opcode in ir.VALUE_OPS:
+            dst = instruction.dst
+            types[dst] = instruction.type
+            isSingleTemp = definitions.get(dst) == 1
+            if not isSingleTemp:
+                forget(dst)
+            if opcode != Opcode.COPY:
+                key = _valueKey(instruction, left, right, types)
+                holder = available.get(key)
+                if holder != None and isSingleTemp:
+                    replaced[dst] = holder
+                    continue
+                if holder != None:
+                    instruction = Instruction(
+                        Opcode.COPY, dst, holder, type=instruction.type)
+                elif isSingleTemp:
+                    available[key] = dst
+                    for operand in (left, right):
+                        if operand != None and not isinstance(operand, Constant) and \
+                                definitions.get(operand) != 1:
+                            readers.setdefault(operand, []).append(key)
+        result.append(instruction)
+    return result
+
+
+# Largest INT exponent rewritten into a multiplication chain. Every
+# multiplication is one more instruction for the VM to dispatch, chains
+# longer than two cost more than the pow they replace.
+MAX_CHAIN_EXPONENT = 4
+
+
+def _resultType(opcode: Opcode, left, right, types: dict) -> VariableTypes:
+    """Type of the value the VM computes, INT ^ INT with a negative
+    exponent is promoted to FLOAT like the semantic pass does."""
+    rule = operators.lookup(ir.BINARY_OPERATIONS[opcode],
+                            _getType(left, types), _getType(right, types))
+    if rule == None:
+        return None
+    if rule.negativeExponent != None and isinstance(right, Constant) and right.value < 0:
+        rule = rule.negativeExponent
+    return rule.resultType
+
+
+def _reciprocal(value) -> float:
+    """1 / value when value is a power of two, whose reciprocal is exact,
+    None otherwise."""
+    try:
+        if value == 0 or abs(math.frexp(value)[0]) != 0.5:
+            return None
+        reciprocal = 1.0 / value
+    except ArithmeticError:
+        return None
+    return reciprocal if math.isfinite(reciprocal) else None
+
+
+def _convert(dst, operand, operandType: VariableTypes, resultType: VariableTypes) -> List[Instruction]:
+    if operandType == resultType:
+        return [Instruction(Opcode.COPY, dst, operand, type=resultType)]
+    if operandType == VariableTypes.INT and resultType == VariableTypes.FLOAT:
+        return [Instruction(Opcode.TO_FLOAT, dst, operand, type=resultType)]
+    return None
+
+
+def _multiplyChain(dst, base, exponent: int, newTemp) -> List[Instruction]:
+    # Left to right binary exponentiation, every bit after the first
+    # squares and the set ones multiply by the base.
+    factors = []
+    for bit in bin(exponent)[3:]:
+        factors.append(None)
+        if bit == '1':
+            factors.append(base)
+    chain = []
+    current = base
+    for k, factor in enumerate(factors):
+        target = dst if k == len(factors) - 1 else newTemp()
+        chain.append(Instruction(Opcode.MUL, target, current,
+                                 current if factor == None else factor, VariableTypes.INT))
+        current = target
+    return chain
+
+
+def _simplifyInstruction(instruction: Instruction, types: dict, newTemp) -> List[Instruction]:
+    """Cheaper instructions computing the same value with the same type,
+    None if there are none."""
+    opcode = instruction.opcode
+    dst = instruction.dst
+    left = instruction.left
+    right = instruction.right
+    resultType = instruction.type
+    if opcode not in ir.BINARY_OPS or resultType not in operators.NUM_TYPES or \
+            _resultType(opcode, left, right, types) != resultType:
+        return None
+    if opcode in (Opcode.ADD, Opcode.MUL) and isinstance(left, Constant) and \
+            not isinstance(right, Constant):
+        left, right = right, left
+    leftType = _getType(left, types)
+    if opcode == Opcode.SUB and isinstance(left, Constant) and left.value == 0 and \
+            resultType == VariableTypes.INT:
+        return [Instruction(Opcode.NEG, dst, right, type=resultType)]
+    if not isinstance(right, Constant) or right.type not in operators.NUM_TYPES:
+        return None
+    value = right.value
+    if opcode in (Opcode.ADD, Opcode.SUB) and value == 0:
+        # -0.0 + 0 is 0.0, only a subtraction keeps the sign of a FLOAT.
+        if opcode == Opcode.SUB or leftType == VariableTypes.INT:
+            return _convert(dst, left, leftType, resultType)
+    elif opcode == Opcode.MUL:
+        if value == 1:
+            return _convert(dst, left, leftType, resultType)
+        if value == -1 and leftType == resultType:
+            return [Instruction(Opcode.NEG, dst, left, type=resultType)]
+        if value == 0 and resultType == VariableTypes.INT:
+            return [Instruction(Opcode.COPY, dst, Constant(0, resultType), type=resultType)]
+        if value == 2 and leftType == resultType:
+            return [Instruction(Opcode.ADD, dst, left, left, resultType)]
+    elif opcode == Opcode.DIV and resultType == VariableTypes.FLOAT:
+        # INT / INT divisions can give an INT at run time, only true
+        # divisions are rewritten.
+        reciprocal = _reciprocal(value)
+        if reciprocal == 1.0:
+            return _convert(dst, left, leftType, resultType)
+        if reciprocal != None:
+            return [Instruction(Opcode.MUL, dst, left, Constant(reciprocal, resultType), resultType)]
+    elif opcode == Opcode.POW:
+        if value == 0:
+            one = VALUE_TYPES[resultType](1)
+            return [Instruction(Opcode.COPY, dst, Constant(one, resultType), type=resultType)]
+        if value == 1:
+            return _convert(dst, left, leftType, resultType)
+        # pow is not correctly rounded for floats, so FLOAT powers would
+        # print other digits as multiplications.
+        if resultType == VariableTypes.INT and type(value) == int and \
+                2 <= value <= MAX_CHAIN_EXPONENT:
+            return _multiplyChain(dst, left, value, newTemp)
+    return None
+
+
+def simplifyAlgebra(instructions: List[Instruction]) -> List[Instruction]:
+    """Strength reduction and algebraic simplification.
+
+    Identities (x + 0, x * 1, x / 1, x ^ 1, x ^ 0, x * 0 for INT) become
+    copies, x * 2 an addition, x * -1 and 0 - x a negation, a FLOAT
+    division by a power of two a multiplication and small INT exponents a
+    chain of multiplications. A rewrite is only done when the result keeps
+    the type and the exact value of the original operation. A temporal
+    defined once as a copy of a constant or another temporal is replaced
+    by it.
+    """
+    definitions = countTempDefinitions(instructions)
+    indexes = itertools.count(1 + max((temp.index for temp in definitions), default=-1))
+
+    def newTemp():
+        return Temp(next(indexes))
+
+    types = {}
+    replaced = {}
+    result = []
+    for instruction in instructions:
+        left = replaced.get(instruction.left, instruction.left)
+        right = replaced.get(instruction.right, instruction.right)
+        if left is not instruction.left or right is not instruction.right:
+            instruction = Instruction(
+                instruction.opcode, instruction.dst, left, right, instruction.type)
+        if instruction.opcode == Opcode.DECLARE:
+            types[instruction.dst] = instruction.type
+        elif instruction.opcode in ir.VALUE_OPS:
+            simplified = _simplifyInstruction(instruction, types, newTemp)
+            types[instruction.dst] = instruction.type
+            if simplified != None:
+                first = simplified[0]
+                if len(simplified) == 1 and first.opcode == Opcode.COPY and \
+                        definitions.get(first.dst) == 1 and \
+                        (isinstance(first.left, Constant) or definitions.get(first.left) == 1):
+                    replaced[first.dst] = first.left
+                    continue
+                for rewritten in simplified:
+                    types[rewritten.dst] = rewritten.type
+                result.extend(simplified)
+                continue
+        result.append(instruction)
+    return result
+
+
+def _findPreheader(cfg: ControlFlowGraph, loop) -> int:
+    """Position of the LABEL starting the loop when the only way into the
+    loop from outside is falling through into it, None otherwise."""
+    header = loop.header
+    outside = [block for block in header.predecessors if block.index not in loop.blocks]
+    if header.index == 0 or len(outside) != 1 or outside[0].index != header.index - 1:
+        return None
+    if cfg.instructions[outside[0].end - 1].opcode == Opcode.GOTO:
+        return None
+    return header.start
+
+
+def hoistInvariants(instructions: List[Instruction]) -> List[Instruction]:
+    """Loop invariant code motion.
+
+    An operation inside a natural loop whose operands are constants,
+    variables the loop never writes (in any of its branches) or temporals
+    computed outside the loop is moved right before the LABEL that starts
+    the loop, so it runs once. Loops are handled from the innermost out, an
+    operation can leave several loops at once. The body may not run at all,
+    so operations that can fail only move out of the header, which runs
+    every time the loop is entered, when no print or operation that can
+    fail stays ahead of them: the program fails at the same point.
+    """
+    cfg = ControlFlowGraph(instructions)
+    definitions = countTempDefinitions(instructions)
+    # Instruction position -> position of the LABEL it is moved before.
+    destinations = {}
+    # Loops with fewer blocks first, inner loops always have fewer blocks
+    # than the loops containing them.
+    for loop in sorted(cfg.naturalLoops(), key=lambda loop: len(loop.blocks)):
+        preheader = _findPreheader(cfg, loop)
+        if preheader == None:
+            continue
+        positions = []
+        for index in sorted(loop.blocks):
+            block = cfg.blocks[index]
+            positions.extend(range(block.start, block.end))
+        inLoop = set(positions)
+        # Variables and temporals written inside the loop.
+        written = set()
+        for i in positions:
+            instruction = instructions[i]
+            if instruction.opcode in ir.VALUE_OPS and destinations.get(i, i) in inLoop:
+                written.add(instruction.dst)
+        header = loop.header
+        # A print or an operation that can fail was left in the header.
+        blocked = False
+        for i in positions:
+            instruction = instructions[i]
+            inHeader = header.start <= i < header.end
+            canFail = _hasSideEffects(instruction)
+            if (instruction.opcode in ir.VALUE_OPS and definitions.get(instruction.dst) == 1
+                    and destinations.get(i, i) in inLoop
+                    and instruction.left not in written and instruction.right not in written
+                    and (not canFail or (inHeader and not blocked))):
+                destinations[i] = preheader
+                written.discard(instruction.dst)
+            elif inHeader and (canFail or instruction.opcode == Opcode.PRINT):
+                blocked = True
+    if not destinations:
+        return instructions
+    hoisted = {}
+    for i in sorted(destinations):
+        hoisted.setdefault(destinations[i], []).append(instructions[i])
+    result = []
+    for i, instruction in enumerate(instructions):
+        if i in hoisted:
+            result.extend(hoisted[i])
+        if i not in destinations:
+            result.append(instruction)
+    return result
+
+
+def _countTempUses(instructions: List[Instruction]) -> dict:
+    uses = {}
+    for instruction in instructions:
+        for operand in (instruction.left, instruction.right):
+            if isinstance(operand, Temp):
+                uses[operand] = uses.get(operand, 0) + 1
+    return uses
+
+
+class PeepholeOptimizer:
+    """Rewrites short instruction patterns at the end of a sliding window.
+
+    Instructions are appended one at a time to the output and the enabled
+    patterns are tried on its last instructions until none applies. The
+    whole program is rewritten again until a round hits nothing. hits
+    counts the rewrites of every pattern:
+
+    - merge-labels: consecutive labels become the first one.
+    - thread-jumps: a jump to a label followed by a GOTO jumps to the
+      GOTO target instead.
+    - jump-to-next: a jump to the label right after it is removed.
+    - unreachable: instructions between a GOTO and the next label are
+      removed.
+    - invert-branch: t = not c; t IFGOTO L becomes c IFNOTGOTO L.
+    - coalesce-copy: t = x op y; a = t becomes a = x op y, also across the
+      declaration of a.
+    - unused-labels: labels no jump targets are removed.
+    """
+    PATTERNS = ('merge-labels', 'thread-jumps', 'jump-to-next', 'unreachable',
+                'invert-branch', 'coalesce-copy', 'unused-labels')
+    # Rounds are stopped here even if patterns still hit.
+    MAX_ROUNDS = 10
+
+    def __init__(self, patterns=None) -> None:
+        self.patterns = frozenset(patterns if patterns != None else self.PATTERNS)
+        unknown = self.patterns.difference(self.PATTERNS)
+        if unknown:
+            raise ValueError(f'Unknown peephole patterns: {sorted(unknown)}')
+        self.hits = dict.fromkeys(self.PATTERNS, 0)
+
+    def optimize(self, instructions: List[Instruction]) -> List[Instruction]:
+        for _ in range(self.MAX_ROUNDS):
+            before = sum(self.hits.values())
+            instructions = self._rewrite(instructions)
+            if sum(self.hits.values()) == before:
+                break
+        return instructions
+
+    def _hit(self, pattern: str) -> None:
+        self.hits[pattern] += 1
+
+    def _findTargets(self, instructions: List[Instruction]):
+        """Label aliases of consecutive labels and the final target of every
+        label that is followed by a GOTO."""
+        aliases = {}
+        gotos = {}
+        i = 0
+        while i < len(instructions):
+            if instructions[i].opcode != Opcode.LABEL:
+                i += 1
+                continue
+            first = instructions[i].dst
+            j = i + 1
+            while j < len(instructions) and instructions[j].opcode == Opcode.LABEL:
+                if 'merge-labels' in self.patterns:
+                    aliases[instructions[j].dst] = first
+                j += 1
+            if j < len(instructions) and instructions[j].opcode == Opcode.GOTO:
+                for k in range(i, j):
+                    gotos[instructions[k].dst] = instructions[j].dst
+            i = j
+        return aliases, gotos
+
+    def _resolve(self, label, aliases: dict, gotos: dict):
+        if 'thread-jumps' in self.patterns:
+            seen = set()
+            while label in gotos and label not in seen:
+                seen.add(label)
+                label = gotos[label]
+        return aliases.get(label, label)
+
+    def _rewrite(self, instructions: List[Instruction]) -> List[Instruction]:
+        aliases, gotos = self._findTargets(instructions)
+        definitions = countTempDefinitions(instructions)
+        uses = _countTempUses(instructions)
+        out = []
+        for instruction in instructions:
+            opcode = instruction.opcode
+            if opcode == Opcode.LABEL and instruction.dst in aliases:
+                self._hit('merge-labels')
+                continue
+            if opcode in ir.JUMP_OPS:
+                target = self._resolve(instruction.dst, aliases, gotos)
+                if target is not instruction.dst:
+                    if aliases.get(instruction.dst) is not target:
+                        self._hit('thread-jumps')
+                    instruction = Instruction(
+                        opcode, target, instruction.left, type=instruction.type)
+            if out and out[-1].opcode == Opcode.GOTO and opcode != Opcode.LABEL and \
+                    'unreachable' in self.patterns:
+                self._hit('unreachable')
+                continue
+            out.append(instruction)
+            while self._rewriteTail(out, definitions, uses):
+                pass
+        if 'unused-labels' in self.patterns:
+            targets = set(instruction.dst for instruction in out
+                          if instruction.opcode in ir.JUMP_OPS)
+            result = []
+            for instruction in out:
+                if instruction.opcode == Opcode.LABEL and instruction.dst not in targets:
+                    self._hit('unused-labels')
+                    continue
+                result.append(instruction)
+            out = result
+        return out
+
+    def _isSingleUse(self, temp, definitions: dict, uses: dict) -> bool:
+        return isinstance(temp, Temp) and definitions.get(temp) == 1 and uses.get(temp) == 1
+
+    def _rewriteTail(self, out: List[Instruction], definitions: dict, uses: dict) -> bool:
+        """Applies one pattern to the end of out, False if none applies."""
+        last = out[-1]
+        previous = out[-2] if len(out) > 1 else None
+        if previous == None:
+            return False
+        if last.opcode == Opcode.LABEL and previous.opcode in ir.JUMP_OPS and \
+                previous.dst is last.dst and 'jump-to-next' in self.patterns:
+            del out[-2]
+            self._hit('jump-to-next')
+            return True
+        if last.opcode in ir.CONDITIONAL_JUMP_OPS and previous.opcode == Opcode.NOT and \
+                previous.dst is last.left and 'invert-branch' in self.patterns and \
+                self._isSingleUse(last.left, definitions, uses):
+            opcode = Opcode.IFNOT if last.opcode == Opcode.IFGOTO else Opcode.IFGOTO
+            out[-2:] = [Instruction(opcode, last.dst, previous.left)]
+            self._hit('invert-branch')
+            return True
+        if last.opcode == Opcode.COPY and 'coalesce-copy' in self.patterns and \
+                self._isSingleUse(last.left, definitions, uses):
+            # The temporal is written right before the copy, or before the
+            # declaration of the copied variable.
+            declaration = None
+            producer = previous
+            if previous.opcode == Opcode.DECLARE and previous.dst == last.dst and len(out) > 2:
+                declaration = previous
+                producer = out[-3]
+                if producer.left == last.dst or producer.right == last.dst:
+                    return False
+            if producer.opcode not in ir.VALUE_OPS or producer.dst is not last.left:
+                return False
+            merged = Instruction(producer.opcode, last.dst, producer.left,
+                                 producer.right, producer.type)
+            if declaration != None:
+                out[-3:] = [declaration, merged]
+            else:
+                out[-2:] = [merged]
+            self._hit('coalesce-copy')
+            return True
+        return False
+
+
+def peephole(instructions: List[Instruction]) -> List[Instruction]:
+    return PeepholeOptimizer().optimize(instructions)
+
+
+# Passes by name, in the order optimize runs them.
+PASSES = {
+    'fold': foldConstants,
+    'simplify': simplifyAlgebra,
+    'lvn': numberValues,
+    'dce': eliminateDeadCode,
+    'licm': hoistInvariants,
+    'peephole': peephole,
+    # Leaves temporals with many definitions, so it runs last.
+    'temps': liveness.reuseTemps,
+}
+
+
+def optimize(instructions: List[Instruction], passes=None) -> List[Instruction]:
+    """Runs the given optimization passes (all of them by default)."""
+    for name in (passes if passes != None else PASSES):
+        instructions = PASSES[name](instructions)
+    return instructions
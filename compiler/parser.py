@@ -1,19 +1,33 @@
+import copy
+import hashlib
+import threading
 import ply.yacc as yacc
 
-from compiler.lexer import Lexer
+from compiler import walker
+from compiler.lexer import Lexer, TokenStream
 from enum import Enum
 from typing import List
 
+# LALR tables shared by every Parser in the process, keyed by grammar hash.
+_parseTables = {}
+_grammarSignatures = {}
+_parseTablesLock = threading.Lock()
+
 
 class ParserError(Exception):
     pass
 
 
 class SymbolTable:
-    def __init__(self, table, parent):
+    __slots__ = ('table', 'parent', 'children', 'scopeId', 'slots')
+
+    def __init__(self, table, parent, scopeId: int = 0):
         self.table = table
         self.parent = parent
         self.children = []
+        self.scopeId = scopeId
+        # Variables in declaration order, a binding slot indexes this list.
+        self.slots = []
 
     def __str__(self) -> str:
         return str(self.table)
@@ -30,6 +44,8 @@ class VariableTypes(Enum):
 
 
 class Variable:
+    __slots__ = ('type', 'lineno', 'value')
+
     def __init__(self, type: VariableTypes, lineno: any, value: any = None) -> None:
         self.type = type
         self.lineno = lineno
@@ -84,15 +100,26 @@ class ASTTypes(Enum):
     EXPONENT = 55
 
 
+# Shared by every node without children so leaves do not allocate a list.
+NO_CHILDREN = ()
+
+
 class ASTNode:
+    # No per instance __dict__, the AST is the largest structure we keep.
+    __slots__ = ('type', 'children', 'variableType', 'variableValue',
+                 'variableName', 'symbolTable', 'lineno', 'binding')
+
     def __init__(self, type: ASTTypes, children: List[any] = None,
                  variableType: VariableTypes = None, variableValue: any = None,
                  variableName: str = None, symbolTable: SymbolTable = None, lineno: int = None):
         self.type = type
+        # (scope id, slot index) of the variable a name refers to, set by
+        # the symbol table pass on VARIABLE, REASSIGN and declarations.
+        self.binding = None
         if children:
             self.children = children
         else:
-            self.children = []
+            self.children = NO_CHILDREN
         self.variableType = variableType
         self.variableValue = variableValue
         self.variableName = variableName
@@ -104,6 +131,15 @@ class ASTNode:
 
 
 class Parser:
+    declarationTypes = frozenset([ASTTypes.INT_DCL, ASTTypes.FLOAT_DCL,
+                                  ASTTypes.STRING_DCL, ASTTypes.BOOL_DCL])
+    validConditionTypes = frozenset([
+        ASTTypes.BOOL_FALSE, ASTTypes.BOOL_TRUE, ASTTypes.VARIABLE,
+        ASTTypes.CMP_EQUAL, ASTTypes.CMP_NOT_EQUAL, ASTTypes.CMP_GREATER_EQUAL,
+        ASTTypes.CMP_LESS_EQUAL, ASTTypes.CMP_GREATER, ASTTypes.CMP_LESS,
+        ASTTypes.AND_OP, ASTTypes.OR_OP])
+    literalTypes = frozenset([ASTTypes.INT, ASTTypes.FLOAT, ASTTypes.STRING,
+                              ASTTypes.BOOL_TRUE, ASTTypes.BOOL_FALSE])
     precedence = (
         ('left', 'AND_OP', 'OR_OP'),
         ('left', 'EQUALS', 'NOT_EQUAL'),
@@ -122,7 +158,52 @@ class Parser:
         self.first_error = ''
         self.proglines = proglines
         self.symbolTable = None
-        self.parser = yacc.yacc(module=self)
+        # Every scope of the last parsed program, indexed by scope id.
+        self.scopes = []
+        # Name -> stack of bindings declared in the currently open scopes.
+        self._shadows = {}
+        self.parser = self._createParser()
+
+    @classmethod
+    def grammarSignature(cls) -> str:
+        """Hash of everything that determines the parse tables."""
+        if cls in _grammarSignatures:
+            return _grammarSignatures[cls]
+        parts = [repr(cls.precedence), ' '.join(Lexer.tokens),
+                 ' '.join(Lexer.literals)]
+        for name in sorted(dir(cls)):
+            if name.startswith('p_') and name != 'p_error':
+                parts.append(f'{name}:{getattr(cls, name).__doc__}')
+        signature = hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+        _grammarSignatures[cls] = signature
+        return signature
+
+    def _getSharedTables(self) -> yacc.LRParser:
+        signature = self.grammarSignature()
+        tables = _parseTables.get(signature)
+        if tables == None:
+            with _parseTablesLock:
+                tables = _parseTables.get(signature)
+                if tables == None:
+                    tables = yacc.yacc(module=self, debug=False,
+                                       write_tables=False, errorlog=yacc.NullLogger())
+                    _parseTables[signature] = tables
+        return tables
+
+    def _createParser(self) -> yacc.LRParser:
+        """Creates an LR parser bound to this instance over the shared tables."""
+        # Action, goto and defaulted states are shared read-only, only the
+        # productions are copied to bind the rule methods of this instance.
+        parser = copy.copy(self._getSharedTables())
+        parser.productions = []
+        for p in self._getSharedTables().productions:
+            production = yacc.MiniProduction(
+                p.str, p.name, p.len, p.func, p.file, p.line)
+            if p.func:
+                production.callable = getattr(self, p.func)
+            parser.productions.append(production)
+        parser.errorfunc = self.p_error
+        return parser
 
     def _addError(self, error: str, lineNumber: int = None):
         if lineNumber:
@@ -131,13 +212,14 @@ class Parser:
         raise ParserError('Parser Error!')
 
     def p_program(self, p):
-        '''program : expression program
+        '''program : program expression
                     | expression
         '''
+        # Left recursion keeps the parser stack flat and lets every
+        # statement be appended to the same block in O(1).
         if len(p) == 3:
-            children = [p[1]]
-            children.extend(p[2].children)
-            p[0] = ASTNode(ASTTypes.BLOCK, children)
+            p[1].children.append(p[2])
+            p[0] = p[1]
         else:
             p[0] = ASTNode(ASTTypes.BLOCK, [p[1]])
 
@@ -186,18 +268,19 @@ class Parser:
         p[0] = ASTNode(ASTTypes.IF_STATEMENT, children=children)
 
     def p_block_elif(self, p):
-        '''elif : ELIF "(" declaration ")" "{" program "}" elif
+        '''elif : elif ELIF "(" declaration ")" "{" program "}"
                 |
         '''
         if len(p) > 1:
-            self._checkIsValidBoolCondition(p[3].type, p.lineno(2))
-            children = [p[3]]
-            if (p[6] != None):
-                children.append(p[6])
-            currentElifs = [ASTNode(
-                ASTTypes.ELIF, children=children, lineno=p.lineno(1))]
-            if (p[8] != None):
-                currentElifs.extend(p[8])
+            self._checkIsValidBoolCondition(p[4].type, p.lineno(3))
+            children = [p[4]]
+            if (p[7] != None):
+                children.append(p[7])
+            currentElifs = p[1]
+            if (currentElifs == None):
+                currentElifs = []
+            currentElifs.append(ASTNode(
+                ASTTypes.ELIF, children=children, lineno=p.lineno(2)))
             p[0] = currentElifs
 
     def p_block_else(self, p):
@@ -370,65 +453,97 @@ class Parser:
         self._addError('Unexpected end of file reached')
 
     def _produceSymbolTable(self, root: ASTNode, currentTable: SymbolTable, pending: List[ASTNode] = None):
+        # Generator pass driven by walker.run, yield replaces recursion.
         if root.type == ASTTypes.FOR_STATEMENT:
             # Save for future processing.
-            self._produceSymbolTable(
+            yield self._produceSymbolTable(
                 root.children[3], currentTable, root.children[:3])
             return
         if root.type == ASTTypes.BLOCK:
             # Global variables
             if currentTable == None:
-                root.symbolTable = SymbolTable({}, None)
+                root.symbolTable = SymbolTable({}, None, len(self.scopes))
             else:
-                root.symbolTable = SymbolTable({}, currentTable)
+                root.symbolTable = SymbolTable(
+                    {}, currentTable, len(self.scopes))
                 root.symbolTable.parent.children.append(root.symbolTable)
+            self.scopes.append(root.symbolTable)
             currentTable = root.symbolTable
             if pending != None:
                 for node in pending:
-                    self._produceSymbolTable(node, currentTable, None)
+                    yield self._produceSymbolTable(node, currentTable, None)
                 pending = None
-        elif root.type in [ASTTypes.INT_DCL, ASTTypes.FLOAT_DCL, ASTTypes.STRING_DCL, ASTTypes.BOOL_DCL]:
+        elif root.type in self.declarationTypes:
             for c in root.children:
-                self._produceSymbolTable(c, currentTable, pending)
-            self._addToNames(currentTable, root.variableName,
-                             root.variableType, root.lineno)
+                yield self._produceSymbolTable(c, currentTable, pending)
+            root.binding = self._addToNames(currentTable, root.variableName,
+                                            root.variableType, root.lineno)
             return
-        elif root.type in [ASTTypes.VARIABLE, ASTTypes.REASSIGN]:
-            self._checkIfVariableExist(
-                currentTable, root.variableName, root.lineno)
+        elif root.type == ASTTypes.VARIABLE or root.type == ASTTypes.REASSIGN:
+            root.binding = self._checkIfVariableExist(
+                root.variableName, root.lineno)
         for c in root.children:
-            self._produceSymbolTable(c, currentTable, pending)
+            # Literals have nothing to register or check.
+            if c.type not in self.literalTypes:
+                yield self._produceSymbolTable(c, currentTable, pending)
+        if root.type == ASTTypes.BLOCK:
+            self._closeScope(root.symbolTable)
 
     def _addToNames(self, symbolTable: SymbolTable, name: str, type: VariableTypes, lineno: int):
-        currentSymbolTable = symbolTable
-        while currentSymbolTable != None:
-            if name in currentSymbolTable.table:
-                self._addError(
-                    f'Variable name "{name}" already exists', lineno)
-            currentSymbolTable = currentSymbolTable.parent
-        symbolTable.table[name] = Variable(type, lineno)
-
-    def _checkIfVariableExist(self, symbolTable: SymbolTable, name: str, lineno: int):
-        currentSymbolTable = symbolTable
-        while currentSymbolTable != None:
-            if name in currentSymbolTable.table:
-                return
-            currentSymbolTable = currentSymbolTable.parent
-        self._addError(f'Variable name "{name}" does not exist', lineno)
+        # Only the open scopes have entries, so any entry means the name is
+        # already declared in this scope or an enclosing one.
+        if name in self._shadows:
+            self._addError(
+                f'Variable name "{name}" already exists', lineno)
+        variable = Variable(type, lineno)
+        binding = (symbolTable.scopeId, len(symbolTable.slots))
+        symbolTable.slots.append(variable)
+        symbolTable.table[name] = variable
+        self._shadows[name] = [binding]
+        return binding
+
+    def _checkIfVariableExist(self, name: str, lineno: int):
+        bindings = self._shadows.get(name)
+        if bindings == None:
+            self._addError(f'Variable name "{name}" does not exist', lineno)
+        return bindings[-1]
+
+    def _closeScope(self, symbolTable: SymbolTable):
+        for name in symbolTable.table:
+            bindings = self._shadows[name]
+            bindings.pop()
+            if not bindings:
+                del self._shadows[name]
 
     def _checkIsValidBoolCondition(self, nodeType: ASTTypes, lineno: int):
-        compareTypes = [ASTTypes.CMP_EQUAL, ASTTypes.CMP_NOT_EQUAL, ASTTypes.CMP_GREATER_EQUAL,
-                        ASTTypes.CMP_LESS_EQUAL, ASTTypes.CMP_GREATER, ASTTypes.CMP_LESS]
-        boolOpTypes = [ASTTypes.AND_OP, ASTTypes.OR_OP]
-        validOptions = [ASTTypes.BOOL_FALSE,
-                        ASTTypes.BOOL_TRUE, ASTTypes.VARIABLE]
-        validOptions.extend(compareTypes)
-        validOptions.extend(boolOpTypes)
-        if nodeType not in validOptions:
+        if nodeType not in self.validConditionTypes:
             self._addError('Invalid bool condition encountered', lineno)
 
-    def parseProgram(self, prog):
-        root = self.parser.parse(prog)
-        self._produceSymbolTable(root, None)
+    def parseStatements(self, prog, tokens: TokenStream = None) -> ASTNode:
+        """Parses a program without the symbol table pass, its statements
+        are the children of the BLOCK returned."""
+        if tokens != None:
+            # Already lexed, consume the stream instead of lexing again.
+            tokens.position = 0
+            return self.parser.parse(lexer=tokens)
+        self.lexer.lineno = 1
+        return self.parser.parse(prog, lexer=self.lexer)
+
+    def bindStatements(self, root: ASTNode) -> None:
+        """Symbol table pass over the statements of root taking
+        root.symbolTable as the global scope, holding the variables the
+        previous statements of the program declared."""
+        globalTable = root.symbolTable
+        self.scopes = [globalTable]
+        self._shadows = {name: [(globalTable.scopeId, slot)]
+                         for slot, name in enumerate(globalTable.table)}
+        for statement in root.children:
+            walker.run(self._produceSymbolTable(statement, globalTable))
+
+    def parseProgram(self, prog, tokens: TokenStream = None):
+        root = self.parseStatements(prog, tokens)
+        self.scopes = []
+        self._shadows = {}
+        walker.run(self._produceSymbolTable(root, None))
         self.symbolTable = root.symbolTable
         return root
@@ -0,0 +1,51 @@
+from typing import List
+from compiler.ir import Instruction
+from compiler.lexer import Lexer
+from compiler.optimizer import optimize
+from compiler.parser import Parser, ParserError
+from compiler.scanner import Scanner
+from compiler.semantics import SemanticAnalyzer, SemanticError
+from compiler.tac import TACProcessor
+
+
+# Lexer backends by the name the CLI takes, they give the same tokens.
+LEXERS = {'ply': Lexer, 'regex': Scanner}
+
+
+class CompileError(Exception):
+    """Invalid program, the message is the one the CLI prints."""
+
+
+def lexerErrorMessage(lexerInstance: Lexer, lines: List[str]) -> str:
+    errorMessage = f'Invalid token \'{lexerInstance.errorToken}\' at line ' \
+        f'{lexerInstance.errorLine + 1}, column {lexerInstance.errorColumn}'
+    return f'{errorMessage}:\n\t{lines[lexerInstance.errorLine]}'
+
+
+def warmUp() -> None:
+    """Builds the lexer regexes and parse tables shared by the process."""
+    Parser([])
+
+
+def compileSource(program: str, optimized: bool = False, lexerClass: type = Lexer) -> List[Instruction]:
+    """Runs the whole front end on a program, raises CompileError with the
+    first lexer, parser or semantic error."""
+    lines = program.splitlines()
+    lexerInstance = lexerClass()
+    tokens = lexerInstance.tokenize(program)
+    if lexerInstance.n_errors != 0:
+        raise CompileError(lexerErrorMessage(lexerInstance, lines))
+    parserInstance = Parser(lines)
+    try:
+        root = parserInstance.parseProgram(program, tokens)
+    except ParserError:
+        raise CompileError(parserInstance.first_error)
+    semanticInstance = SemanticAnalyzer(root, lines)
+    try:
+        semanticInstance.checkSemantics()
+    except SemanticError:
+        raise CompileError(semanticInstance.error)
+    instructions = TACProcessor(root).generateIR()
+    if optimized:
+        instructions = optimize(instructions)
+    return instructions
@@ -0,0 +1,150 @@
+import re
+from array import array
+from compiler.lexer import Lexer, LexerTypes
+
+# Type of every token code, the codes index this list.
+TOKEN_TYPES = Lexer.tokens + Lexer.literals
+TOKEN_CODES = {tokenType: code for code, tokenType in enumerate(TOKEN_TYPES)}
+_NAME_CODE = TOKEN_CODES[LexerTypes.NAME.name]
+_INTNUM_CODE = TOKEN_CODES[LexerTypes.INTNUM.name]
+_FLOATNUM_CODE = TOKEN_CODES[LexerTypes.FLOATNUM.name]
+# Code of every identifier that is a keyword.
+_RESERVED_CODES = {word: TOKEN_CODES[tokenType] for word, tokenType in Lexer.reserved.items()}
+
+# The rules of Lexer in the order PLY tries them: function rules as they
+# are defined, then string rules from the longest regex, then literals.
+# Blanks are skipped before any of them and anything else is an error.
+_MASTER = re.compile('|'.join(f'(?P<{name}>{regex})' for name, regex in [
+    ('ignore', f'[{re.escape(Lexer.t_ignore)}]+'),
+    (LexerTypes.STRING.name, Lexer.t_STRING.__doc__),
+    (LexerTypes.NAME.name, Lexer.t_NAME.__doc__),
+    (LexerTypes.FLOATNUM.name, Lexer.t_FNUMBER.__doc__),
+    (LexerTypes.INTNUM.name, Lexer.t_INUMBER.__doc__),
+    ('newline', Lexer.t_newline.__doc__),
+    (LexerTypes.EQUALS.name, Lexer.t_EQUALS),
+    (LexerTypes.NOT_EQUAL.name, Lexer.t_NOT_EQUAL),
+    (LexerTypes.GREATER_EQUAL.name, Lexer.t_GREATER_EQUAL),
+    (LexerTypes.LESS_EQUAL.name, Lexer.t_LESS_EQUAL),
+    (LexerTypes.SENTENCE_END.name, Lexer.t_SENTENCE_END),
+    ('literal', f'[{re.escape("".join(Lexer.literals))}]'),
+    ('error', r'[\s\S]'),
+]))
+
+
+class TokenBuffer:
+    """Tokens of a program in parallel arrays instead of one object each:
+    type codes (indexes of TOKEN_TYPES), values, lines and columns."""
+    __slots__ = ('types', 'values', 'lines', 'columns')
+
+    def __init__(self) -> None:
+        self.types = array('B')
+        self.values = []
+        self.lines = array('L')
+        # Numbered from 1, like the column of lexer errors.
+        self.columns = array('L')
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+
+class _Token:
+    # yacc reads type, value and lineno, and sets lexer on the token of a
+    # syntax error.
+    __slots__ = ('type', 'value', 'lineno', 'lexer')
+
+    def __init__(self, type: str, value, lineno: int) -> None:
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+
+
+class BufferStream:
+    """Feeds a TokenBuffer to the parser like a TokenStream, creating the
+    token objects yacc needs one at a time."""
+
+    def __init__(self, buffer: TokenBuffer) -> None:
+        self.buffer = buffer
+        self.position = 0
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __bool__(self) -> bool:
+        # yacc falls back to the global PLY lexer for a false lexer.
+        return True
+
+    def token(self):
+        position = self.position
+        buffer = self.buffer
+        if position >= len(buffer.types):
+            return None
+        self.position = position + 1
+        return _Token(TOKEN_TYPES[buffer.types[position]], buffer.values[position],
+                      buffer.lines[position])
+
+
+class Scanner:
+    """Hand written lexer backend, tokenizes like Lexer (same token types,
+    values, keywords from Lexer.reserved, line numbers and errors) with a
+    single master regex and finditer instead of PLY, which builds a
+    LexToken and calls a rule method per token."""
+
+    def __init__(self) -> None:
+        self.n_errors = 0
+        self.errorToken = ''
+        self.errorLine = -1
+        self.errorColumn = -1
+
+    def scan(self, program: str, firstLine: int = 1) -> TokenBuffer:
+        """Tokens of the program up to the first invalid character. Like
+        PLY, invalid characters up to the next token all count as errors
+        and the last one is reported."""
+        self.n_errors = 0
+        buffer = TokenBuffer()
+        types = buffer.types.append
+        values = buffer.values.append
+        lines = buffer.lines.append
+        columns = buffer.columns.append
+        # Identifiers share one string per name.
+        names = {}
+        line = firstLine
+        lineStart = -1
+        for match in _MASTER.finditer(program):
+            kind = match.lastgroup
+            if kind == 'ignore':
+                continue
+            if kind == 'newline':
+                line += match.end() - match.start()
+                lineStart = match.end() - 1
+                continue
+            if self.n_errors != 0 and kind != 'error':
+                break
+            text = match.group()
+            if kind == LexerTypes.NAME.name:
+                types(_RESERVED_CODES.get(text, _NAME_CODE))
+                values(names.setdefault(text, text))
+            elif kind == LexerTypes.INTNUM.name:
+                types(_INTNUM_CODE)
+                values(int(text))
+            elif kind == LexerTypes.FLOATNUM.name:
+                types(_FLOATNUM_CODE)
+                values(float(text))
+            elif kind == 'error':
+                self.n_errors += 1
+                self.errorToken = text
+                self.errorLine = line - 1
+                self.errorColumn = match.start() - lineStart
+                continue
+            elif kind == 'literal':
+                types(TOKEN_CODES[text])
+                values(text)
+            else:
+                types(TOKEN_CODES[kind])
+                values(text)
+            lines(line)
+            columns(match.start() - lineStart)
+        return buffer
+
+    def tokenize(self, program: str, firstLine: int = 1) -> BufferStream:
+        """Same as Lexer.tokenize, the parser reads the stream returned."""
+        return BufferStream(self.scan(program, firstLine))
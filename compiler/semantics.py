@@ -1,4 +1,5 @@
 from typing import List
+from compiler import operators, walker
 from compiler.parser import ASTNode, ASTTypes, SymbolTable, Variable, VariableTypes
 
 
@@ -8,23 +9,31 @@ class SemanticError(Exception):
 
 class SemanticAnalyzer:
 
-    declarationTypes = [ASTTypes.INT_DCL, ASTTypes.FLOAT_DCL,
-                        ASTTypes.STRING_DCL, ASTTypes.BOOL_DCL, ASTTypes.REASSIGN]
-    algebraOp = [ASTTypes.SUM, ASTTypes.SUBSTRACT,
-                 ASTTypes.MULTIPLICATION, ASTTypes.DIVISION, ASTTypes.EXPONENT, ASTTypes.UMINUS]
-    comparisonOp = [ASTTypes.CMP_EQUAL, ASTTypes.CMP_NOT_EQUAL, ASTTypes.CMP_GREATER_EQUAL,
-                    ASTTypes.CMP_LESS_EQUAL, ASTTypes.CMP_GREATER, ASTTypes.CMP_LESS]
-    boolOp = [ASTTypes.AND_OP, ASTTypes.OR_OP]
-    typeNodes = [ASTTypes.INT, ASTTypes.FLOAT, ASTTypes.STRING,
-                 ASTTypes.BOOL_FALSE, ASTTypes.BOOL_TRUE]
+    declarationTypes = frozenset([ASTTypes.INT_DCL, ASTTypes.FLOAT_DCL,
+                                  ASTTypes.STRING_DCL, ASTTypes.BOOL_DCL, ASTTypes.REASSIGN])
+    algebraOp = operators.ALGEBRA_OPS
+    comparisonOp = operators.COMPARISON_OPS
+    boolOp = operators.BOOL_OPS
+    typeNodes = frozenset([ASTTypes.INT, ASTTypes.FLOAT, ASTTypes.STRING,
+                           ASTTypes.BOOL_FALSE, ASTTypes.BOOL_TRUE])
 
     def __init__(self, root: ASTNode, progLines: List[str]) -> None:
         self.root = root
         self.progLines = progLines
         self.error = None
+        # Scopes indexed by scope id, variables are reached through the
+        # (scope id, slot) binding the parser left on each name node.
+        self.scopes = []
+        if root.symbolTable != None:
+            walker.walk(root.symbolTable, self._registerScope)
+
+    def _registerScope(self, symbolTable: SymbolTable):
+        while len(self.scopes) <= symbolTable.scopeId:
+            self.scopes.append(None)
+        self.scopes[symbolTable.scopeId] = symbolTable
 
     def checkSemantics(self):
-        self._checkSemanticsHelper(self.root)
+        walker.run(self._checkSemanticsHelper(self.root))
         return self.root
 
     def _getReassingType(self, varType: VariableTypes):
@@ -37,28 +46,25 @@ class SemanticAnalyzer:
         elif varType == VariableTypes.BOOL:
             return ASTTypes.BOOL_DCL
 
-    def _checkSemanticsHelper(self, currentNode: ASTNode, symbolTable: SymbolTable = None):
+    def _checkSemanticsHelper(self, currentNode: ASTNode):
+        # Generator pass driven by walker.run, yield replaces recursion.
         nodeType = currentNode.type
-        if nodeType == ASTTypes.BLOCK:
-            symbolTable = currentNode.symbolTable
-        elif nodeType in self.declarationTypes:
+        if nodeType in self.declarationTypes:
             # Assign > Operations[]
             if len(currentNode.children) == 0:
                 return
             baseOperation = currentNode.children[0].children[0]
-            self._updateAlgebraNodeValues(baseOperation, symbolTable)
+            yield self._updateAlgebraNodeValues(baseOperation)
             newType = baseOperation.variableType
             newValue = baseOperation.variableValue
             if nodeType == ASTTypes.REASSIGN:
                 # If no error it means it exists
-                variable = self._searchVariableValue(
-                    currentNode.variableName, symbolTable, currentNode.lineno)
+                variable = self._searchVariableValue(currentNode)
                 reassingType = self._getReassingType(variable.type)
                 baseOperation = self._checkTypeAssignment(
                     baseOperation, reassingType, newType, currentNode.lineno, newValue)
                 variable.value = baseOperation.variableValue
-                self._updateVariableValue(
-                    currentNode.variableName, variable, symbolTable, currentNode.lineno)
+                self._updateVariableValue(currentNode, variable)
             else:
                 baseOperation = self._checkTypeAssignment(
                     baseOperation, currentNode.type, newType, currentNode.lineno, newValue)
@@ -71,13 +77,12 @@ class SemanticAnalyzer:
             currentNode.variableType = newType
             currentNode.variableValue = newValue
             if nodeType != ASTTypes.REASSIGN:
-                symbolTable.table[currentNode.variableName].value = newValue
+                self._searchVariableValue(currentNode).value = newValue
             return
         elif nodeType == ASTTypes.PRINT:
             base = currentNode.children[0]
             if base.type == ASTTypes.VARIABLE:
-                variable = self._searchVariableValue(
-                    base.variableName, symbolTable, currentNode.lineno)
+                variable = self._searchVariableValue(base)
                 if variable.value == None:
                     self._addError(
                         f'Variable {base.variableName} has not been initialized', base.lineno)
@@ -86,12 +91,13 @@ class SemanticAnalyzer:
                 currentNode.variableType = base.variableType
                 currentNode.variableName = base.variableName
                 currentNode.variableValue = base.variableValue
-            self._updateAlgebraNodeValues(base, symbolTable)
+            yield self._updateAlgebraNodeValues(base)
         elif nodeType in SemanticAnalyzer.comparisonOp or nodeType in SemanticAnalyzer.boolOp:
-            self._updateAlgebraNodeValues(currentNode, symbolTable)
+            yield self._updateAlgebraNodeValues(currentNode)
             return
         for c in currentNode.children:
-            self._checkSemanticsHelper(c, symbolTable)
+            if c.type not in self.typeNodes:
+                yield self._checkSemanticsHelper(c)
 
     def _checkTypeAssignment(self, node: ASTNode, dclType: ASTTypes, newType: VariableTypes, lineno: int, newValue):
         if dclType == ASTTypes.INT_DCL and newType != VariableTypes.INT:
@@ -116,262 +122,86 @@ class SemanticAnalyzer:
         return ASTNode(ASTTypes.INT_TO_FLOAT, children=[node],
                        variableType=VariableTypes.FLOAT, variableValue=node.variableValue)
 
-    def _updateAlgebraNodeValues(self, operation: ASTNode, symbolTable: SymbolTable):
-        if not (operation.type in self.algebraOp or
-                operation.type in self.comparisonOp or
-                operation.type in self.boolOp):
+    def _updateAlgebraNodeValues(self, operation: ASTNode):
+        # Generator pass driven by walker.run, yield replaces recursion.
+        if operation.type not in operators.RULE_OPS:
             return
         elif operation.type == ASTTypes.UMINUS:
             uminusnode = operation.children[0]
             if uminusnode.variableValue == None:
-                self._updateAlgebraNodeValues(uminusnode, symbolTable)
-            if uminusnode.variableType in [VariableTypes.BOOL, VariableTypes.STRING]:
-                self._addError(
-                    f'Invalid operation "-{uminusnode.variableValue}"', operation.lineno)
-            operation.variableType = uminusnode.variableType
-            operation.variableValue = -uminusnode.variableValue
+                yield self._updateAlgebraNodeValues(uminusnode)
+            if uminusnode.type == ASTTypes.VARIABLE:
+                self._loadVariableValue(uminusnode)
+            rule = operators.lookup(
+                operation.type, uminusnode.variableType)
+            if rule == None:
+                self._addError(operators.errorMessage(
+                    operation.type, uminusnode.variableValue), operation.lineno)
+            operation.variableType = rule.resultType
+            operation.variableValue = rule.evaluate(
+                uminusnode.variableValue, None)
             return
         leftNode = operation.children[0]
         rightNode = operation.children[1]
         # Having no value means that it needs to be calculated.
         if leftNode.variableValue == None:
-            self._updateAlgebraNodeValues(leftNode, symbolTable)
+            yield self._updateAlgebraNodeValues(leftNode)
         if rightNode.variableValue == None:
-            self._updateAlgebraNodeValues(rightNode, symbolTable)
+            yield self._updateAlgebraNodeValues(rightNode)
         if leftNode.type == ASTTypes.VARIABLE:
-            resultVariable = self._searchVariableValue(
-                leftNode.variableName, symbolTable, leftNode.lineno)
-            if resultVariable.value == None:
-                self._addError(
-                    f'Variable {leftNode.variableName} has not been initialized', leftNode.lineno)
-            leftNode.variableType = resultVariable.type
-            leftNode.variableValue = resultVariable.value
+            self._loadVariableValue(leftNode)
         if rightNode.type == ASTTypes.VARIABLE:
-            resultVariable = self._searchVariableValue(
-                rightNode.variableName, symbolTable, rightNode.lineno)
-            rightNode.variableType = resultVariable.type
-            rightNode.variableValue = resultVariable.value
-            if resultVariable.value == None:
-                self._addError(
-                    f'Variable {rightNode.variableName} has not been initialized', rightNode.lineno)
-
-        if operation.type in self.algebraOp:
-            self._checkArithmeticOperation(
-                leftNode, rightNode, operation.type, operation.lineno)
-        elif operation.type in self.comparisonOp:
-            self._checkComparisonOperation(
-                leftNode, rightNode, operation.type, operation.lineno)
-        elif operation.type in self.boolOp:
-            self._checkBoolOperator(
-                leftNode, rightNode, operation.type, operation.lineno)
-        leftType = leftNode.variableType
-        rightType = rightNode.variableType
-        # Do the operation in the values
-        if operation.type == ASTTypes.SUM:
-            if leftType == VariableTypes.STRING or rightType == VariableTypes.STRING:
-                operation.variableValue = str(
-                    leftNode.variableValue) + str(rightNode.variableValue)
-                operation.variableType = VariableTypes.STRING
-            else:
-                operation.variableType = VariableTypes.INT
-                if leftType == VariableTypes.FLOAT or rightType == VariableTypes.FLOAT:
-                    operation.variableType = VariableTypes.FLOAT
-                if operation.variableType == VariableTypes.FLOAT and leftType == VariableTypes.INT:
-                    leftNode = self._createInt2FloatNode(leftNode)
-                    operation.children[0] = leftNode
-                if operation.variableType == VariableTypes.FLOAT and rightType == VariableTypes.INT:
-                    rightNode = self._createInt2FloatNode(rightNode)
-                    operation.children[1] = rightNode
-                operation.variableValue = leftNode.variableValue + rightNode.variableValue
-
-        elif operation.type == ASTTypes.SUBSTRACT:
-            operation.variableType = VariableTypes.INT
-            if leftType == VariableTypes.FLOAT or rightType == VariableTypes.FLOAT:
-                operation.variableType = VariableTypes.FLOAT
-            if operation.variableType == VariableTypes.FLOAT and leftType == VariableTypes.INT:
-                leftNode = self._createInt2FloatNode(leftNode)
-                operation.children[0] = leftNode
-            if operation.variableType == VariableTypes.FLOAT and rightType == VariableTypes.INT:
-                rightNode = self._createInt2FloatNode(rightNode)
-                operation.children[1] = rightNode
-            operation.variableValue = leftNode.variableValue - rightNode.variableValue
-        elif operation.type == ASTTypes.MULTIPLICATION:
-            operation.variableType = VariableTypes.INT
-            if leftType == VariableTypes.FLOAT or rightType == VariableTypes.FLOAT:
-                operation.variableType = VariableTypes.FLOAT
-            if operation.variableType == VariableTypes.FLOAT and leftType == VariableTypes.INT:
-                leftNode = self._createInt2FloatNode(leftNode)
-                operation.children[0] = leftNode
-            if operation.variableType == VariableTypes.FLOAT and rightType == VariableTypes.INT:
-                rightNode = self._createInt2FloatNode(rightNode)
-                operation.children[1] = rightNode
-            operation.variableValue = leftNode.variableValue * rightNode.variableValue
-        elif operation.type == ASTTypes.DIVISION:
-            operation.variableType = VariableTypes.INT
-            if leftType == VariableTypes.FLOAT or rightType == VariableTypes.FLOAT:
-                operation.variableType = VariableTypes.FLOAT
-            if operation.variableType == VariableTypes.FLOAT and leftType == VariableTypes.INT:
-                leftNode = self._createInt2FloatNode(leftNode)
-                operation.children[0] = leftNode
-            if operation.variableType == VariableTypes.FLOAT and rightType == VariableTypes.INT:
-                rightNode = self._createInt2FloatNode(rightNode)
-                operation.children[1] = rightNode
-            val = leftNode.variableValue / rightNode.variableValue
-            if not val.is_integer():
-                # We are going to check the final result during declaration
-                if operation.variableType == VariableTypes.INT:
-                    operation.variableType = VariableTypes.FLOAT
-            else:
-                val = int(val)
-            operation.variableValue = val
-        elif operation.type == ASTTypes.EXPONENT:
-            operation.variableType = VariableTypes.INT
-            if leftType == VariableTypes.FLOAT or rightType == VariableTypes.FLOAT or rightNode.variableValue < 0:
-                operation.variableType = VariableTypes.FLOAT
-            if operation.variableType == VariableTypes.FLOAT and leftType == VariableTypes.INT:
-                leftNode = self._createInt2FloatNode(leftNode)
-                operation.children[0] = leftNode
-            if operation.variableType == VariableTypes.FLOAT and rightType == VariableTypes.INT:
-                rightNode = self._createInt2FloatNode(rightNode)
-                operation.children[1] = rightNode
-            operation.variableValue = pow(
-                leftNode.variableValue, rightNode.variableValue)
-        elif operation.type == ASTTypes.CMP_EQUAL:
-            operation.variableType = VariableTypes.BOOL
-            operation.variableValue = leftNode.variableValue == rightNode.variableValue
-        elif operation.type == ASTTypes.CMP_NOT_EQUAL:
-            operation.variableType = VariableTypes.BOOL
-            operation.variableValue = leftNode.variableValue != rightNode.variableValue
-        elif operation.type == ASTTypes.CMP_GREATER_EQUAL:
-            operation.variableType = VariableTypes.BOOL
-            operation.variableValue = leftNode.variableValue >= rightNode.variableValue
-        elif operation.type == ASTTypes.CMP_LESS_EQUAL:
-            operation.variableType = VariableTypes.BOOL
-            operation.variableValue = leftNode.variableValue <= rightNode.variableValue
-        elif operation.type == ASTTypes.CMP_GREATER:
-            operation.variableType = VariableTypes.BOOL
-            operation.variableValue = leftNode.variableValue > rightNode.variableValue
-        elif operation.type == ASTTypes.CMP_LESS:
-            operation.variableType = VariableTypes.BOOL
-            operation.variableValue = leftNode.variableValue < rightNode.variableValue
-        elif operation.type == ASTTypes.AND_OP:
-            leftValue = leftNode.variableValue
-            rightValue = rightNode.variableValue
-            # This is done to perform operations like "0 and True"
-            # in Python and return bool.
-            if leftValue == 0:
-                leftValue = False
-            if rightValue == 0:
-                rightValue = False
-            operation.variableType = VariableTypes.BOOL
-            operation.variableValue = leftValue and rightValue
-        elif operation.type == ASTTypes.OR_OP:
-            leftValue = leftNode.variableValue
-            rightValue = rightNode.variableValue
-            # This is done to perform operations like "0 and True"
-            # in Python and return bool.
-            if leftValue == 0:
-                leftValue = False
-            if rightValue == 0:
-                rightValue = False
-            operation.variableType = VariableTypes.BOOL
-            operation.variableValue = leftValue or rightValue
-
-    def _checkArithmeticOperation(self, leftNode: ASTNode, rightNode: ASTNode, operation: ASTTypes, lineno: int):
-        numTypes = [VariableTypes.INT, VariableTypes.FLOAT]
-        leftType = leftNode.variableType
-        rightType = rightNode.variableType
-        leftValue = leftNode.variableValue
-        rightValue = rightNode.variableValue
-        bothAreNums = leftType in numTypes and rightType in numTypes
-        if operation == ASTTypes.SUM:
-            if leftType == VariableTypes.BOOL or rightType == VariableTypes.BOOL:
-                self._addError(
-                    f'Cannot sum values "{leftValue}" and "{rightValue}"', lineno)
-        elif operation == ASTTypes.SUBSTRACT:
-            if not(bothAreNums):
-                self._addError(
-                    f'Cannot substract values "{leftValue}" and "{rightValue}"', lineno)
-        elif operation == ASTTypes.MULTIPLICATION:
-            if not(bothAreNums):
-                self._addError(
-                    f'Cannot multiply values "{leftValue}" and "{rightValue}"', lineno)
-        elif operation == ASTTypes.DIVISION:
-            if not(bothAreNums):
-                self._addError(
-                    f'Cannot divide values "{leftValue}" and "{rightValue}"', lineno)
-            elif rightValue == 0:
-                self._addError(
-                    f'{leftValue} / {rightValue} is invalid. Cannot perform division by zero', lineno)
-        elif operation == ASTTypes.EXPONENT:
-            if not(bothAreNums):
-                self._addError(
-                    f'Cannot get the exponent of "{leftValue}" ^ "{rightValue}"', lineno)
-
-    def _checkComparisonOperation(self, leftNode: ASTNode, rightNode: ASTNode, operation: ASTTypes, lineno: int):
-        numTypes = [VariableTypes.INT, VariableTypes.FLOAT]
-        leftType = leftNode.variableType
-        rightType = rightNode.variableType
-        leftValue = leftNode.variableValue
-        rightValue = rightNode.variableValue
-        areNumAndStrings = (leftType in numTypes and rightType == VariableTypes.STRING) or (
-            rightType in numTypes and leftType == VariableTypes.STRING)
-        areBoolsOrStrs = leftType == VariableTypes.BOOL or rightType == VariableTypes.BOOL or leftType == VariableTypes.STRING or rightType == VariableTypes.STRING
-        if operation == ASTTypes.CMP_EQUAL:
-            if areNumAndStrings:
-                self._addError(
-                    f'Cannot do "{leftValue}" == "{rightValue}". Mismatching types.', lineno)
-        elif operation == ASTTypes.CMP_NOT_EQUAL:
-            if areNumAndStrings:
-                self._addError(
-                    f'Cannot do "{leftValue}" != "{rightValue}". Mismatching types', lineno)
-        elif operation == ASTTypes.CMP_GREATER_EQUAL:
-            if areBoolsOrStrs:
-                self._addError(
-                    f'Cannot do "{leftValue}" >= "{rightValue}". Mismatching types', lineno)
-        elif operation == ASTTypes.CMP_LESS_EQUAL:
-            if areBoolsOrStrs:
-                self._addError(
-                    f'Cannot do "{leftValue}" <= "{rightValue}". Mismatching types', lineno)
-        elif operation == ASTTypes.CMP_GREATER:
-            if areBoolsOrStrs:
-                self._addError(
-                    f'Cannot do "{leftValue}" > "{rightValue}". Mismatching types', lineno)
-        elif operation == ASTTypes.CMP_LESS:
-            if areBoolsOrStrs:
-                self._addError(
-                    f'Cannot do "{leftValue}" < "{rightValue}". Mismatching types', lineno)
+            self._loadVariableValue(rightNode)
 
-    def _checkBoolOperator(self, leftNode: ASTNode, rightNode: ASTNode, operation: ASTTypes, lineno: int):
-        numTypes = [VariableTypes.INT, VariableTypes.FLOAT]
-        leftType = leftNode.variableType
-        rightType = rightNode.variableType
         leftValue = leftNode.variableValue
         rightValue = rightNode.variableValue
-        areNumAndBools = (leftType in numTypes and rightType == VariableTypes.BOOL) or (
-            rightType in numTypes and leftType == VariableTypes.BOOL)
-        bothBools = (leftType == VariableTypes.BOOL and rightType ==
-                     VariableTypes.BOOL)
-        if not (areNumAndBools or bothBools):
+        rule = operators.lookup(
+            operation.type, leftNode.variableType, rightNode.variableType)
+        if rule == None:
+            self._addError(operators.errorMessage(
+                operation.type, leftValue, rightValue), operation.lineno)
+        if operation.type == ASTTypes.DIVISION and rightValue == 0:
+            self._addError(
+                f'{leftValue} / {rightValue} is invalid. Cannot perform division by zero', operation.lineno)
+        if rule.negativeExponent != None and rightValue < 0:
+            rule = rule.negativeExponent
+        # Do the operation in the values
+        if rule.coerceLeft:
+            leftNode = self._createInt2FloatNode(leftNode)
+            operation.children[0] = leftNode
+        if rule.coerceRight:
+            rightNode = self._createInt2FloatNode(rightNode)
+            operation.children[1] = rightNode
+        value = rule.evaluate(leftNode.variableValue, rightNode.variableValue)
+        operation.variableType = rule.resultType
+        # We are going to check the final result during declaration
+        if rule.resultType == VariableTypes.INT and isinstance(value, float):
+            operation.variableType = VariableTypes.FLOAT
+        operation.variableValue = value
+
+    def _loadVariableValue(self, node: ASTNode):
+        variable = self._searchVariableValue(node)
+        if variable.value == None:
             self._addError(
-                f'Cannot perform boolean operation on "{leftValue}" and "{rightValue}"', lineno)
+                f'Variable {node.variableName} has not been initialized', node.lineno)
+        node.variableType = variable.type
+        node.variableValue = variable.value
 
-    def _searchVariableValue(self, name: str, symbolTable: SymbolTable, lineno: int) -> Variable:
-        currentSymbolTable = symbolTable
-        while currentSymbolTable != None:
-            if name in currentSymbolTable.table:
-                return currentSymbolTable.table[name]
-            currentSymbolTable = currentSymbolTable.parent
-        self._addError(f'Cannot find value {name} in any scope.', lineno)
+    def _searchVariableValue(self, node: ASTNode) -> Variable:
+        if node.binding == None:
+            self._addError(
+                f'Cannot find value {node.variableName} in any scope.', node.lineno)
+        scopeId, slot = node.binding
+        return self.scopes[scopeId].slots[slot]
 
-    def _updateVariableValue(self, name: str, newValue: Variable, symbolTable: SymbolTable, lineno: int):
-        currentSymbolTable = symbolTable
-        while currentSymbolTable != None:
-            if name in currentSymbolTable.table:
-                currentSymbolTable.table[name] = newValue
-                return
-            currentSymbolTable = currentSymbolTable.parent
-        self._addError(f'Cannot find value {name} in any scope.', lineno)
+    def _updateVariableValue(self, node: ASTNode, newValue: Variable):
+        if node.binding == None:
+            self._addError(
+                f'Cannot find value {node.variableName} in any scope.', node.lineno)
+        scopeId, slot = node.binding
+        scope = self.scopes[scopeId]
+        scope.slots[slot] = newValue
+        scope.table[node.variableName] = newValue
 
     def _addError(self, error: str, lineNumber: int = None):
         if lineNumber:
@@ -0,0 +1,227 @@
+import errno
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+from compiler import pipeline
+from compiler.cache import CompileCache
+from compiler.ir import serialize
+from compiler.lexer import Lexer
+
+# Big endian length of the JSON body that follows it.
+HEADER = struct.Struct('>I')
+# Larger messages are refused, the length is probably garbage.
+MAX_MESSAGE = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def _receiveExactly(connection: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = connection.recv(min(size, 1 << 20))
+        if not chunk:
+            raise EOFError()
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def sendMessage(connection: socket.socket, message: dict) -> None:
+    body = json.dumps(message).encode()
+    connection.sendall(HEADER.pack(len(body)) + body)
+
+
+def receiveMessage(connection: socket.socket) -> dict:
+    """Next message of the connection, EOFError when it is closed between
+    messages."""
+    size, = HEADER.unpack(_receiveExactly(connection, HEADER.size))
+    if size > MAX_MESSAGE:
+        raise ProtocolError(f'Message of {size} bytes is too large')
+    try:
+        message = json.loads(_receiveExactly(connection, size))
+    except ValueError as e:
+        raise ProtocolError(f'Invalid JSON message: {e}')
+    if not isinstance(message, dict):
+        raise ProtocolError('Messages must be JSON objects')
+    return message
+
+
+def handleRequest(request: dict, cache: CompileCache = None, lexerClass: type = Lexer) -> dict:
+    """Compiles the source of a request:
+
+    {"source": str, "optimize": bool} -> {"ok": true, "tac": [str], "seconds": float}
+    or {"ok": false, "error": str} for invalid programs. Answers from the
+    cache have "cached": true.
+    """
+    source = request.get('source')
+    if not isinstance(source, str):
+        return {'ok': False, 'error': 'Request without a "source" string'}
+    start = time.perf_counter()
+    optimized = bool(request.get('optimize'))
+    try:
+        if cache != None:
+            entry, cached = cache.lookup(source, optimized, lexerClass)
+            response = {'ok': entry.error == None, 'cached': cached}
+            if entry.error != None:
+                response['error'] = entry.error
+            else:
+                response['tac'] = entry.tac
+            response['seconds'] = time.perf_counter() - start
+            return response
+        instructions = pipeline.compileSource(source, optimized, lexerClass)
+    except pipeline.CompileError as e:
+        return {'ok': False, 'error': str(e), 'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'ok': False, 'error': f'{type(e).__name__}: {e}', 'seconds': time.perf_counter() - start}
+    return {'ok': True, 'tac': serialize(instructions), 'seconds': time.perf_counter() - start}
+
+
+def _removeStaleSocket(path: str) -> None:
+    """Removes the socket at path left behind by a server that did not stop
+    cleanly. Raises OSError EADDRINUSE when path is anything else, or a
+    socket a server still accepts connections on."""
+    try:
+        status = os.stat(path)
+    except FileNotFoundError:
+        return
+    if stat.S_ISSOCK(status.st_mode):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+        finally:
+            probe.close()
+    raise OSError(errno.EADDRINUSE, os.strerror(errno.EADDRINUSE), path)
+
+
+class _CompileHandler(socketserver.BaseRequestHandler):
+    """Answers the requests of one connection in order until the client
+    closes it."""
+
+    def handle(self) -> None:
+        while True:
+            try:
+                request = receiveMessage(self.request)
+            except (EOFError, ConnectionError):
+                return
+            except ProtocolError as e:
+                sendMessage(self.request, {'ok': False, 'error': str(e)})
+                return
+            if request.get('command') == 'shutdown':
+                sendMessage(self.request, {'ok': True})
+                self.server.stop()
+                return
+            with self.server.busy:
+                stopping = self.server.stopping
+                if not stopping:
+                    self.server.requests += 1
+            if stopping:
+                try:
+                    sendMessage(self.request, {'ok': False, 'error': 'Server is shutting down'})
+                except ConnectionError:
+                    pass
+                return
+            try:
+                sendMessage(self.request, handleRequest(request, self.server.cache, self.server.lexerClass))
+            except ConnectionError:
+                return
+            finally:
+                with self.server.busy:
+                    self.server.requests -= 1
+                    self.server.busy.notify_all()
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Compile daemon on a Unix socket.
+
+    The lexer regexes and parse tables are built once when it starts, so
+    requests only pay for lexing, parsing, the semantic pass and the TAC.
+    Every connection is served by its own thread and can send any number
+    of length prefixed JSON requests (see handleRequest). A shutdown
+    command, SIGINT or SIGTERM stop accepting connections and requests,
+    the requests in progress are answered before serve returns. With a
+    cache, requests for sources compiled before are answered from it.
+    Sources are lexed by lexerClass.
+    """
+    # Idle connections do not keep the process alive.
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, path: str, cache: CompileCache = None, lexerClass: type = Lexer) -> None:
+        pipeline.warmUp()
+        self.cache = cache
+        self.lexerClass = lexerClass
+        self.stopping = False
+        # Requests being compiled, guarded by busy.
+        self.requests = 0
+        self.busy = threading.Condition()
+        _removeStaleSocket(path)
+        super().__init__(path, _CompileHandler)
+        self.path = path
+        # Identity of the socket file bound, another server may replace it.
+        status = os.stat(path)
+        self.socketFile = (status.st_dev, status.st_ino)
+
+    def stop(self) -> None:
+        """Stops serve_forever from any thread, signal handlers included."""
+        with self.busy:
+            self.stopping = True
+        threading.Thread(target=self.shutdown).start()
+
+    def waitForRequests(self) -> None:
+        with self.busy:
+            self.busy.wait_for(lambda: self.requests == 0)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if (status.st_dev, status.st_ino) == self.socketFile:
+            os.unlink(self.path)
+
+
+def serve(path: str, cache: CompileCache = None, lexerClass: type = Lexer) -> None:
+    """Serves compile requests on path until a shutdown command or signal."""
+    with CompileServer(path, cache, lexerClass) as server:
+        for signalNumber in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signalNumber, lambda number, frame: server.stop())
+        server.serve_forever()
+        server.waitForRequests()
+
+
+class CompileClient:
+    """Connection to a CompileServer, requests are answered in order."""
+
+    def __init__(self, path: str, timeout: float = None) -> None:
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.settimeout(timeout)
+        self.connection.connect(path)
+
+    def compile(self, source: str, optimize: bool = False) -> dict:
+        sendMessage(self.connection, {'source': source, 'optimize': optimize})
+        return receiveMessage(self.connection)
+
+    def shutdown(self) -> None:
+        sendMessage(self.connection, {'command': 'shutdown'})
+        receiveMessage(self.connection)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,4 +1,6 @@
 from typing import List
+from compiler import ir, operators, walker
+from compiler.ir import Constant, Instruction, Label, Opcode, Temp
 from compiler.parser import ASTNode, ASTTypes, VariableTypes
 from compiler.semantics import SemanticAnalyzer
 
@@ -9,278 +11,200 @@ class TACProcessor:
         self.astroot = astroot
         self.tmpGen = self._tempGenerator()
         self.labelGen = self._labelGenerator()
+        # Flat instruction buffer, only ever appended to in program order.
+        self.instructions = []
 
-    def _tempGenerator(self) -> str:
-        """Generates temporal variable names."""
+    def _tempGenerator(self) -> int:
+        """Generates temporal variable numbers."""
         counter = 0
         while True:
-            yield f"t{counter}"
+            yield counter
             counter += 1
 
-    def _labelGenerator(self) -> str:
-        """Generates temporal labels."""
+    def _labelGenerator(self) -> int:
+        """Generates temporal label numbers."""
         counter = 0
         while True:
-            yield f"L{counter}"
+            yield counter
             counter += 1
 
-    def _getNodeValue(self, node: ASTNode):
+    def _newTemp(self) -> Temp:
+        return Temp(next(self.tmpGen))
+
+    def _emit(self, opcode: Opcode, dst=None, left=None, right=None, type: VariableTypes = None) -> None:
+        self.instructions.append(Instruction(opcode, dst, left, right, type))
+
+    def _getOperand(self, node: ASTNode):
         if node.type == ASTTypes.VARIABLE:
             return node.variableName
         else:
-            return node.variableValue
-
-    def _getOperatorString(self, nodeType: ASTTypes):
-        if nodeType == ASTTypes.SUM:
-            return '+'
-        elif nodeType == ASTTypes.SUBSTRACT:
-            return '-'
-        elif nodeType == ASTTypes.MULTIPLICATION:
-            return '*'
-        elif nodeType == ASTTypes.DIVISION:
-            return '/'
-        elif nodeType == ASTTypes.EXPONENT:
-            return '^'
-        elif nodeType == ASTTypes.CMP_EQUAL:
-            return '=='
-        elif nodeType == ASTTypes.CMP_NOT_EQUAL:
-            return '!='
-        elif nodeType == ASTTypes.CMP_GREATER_EQUAL:
-            return '>='
-        elif nodeType == ASTTypes.CMP_LESS_EQUAL:
-            return '<='
-        elif nodeType == ASTTypes.CMP_GREATER:
-            return '>'
-        elif nodeType == ASTTypes.CMP_LESS:
-            return '<'
-        elif nodeType == ASTTypes.AND_OP:
-            return 'and'
-        elif nodeType == ASTTypes.OR_OP:
-            return 'or'
+            return Constant(node.variableValue, node.variableType)
 
-    def _generateAlgebraTAC(self, node: ASTNode, currentLines: List[str]):
+    def _generateAlgebraTAC(self, node: ASTNode):
+        # Generator pass driven by walker.run, yield replaces recursion.
         if node.type == ASTTypes.INT_TO_FLOAT:
             innerNode = node.children[0]
-            val = self._getNodeValue(innerNode)
-            if innerNode.type in SemanticAnalyzer.algebraOp:
-                val = self._generateAlgebraTAC(innerNode, currentLines)
-            tmpVar = next(self.tmpGen)
-            currentLines.append(f'{tmpVar} = toFloat {val}')
+            val = self._getOperand(innerNode)
+            if innerNode.type in operators.ALGEBRA_OPS:
+                val = yield self._generateAlgebraTAC(innerNode)
+            tmpVar = self._newTemp()
+            self._emit(Opcode.TO_FLOAT, tmpVar, val,
+                       type=VariableTypes.FLOAT)
             return tmpVar
         if node.type == ASTTypes.UMINUS:
             innerNode = node.children[0]
-            val = self._getNodeValue(innerNode)
-            if innerNode.type in SemanticAnalyzer.algebraOp or innerNode.type == ASTTypes.INT_TO_FLOAT:
-                val = self._generateAlgebraTAC(innerNode, currentLines)
-            tmpVar = next(self.tmpGen)
-            currentLines.append(f'{tmpVar} = -{val}')
+            val = self._getOperand(innerNode)
+            if innerNode.type in operators.ALGEBRA_OPS or innerNode.type == ASTTypes.INT_TO_FLOAT:
+                val = yield self._generateAlgebraTAC(innerNode)
+            tmpVar = self._newTemp()
+            self._emit(Opcode.NEG, tmpVar, val, type=node.variableType)
             return tmpVar
         if node.type == ASTTypes.VARIABLE:
-            return self._getNodeValue(node)
+            return self._getOperand(node)
         leftNode = node.children[0]
         rightNode = node.children[1]
-        leftVar = self._getNodeValue(leftNode)
-        rightVar = self._getNodeValue(rightNode)
-        if leftNode.type == ASTTypes.STRING:
-            leftVar = f'"{leftVar}"'
-        if rightNode.type == ASTTypes.STRING:
-            rightVar = f'"{rightVar}"'
-        if leftNode.type in SemanticAnalyzer.algebraOp or leftNode.type == ASTTypes.INT_TO_FLOAT or \
-                leftNode.type in SemanticAnalyzer.comparisonOp or leftNode.type in SemanticAnalyzer.boolOp:
-            leftVar = self._generateAlgebraTAC(leftNode, currentLines)
-        if rightNode.type in SemanticAnalyzer.algebraOp or rightNode.type == ASTTypes.INT_TO_FLOAT or \
-                rightNode.type in SemanticAnalyzer.comparisonOp or rightNode.type in SemanticAnalyzer.boolOp:
-            rightVar = self._generateAlgebraTAC(rightNode, currentLines)
-        tmpVar = next(self.tmpGen)
-        op = self._getOperatorString(node.type)
-        currentLines.append(f'{tmpVar} = {leftVar} {op} {rightVar}')
+        leftVar = self._getOperand(leftNode)
+        rightVar = self._getOperand(rightNode)
+        if leftNode.type in operators.EXPRESSION_OPS:
+            leftVar = yield self._generateAlgebraTAC(leftNode)
+        if rightNode.type in operators.EXPRESSION_OPS:
+            rightVar = yield self._generateAlgebraTAC(rightNode)
+        tmpVar = self._newTemp()
+        self._emit(ir.BINARY_OPCODES[node.type], tmpVar, leftVar, rightVar,
+                   type=node.variableType)
         return tmpVar
 
-    def _getDclTypeString(self, type: VariableTypes):
-        if type == VariableTypes.INT:
-            return 'declareint'
-        elif type == VariableTypes.FLOAT:
-            return 'declarefloat'
-        elif type == VariableTypes.STRING:
-            return 'declarestring'
-        elif type == VariableTypes.BOOL:
-            return 'declarebool'
+    def _generateConditionTAC(self, node: ASTNode, copyVariable: bool = True):
+        """Emits a condition and returns the operand holding its value.
 
-    def _createDeclarationLines(self, type: VariableTypes, name: str, value):
-        lines = []
-        lines.append(f'{self._getDclTypeString(type)} {name}')
-        lines.append(f'{name} = {value}')
-        return lines
+        Literal conditions, and variables unless copyVariable is False, are
+        copied into a temporal first.
+        """
+        if node.type in operators.CONDITION_OPS or (node.type == ASTTypes.VARIABLE and not copyVariable):
+            return (yield self._generateAlgebraTAC(node))
+        tmpVar = self._newTemp()
+        self._emit(Opcode.COPY, tmpVar, self._getOperand(node),
+                   type=node.variableType)
+        return tmpVar
 
-    def _generateTACHelper(self, node: ASTNode, currentLines: List[str]):
+    def _generateTACHelper(self, node: ASTNode):
+        # Generator pass driven by walker.run, yield replaces recursion.
+        # Instructions go straight into self.instructions in program order,
+        # temporals and labels whose number is only known later are
+        # created empty and numbered at that point.
         if node.type in SemanticAnalyzer.declarationTypes:
             # Assign > First operation
             if len(node.children) == 0:
-                currentLines.append(
-                    f'{self._getDclTypeString(node.variableType)} {node.variableName}')
+                self._emit(Opcode.DECLARE, node.variableName,
+                           type=node.variableType)
                 return
             firstop = node.children[0].children[0]
-            if firstop.type in SemanticAnalyzer.algebraOp or firstop.type == ASTTypes.INT_TO_FLOAT or \
-                    firstop.type in SemanticAnalyzer.comparisonOp or firstop.type in SemanticAnalyzer.boolOp:
-                tmpVar = self._generateAlgebraTAC(firstop, currentLines)
-            else:
-                tmpVar = self._getNodeValue(node)
-                if firstop.type == ASTTypes.STRING:
-                    tmpVar = f'"{tmpVar}"'
-            if node.type == ASTTypes.REASSIGN:
-                currentLines.append(f'{node.variableName} = {tmpVar}')
+            if firstop.type in operators.EXPRESSION_OPS:
+                tmpVar = yield self._generateAlgebraTAC(firstop)
             else:
-                currentLines.extend(self._createDeclarationLines(
-                    node.variableType, node.variableName, tmpVar))
+                tmpVar = self._getOperand(firstop)
+            if node.type != ASTTypes.REASSIGN:
+                self._emit(Opcode.DECLARE, node.variableName,
+                           type=node.variableType)
+            self._emit(Opcode.COPY, node.variableName, tmpVar,
+                       type=node.variableType)
         elif node.type == ASTTypes.PRINT:
             printChild = node.children[0]
-            if printChild.type in SemanticAnalyzer.algebraOp or printChild.type == ASTTypes.INT_TO_FLOAT or \
-                    printChild.type in SemanticAnalyzer.comparisonOp or printChild.type in SemanticAnalyzer.boolOp:
-                tmpVar = self._generateAlgebraTAC(printChild, currentLines)
+            if printChild.type in operators.EXPRESSION_OPS:
+                tmpVar = yield self._generateAlgebraTAC(printChild)
             else:
-                tmpVar = self._getNodeValue(printChild)
-                if printChild.type == ASTTypes.STRING:
-                    tmpVar = f'"{tmpVar}"'
-            currentLines.append(f'print {tmpVar}')
+                tmpVar = self._getOperand(printChild)
+            self._emit(Opcode.PRINT, left=tmpVar, type=printChild.variableType)
         elif node.type == ASTTypes.IF_STATEMENT:
-            # Get the if information
-            ifNode = node.children[0]
-            ifCondition = []
-            condType = ifNode.children[0].type
-            if condType in SemanticAnalyzer.comparisonOp or condType in SemanticAnalyzer.boolOp:
-                ifVar = self._generateAlgebraTAC(
-                    ifNode.children[0], ifCondition)
-            else:
-                ifCondVarValue = self._getNodeValue(ifNode.children[0])
-                ifVar = next(self.tmpGen)
-                ifCondition.append(f'{ifVar} = {ifCondVarValue}')
-            # ifVar = self._generateAlgebraTAC(ifNode.children[0], ifCondition)
-            ifBlockLines = []
-            self._generateTACHelper(ifNode.children[1], ifBlockLines)
-            # Define elements
-            conditions = [ifCondition]
-            conditionsVar = [ifVar]
-            conditionLines = [ifBlockLines]
-            conditionLabel = []
-            for i in range(1, len(node.children)):
-                currentNode = node.children[i]
-                if currentNode.type == ASTTypes.ELSE:
-                    conditionLabel.append(next(self.labelGen))
-                    elseLines = []
-                    self._generateTACHelper(currentNode.children[0], elseLines)
-                    conditionLines.append(elseLines)
-                # Process elifs
-                else:
-                    # Process condition
-                    init = []
-                    elifcondtype = currentNode.children[0].type
-                    if elifcondtype in SemanticAnalyzer.comparisonOp or elifcondtype in SemanticAnalyzer.boolOp:
-                        cvar = self._generateAlgebraTAC(
-                            currentNode.children[0], init)
-                    else:
-                        elifCondVarValue = self._getNodeValue(
-                            currentNode.children[0])
-                        cvar = next(self.tmpGen)
-                        init.append(f'{cvar} = {elifCondVarValue}')
-                    # cvar = self._generateAlgebraTAC(
-                    #     currentNode.children[0], init)
-                    conditions.append(init)
-                    conditionsVar.append(cvar)
-                    # Create next label
-                    conditionLabel.append(next(self.labelGen))
-                    # Process block lines
-                    elifLines = []
-                    self._generateTACHelper(currentNode.children[1], elifLines)
-                    conditionLines.append(elifLines)
-
-            continueLabel = None
-            if len(conditionLines) > 1:
-                continueLabel = next(self.labelGen)
-            else:
-                conditionLabel.append(next(self.labelGen))
-            for i in range(len(conditionLines)):
-                # If it's in the end, it means it's an else
-                if i == len(conditionLines) - 1 and len(conditionLines) > 1:
-                    currentLines.extend(conditionLines[i])
+            # Every branch but the else checks its condition and jumps to
+            # the next branch when it fails, each branch label is numbered
+            # when the next branch starts and the negated conditions after
+            # all the branches.
+            hasManyBranches = len(node.children) > 1
+            continueLabel = Label() if hasManyBranches else None
+            nextBranchLabel = None
+            notTemps = []
+            for branch in node.children:
+                if branch.type == ASTTypes.ELSE:
+                    nextBranchLabel.index = next(self.labelGen)
+                    yield self._generateTACHelper(branch.children[0])
+                    nextBranchLabel = None
                     continue
-                conditionVar = next(self.tmpGen)
-                currentLines.extend(conditions[i])
-                currentLines.append(f'{conditionVar} = not {conditionsVar[i]}')
-                currentLines.append(
-                    f'{conditionVar} IFGOTO {conditionLabel[i]}')
-                currentLines.extend(conditionLines[i])
-                if len(conditionLines) > 1:
-                    currentLines.append(f'GOTO {continueLabel}')
-                currentLines.append(f'LABEL {conditionLabel[i]}')
+                condVar = yield self._generateConditionTAC(branch.children[0])
+                if nextBranchLabel != None:
+                    nextBranchLabel.index = next(self.labelGen)
+                notTemp = Temp()
+                notTemps.append(notTemp)
+                nextBranchLabel = Label()
+                self._emit(Opcode.NOT, notTemp, condVar,
+                           type=VariableTypes.BOOL)
+                self._emit(Opcode.IFGOTO, nextBranchLabel, notTemp)
+                yield self._generateTACHelper(branch.children[1])
+                if hasManyBranches:
+                    self._emit(Opcode.GOTO, continueLabel)
+                self._emit(Opcode.LABEL, nextBranchLabel)
+            if nextBranchLabel != None:
+                nextBranchLabel.index = next(self.labelGen)
+            if continueLabel != None:
+                continueLabel.index = next(self.labelGen)
+            for notTemp in notTemps:
+                notTemp.index = next(self.tmpGen)
             if continueLabel != None:
-                currentLines.append(f'LABEL {continueLabel}')
+                self._emit(Opcode.LABEL, continueLabel)
         elif node.type == ASTTypes.WHILE_STATEMENT:
-            condType = node.children[0].type
-            whileCondition = []
-            if condType in SemanticAnalyzer.comparisonOp or condType in SemanticAnalyzer.boolOp or condType == ASTTypes.VARIABLE:
-                whileVar = self._generateAlgebraTAC(
-                    node.children[0], whileCondition)
-            else:
-                whileVarValue = self._getNodeValue(node.children[0])
-                whileVar = next(self.tmpGen)
-                whileCondition.append(f'{whileVar} = {whileVarValue}')
-            whileStartLabel = next(self.labelGen)
-            whileBlockLines = []
-            self._generateTACHelper(node.children[1], whileBlockLines)
-            whileEndLabel = next(self.labelGen)
-            # Start the while loop
-            forCondTmp = next(self.tmpGen)
-            currentLines.append(f'LABEL {whileStartLabel}')
-            currentLines.extend(whileCondition)
-            currentLines.append(f'{forCondTmp} = not {whileVar}')
-            currentLines.append(f'{forCondTmp} IFGOTO {whileEndLabel}')
+            whileStartLabel = Label()
+            self._emit(Opcode.LABEL, whileStartLabel)
+            whileVar = yield self._generateConditionTAC(node.children[0], copyVariable=False)
+            whileStartLabel.index = next(self.labelGen)
+            whileEndLabel = Label()
+            forCondTmp = Temp()
+            self._emit(Opcode.NOT, forCondTmp, whileVar,
+                       type=VariableTypes.BOOL)
+            self._emit(Opcode.IFGOTO, whileEndLabel, forCondTmp)
             # While body
-            currentLines.extend(whileBlockLines)
+            yield self._generateTACHelper(node.children[1])
+            whileEndLabel.index = next(self.labelGen)
+            forCondTmp.index = next(self.tmpGen)
             # End of while
-            currentLines.append(f'GOTO {whileStartLabel}')
-            currentLines.append(f'LABEL {whileEndLabel}')
+            self._emit(Opcode.GOTO, whileStartLabel)
+            self._emit(Opcode.LABEL, whileEndLabel)
         elif node.type == ASTTypes.FOR_STATEMENT:
             forVar = node.children[0]
             forCond = node.children[1]
             forUpdate = node.children[2]
             forBlock = node.children[3]
-            forStartLabel = next(self.labelGen)
-            # Create the variable declaration lines.
-            forVarLines = []
-            self._generateTACHelper(forVar, forVarLines)
-            # Create the conditional lines.
-            forCondLines = []
-            condType = forCond.type
-            if condType in SemanticAnalyzer.comparisonOp or condType in SemanticAnalyzer.boolOp:
-                forCondVar = self._generateAlgebraTAC(
-                    forCond, forCondLines)
-            else:
-                forCondVarValue = self._getNodeValue(forCond)
-                forCondVar = next(self.tmpGen)
-                forCondLines.append(f'{forCondVar} = {forCondVarValue}')
-            # Create the reassign lines.
-            forUpdateLines = []
-            self._generateTACHelper(forUpdate, forUpdateLines)
-            # Create the body lines.
-            forBlockLines = []
-            self._generateTACHelper(forBlock, forBlockLines)
-            # Create the TAC lines.
-            forEndLabel = next(self.labelGen)
-            forCondTmp = next(self.tmpGen)
-            currentLines.extend(forVarLines)
-            currentLines.append(f'LABEL {forStartLabel}')
-            currentLines.extend(forCondLines)
-            currentLines.append(f'{forCondTmp} = not {forCondVar}')
-            currentLines.append(f'{forCondTmp} IFGOTO {forEndLabel}')
-            currentLines.extend(forBlockLines)
-            currentLines.extend(forUpdateLines)
-            currentLines.append(f'GOTO {forStartLabel}')
-            currentLines.append(f'LABEL {forEndLabel}')
+            forStartLabel = Label(next(self.labelGen))
+            # Create the variable declaration instructions.
+            yield self._generateTACHelper(forVar)
+            self._emit(Opcode.LABEL, forStartLabel)
+            # Create the conditional instructions.
+            forCondVar = yield self._generateConditionTAC(forCond)
+            forEndLabel = Label()
+            forCondTmp = Temp()
+            self._emit(Opcode.NOT, forCondTmp, forCondVar,
+                       type=VariableTypes.BOOL)
+            self._emit(Opcode.IFGOTO, forEndLabel, forCondTmp)
+            # The update is numbered before the body but runs after it, it
+            # is the only part generated aside and moved into place.
+            bodyStart = len(self.instructions)
+            yield self._generateTACHelper(forUpdate)
+            forUpdateInstructions = self.instructions[bodyStart:]
+            del self.instructions[bodyStart:]
+            # Create the body instructions.
+            yield self._generateTACHelper(forBlock)
+            self.instructions.extend(forUpdateInstructions)
+            forEndLabel.index = next(self.labelGen)
+            forCondTmp.index = next(self.tmpGen)
+            self._emit(Opcode.GOTO, forStartLabel)
+            self._emit(Opcode.LABEL, forEndLabel)
         else:
             for c in node.children:
-                self._generateTACHelper(c, currentLines)
+                yield self._generateTACHelper(c)
+
+    def generateIR(self) -> List[Instruction]:
+        if not self.instructions:
+            walker.run(self._generateTACHelper(self.astroot))
+        return self.instructions
 
-    def generateTAC(self):
-        lines = []
-        self._generateTACHelper(self.astroot, lines)
-        return lines
+    def generateTAC(self) -> List[str]:
+        return ir.serialize(self.generateIR())
@@ -0,0 +1,93 @@
+import io
+import unittest
+
+from compiler import optimizer
+from compiler.aot import CompiledProgram
+from compiler.ir import Constant, Instruction, Label, Opcode, Temp
+from compiler.parser import VariableTypes
+from compiler.test_optimizer import PROGRAMS, compileProgram, runProgram
+from compiler.vm import VMError
+
+
+class TestAOT(unittest.TestCase):
+
+    def _run(self, instructions):
+        self.program = CompiledProgram(instructions)
+        output = io.StringIO()
+        self.program.run(output)
+        return output.getvalue()
+
+    def testSameOutputAsVM(self):
+        for prog in PROGRAMS:
+            for passes in ([], None):
+                with self.subTest(optimized=passes == None):
+                    instructions = optimizer.optimize(compileProgram(prog), passes)
+                    self.assertEqual(self._run(instructions), runProgram(instructions))
+                    self.assertTrue(self.program.structured)
+
+    def testLoopsBecomeWhile(self):
+        prog = '''int s = 0;
+        for (int i = 0; i < 10; i = i + 1) {
+            s = s + i;
+        }
+        print(s);
+        '''
+        self.assertEqual(self._run(compileProgram(prog)), '45\n')
+        self.assertEqual(self.program.getValue('i'), 10)
+        self.assertIn('while True:', self.program.source)
+        self.assertNotIn('pc', self.program.source)
+
+    def testUnstructuredJumps(self):
+        # A jump into the middle of a loop runs in the dispatch loop.
+        loop, body = Label(0), Label(1)
+        condition = Temp(0)
+        instructions = [
+            Instruction(Opcode.DECLARE, 'a', type=VariableTypes.INT),
+            Instruction(Opcode.COPY, 'a', Constant(0, VariableTypes.INT), type=VariableTypes.INT),
+            Instruction(Opcode.GOTO, body),
+            Instruction(Opcode.LABEL, loop),
+            Instruction(Opcode.PRINT, left='a'),
+            Instruction(Opcode.LABEL, body),
+            Instruction(Opcode.ADD, 'a', 'a', Constant(1, VariableTypes.INT), VariableTypes.INT),
+            Instruction(Opcode.LT, condition, 'a', Constant(4, VariableTypes.INT), VariableTypes.BOOL),
+            Instruction(Opcode.IFGOTO, loop, condition),
+        ]
+        self.assertEqual(self._run(instructions), '1\n2\n3\n')
+        self.assertFalse(self.program.structured)
+
+    def testDeepNesting(self):
+        # Python refuses more than 20 nested loops in a function.
+        prog = 'int a = 0;\n' + 'while (a < 1) {\n' * 30 + 'a = a + 1;\n' + '}\n' * 30 + 'print(a);'
+        self.assertEqual(self._run(compileProgram(prog)), '1\n')
+        self.assertFalse(self.program.structured)
+
+    def testSpecialConstants(self):
+        prog = '''float a = -0.0;
+        string s = "it's " + 5;
+        bool b = 0 < 1 and true;
+        print(a);
+        print(s + a);
+        print(b);
+        '''
+        instructions = compileProgram(prog)
+        self.assertEqual(self._run(instructions), runProgram(instructions))
+
+    def testDivisionByZero(self):
+        prog = '''int a = 1;
+        int b = 1;
+        for (int i = 0; i < 2; i = i + 1) {
+            a = a / b;
+            b = b - 1;
+        }
+        '''
+        with self.assertRaises(VMError):
+            self._run(compileProgram(prog))
+
+    def testIntTooLongToPrint(self):
+        with self.assertRaises(VMError) as context:
+            self._run(compileProgram('int a = 10 ^ 5000;\nprint(a);'))
+        self.assertIn('Compiled program failed', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
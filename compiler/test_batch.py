@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from compiler import batch
+from compiler.ir import serialize
+from compiler.pipeline import CompileError, compileSource
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        os.mkdir(os.path.join(self.root, 'nested'))
+        self.programs = {
+            'a.txt': 'int a = 1;\nprint(a);',
+            'b.txt': 'float b = 2.5;\nprint(b + 1);',
+            'nested/c.txt': 'int c = 3;\nif (c > 2) {\nprint(c);\n}',
+            'bad.txt': 'int a = ;',
+            'undeclared.txt': 'x = 3;',
+        }
+        for name, program in self.programs.items():
+            with open(self._path(name), 'w') as f:
+                f.write(program)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def testExpandPaths(self):
+        manifest = self._path('manifest.lst')
+        with open(manifest, 'w') as f:
+            f.write('# every program\n\nnested/*.txt\na.txt\n')
+        paths = batch.expandPaths([self._path('b.txt'), '@' + manifest,
+                                   os.path.join(self.root, '**', 'c.txt')])
+        self.assertEqual(paths, [self._path('b.txt'), self._path('nested/c.txt'), self._path('a.txt')])
+
+    def testCompileSource(self):
+        self.assertEqual(serialize(compileSource('int a = 1;')), ['declareint a', 'a = 1'])
+        with self.assertRaises(CompileError) as context:
+            compileSource('int a = 1;\nint a = 2;')
+        self.assertIn('already exists', str(context.exception))
+
+    def testKeepsGoingPastErrors(self):
+        names = sorted(self.programs)
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                results = batch.compileBatch([self._path(name) for name in names], jobs=jobs)
+                self.assertEqual([result.path for result in results],
+                                 [self._path(name) for name in names])
+                status = {name: result.ok for name, result in zip(names, results)}
+                self.assertEqual(status, {'a.txt': True, 'b.txt': True, 'nested/c.txt': True,
+                                          'bad.txt': False, 'undeclared.txt': False})
+                self.assertIn('Unexpected symbol', results[names.index('bad.txt')].message)
+        with open(self._path('nested/c.output')) as f:
+            self.assertEqual(f.read().splitlines(),
+                             serialize(compileSource(self.programs['nested/c.txt'])))
+
+    def testCacheOnlyWhenAsked(self):
+        paths = [self._path('a.txt'), self._path('b.txt')]
+        cacheDirectory = self._path('cache')
+        batch.compileBatch(paths, jobs=1, cacheDirectory=cacheDirectory)
+        results = batch.compileBatch(paths, jobs=1, cacheDirectory=cacheDirectory)
+        self.assertEqual([result.cached for result in results], [True, True])
+        # A later batch without a cache does not reuse the previous one.
+        results = batch.compileBatch(paths, jobs=1)
+        self.assertEqual([result.cached for result in results], [False, False])
+        self.assertEqual([result.ok for result in results], [True, True])
+
+    def testMissingFile(self):
+        result = batch.compileFile(self._path('missing.txt'))
+        self.assertFalse(result.ok)
+        self.assertIn('FileNotFoundError', result.message)
+
+
+if __name__ == '__main__':
+    unittest.main()
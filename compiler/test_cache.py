@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from compiler import batch, pipeline
+from compiler.cache import CompileCache
+from compiler.ir import serialize
+from compiler.pipeline import compileSource
+
+PROGRAM = 'int a = 2;\nint b = a * 3;\nprint(b);'
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testMemoryHit(self):
+        cache = CompileCache()
+        entry, cached = cache.lookup(PROGRAM)
+        self.assertFalse(cached)
+        self.assertEqual(entry.tac, serialize(compileSource(PROGRAM)))
+        with mock.patch.object(pipeline, 'compileSource', side_effect=AssertionError):
+            again, cached = cache.lookup(PROGRAM)
+        self.assertTrue(cached)
+        self.assertIs(again, entry)
+        self.assertEqual(cache.stats['hits'], 1)
+        self.assertEqual(cache.stats['memoryHits'], 1)
+        self.assertEqual(cache.stats['misses'], 1)
+
+    def testDiskHit(self):
+        CompileCache(self.root).compile(PROGRAM, True)
+        cache = CompileCache(self.root)
+        with mock.patch.object(pipeline, 'compileSource', side_effect=AssertionError):
+            entry, cached = cache.lookup(PROGRAM, True)
+        self.assertTrue(cached)
+        self.assertEqual(entry.tac, serialize(compileSource(PROGRAM, True)))
+        self.assertEqual(cache.stats['diskHits'], 1)
+        self.assertEqual(cache.stats['misses'], 0)
+
+    def testKeyChanges(self):
+        cache = CompileCache()
+        keys = {cache.key(PROGRAM), cache.key(PROGRAM, True), cache.key(PROGRAM + ' ')}
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(cache.key(PROGRAM), CompileCache().key(PROGRAM))
+
+    def testCachesErrors(self):
+        cache = CompileCache(self.root)
+        entry = cache.compile('int a = 1;\nint a = 2;')
+        self.assertEqual(entry.tac, None)
+        self.assertIn('already exists', entry.error)
+        entry, cached = CompileCache(self.root).lookup('int a = 1;\nint a = 2;')
+        self.assertTrue(cached)
+        self.assertIn('already exists', entry.error)
+
+    def testKeepIR(self):
+        CompileCache(self.root).compile(PROGRAM)
+        cache = CompileCache(self.root, keepIR=True)
+        entry, cached = cache.lookup(PROGRAM)
+        # Entries without the IR do not satisfy caches that run programs.
+        self.assertFalse(cached)
+        self.assertEqual(serialize(entry.instructions), entry.tac)
+        entry, cached = CompileCache(self.root, keepIR=True).lookup(PROGRAM)
+        self.assertTrue(cached)
+        self.assertEqual(serialize(entry.instructions), entry.tac)
+
+    def testEviction(self):
+        cache = CompileCache(self.root, memoryEntries=2, maxBytes=2048)
+        for i in range(40):
+            cache.compile(f'int a = {i};\nprint(a);')
+        self.assertLessEqual(len(cache.memory), 2)
+        self.assertGreater(cache.stats['evictions'], 0)
+        size = sum(os.path.getsize(os.path.join(self.root, name)) for name in os.listdir(self.root))
+        self.assertLessEqual(size, 2048)
+        # The latest entry is kept.
+        self.assertTrue(CompileCache(self.root).lookup('int a = 39;\nprint(a);')[1])
+
+    def testBatch(self):
+        path = os.path.join(self.root, 'a.txt')
+        with open(path, 'w') as f:
+            f.write(PROGRAM)
+        cacheDirectory = os.path.join(self.root, 'cache')
+        first, = batch.compileBatch([path], jobs=1, cacheDirectory=cacheDirectory)
+        second, = batch.compileBatch([path], jobs=1, cacheDirectory=cacheDirectory)
+        self.assertTrue(first.ok and second.ok)
+        self.assertFalse(first.cached)
+        self.assertTrue(second.cached)
+        with open(batch.outputPath(path)) as f:
+            self.assertEqual(f.read().splitlines(), serialize(compileSource(PROGRAM)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+
+from compiler.cfg import ControlFlowGraph
+from compiler.ir import Instruction, Label, Opcode
+from compiler.parser import Parser
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+
+
+class TestCFG(unittest.TestCase):
+
+    def _createCFG(self, prog):
+        parser = Parser(prog)
+        root = parser.parseProgram(prog)
+        SemanticAnalyzer(root, parser.proglines).checkSemantics()
+        return ControlFlowGraph(TACProcessor(root).generateIR())
+
+    def _edges(self, cfg):
+        return [[successor.index for successor in block.successors] for block in cfg.blocks]
+
+    def testStraightLine(self):
+        cfg = self._createCFG('int a = 1;\nprint(a);')
+        self.assertEqual(len(cfg.blocks), 1)
+        self.assertEqual(self._edges(cfg), [[]])
+        self.assertEqual(cfg.naturalLoops(), [])
+
+    def testIfElse(self):
+        prog = '''int a = 1;
+        if (a == 1) {
+            print(1);
+        }
+        else {
+            print(2);
+        }
+        print(3);
+        '''
+        cfg = self._createCFG(prog)
+        # entry + condition, then branch, else branch, join.
+        self.assertEqual(self._edges(cfg), [[1, 2], [3], [3], []])
+        self.assertEqual([block.index for block in cfg.blocks[3].predecessors], [1, 2])
+        self.assertEqual(cfg.immediateDominators(), [0, 0, 0, 0])
+        self.assertTrue(cfg.dominates(cfg.blocks[0], cfg.blocks[3]))
+        self.assertFalse(cfg.dominates(cfg.blocks[1], cfg.blocks[3]))
+        order = [block.index for block in cfg.reversePostorder()]
+        self.assertEqual(order[0], 0)
+        self.assertEqual(order[-1], 3)
+
+    def testNestedLoops(self):
+        prog = '''int s = 0;
+        for (int i = 0; i < 3; i = i + 1) {
+            int j = 0;
+            while (j < i) {
+                s = s + j;
+                j = j + 1;
+            }
+        }
+        print(s);
+        '''
+        cfg = self._createCFG(prog)
+        loops = cfg.naturalLoops()
+        self.assertEqual(len(loops), 2)
+        outer, inner = loops
+        self.assertTrue(inner.blocks < outer.blocks)
+        self.assertEqual(len(outer.latches), 1)
+        for index in outer.blocks:
+            self.assertTrue(cfg.dominates(outer.header, cfg.blocks[index]))
+        exit = cfg.blocks[-1]
+        self.assertNotIn(exit.index, outer.blocks)
+        self.assertEqual(cfg.blockInstructions(exit)[-1].opcode, Opcode.PRINT)
+
+    def testUnreachableBlock(self):
+        end = Label(0)
+        instructions = [
+            Instruction(Opcode.GOTO, end),
+            Instruction(Opcode.PRINT, left='a'),
+            Instruction(Opcode.LABEL, end),
+        ]
+        cfg = ControlFlowGraph(instructions)
+        self.assertEqual(self._edges(cfg), [[2], [2], []])
+        self.assertEqual(cfg.immediateDominators(), [0, None, 0])
+        self.assertEqual([block.index for block in cfg.reversePostorder()], [0, 2])
+
+    def testDeepNesting(self):
+        depth = 500
+        prog = 'int a = 0;\n' + 'while (a < 1) {\n' * depth + 'a = 1;\n' + '}\n' * depth
+        cfg = self._createCFG(prog)
+        loops = cfg.naturalLoops()
+        self.assertEqual(len(loops), depth)
+        self.assertEqual(len(loops[0].blocks), 2 * depth)
+
+    def testManyLoops(self):
+        count = 20000
+        prog = 'int a = 0;\n' + 'while (a < 1) {\na = 1;\n}\n' * count
+        cfg = self._createCFG(prog)
+        self.assertEqual(len(cfg.naturalLoops()), count)
+        # The entry, then header, body and exit label blocks per loop.
+        self.assertEqual(len(cfg.blocks), 3 * count + 1)
+        self.assertEqual(cfg.immediateDominators()[-1], len(cfg.blocks) - 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
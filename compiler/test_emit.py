@@ -0,0 +1,86 @@
+import importlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from compiler import emit
+from compiler.ir import serialize
+from compiler.pipeline import compileSource
+
+
+class TestEmit(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'a.output')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testInstructionLines(self):
+        instructions = compileSource('int a = 2;\nif (a > 1) {\nprint(a * 3);\n}')
+        self.assertEqual(list(emit.instructionLines(instructions)), serialize(instructions))
+        self.assertEqual(emit.writeLines(self.path, emit.instructionLines(instructions)), len(instructions))
+        with open(self.path) as f:
+            self.assertEqual(f.read().splitlines(), serialize(instructions))
+
+    def testAtomicReplace(self):
+        emit.writeLines(self.path, ['print 1'])
+
+        def failing():
+            yield 'print 2'
+            raise ValueError('failed')
+
+        with self.assertRaises(ValueError):
+            emit.writeLines(self.path, failing())
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'print 1\n')
+        # No temporary file is left behind.
+        self.assertEqual(os.listdir(self.directory.name), ['a.output'])
+
+    def testPermissions(self):
+        mask = os.umask(0o027)
+        try:
+            emit.writeLines(self.path, ['print 1'])
+        finally:
+            os.umask(mask)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+
+    def testStandardStreams(self):
+        stdout = io.StringIO()
+        with mock.patch('sys.stdout', stdout), mock.patch('sys.stdin', io.StringIO('print(1);')):
+            program = emit.readSource(emit.STANDARD_STREAM)
+            emit.writeLines(emit.STANDARD_STREAM, emit.instructionLines(compileSource(program)))
+        self.assertEqual(stdout.getvalue(), 'print 1\n')
+
+    def _runCompiler(self, source, *arguments):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with mock.patch('sys.argv', ['compiler', *arguments]), mock.patch('sys.stdin', io.StringIO(source)), \
+                mock.patch('sys.stdout', stdout), mock.patch('sys.stderr', stderr):
+            try:
+                importlib.import_module('compiler.__main__').Run()
+            except SystemExit:
+                pass
+        return stdout.getvalue(), stderr.getvalue()
+
+    def testOnlyTACOnStandardOutput(self):
+        program = 'int a = 2;\nprint(a * 3);'
+        stdout, stderr = self._runCompiler(program, '-', '-v')
+        self.assertEqual(stdout.splitlines(), serialize(compileSource(program)))
+        self.assertIn('Symbol Tables', stderr)
+        # Diagnostics go to stderr too.
+        for program in ('int a = 2', 'int a = 1;\nprint(b);', 'int a = @;'):
+            with self.subTest(program=program):
+                stdout, stderr = self._runCompiler(program, '-', '-v')
+                self.assertEqual(stdout, '')
+                self.assertIn('ERROR', stderr)
+        stdout, stderr = self._runCompiler('', '-o', '-', os.path.join(self.directory.name, 'missing.txt'))
+        self.assertEqual(stdout, '')
+        self.assertIn('does not exist', stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
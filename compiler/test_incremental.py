@@ -0,0 +1,101 @@
+import glob
+import os
+import unittest
+
+from compiler.incremental import IncrementalCompiler
+from compiler.ir import serialize
+from compiler.pipeline import CompileError, compileSource
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+PROGRAM = '''int total = 0;
+int a = 2; int b = a * 3;
+if (b > 4) {
+    print(b - a);
+} elif (b > 2) {
+    print(a);
+} else {
+    print(b);
+}
+total = total + b;
+for (int i = 0; i < 3; i = i + 1) {
+    total = total + i * 2;
+}
+float f = 1;
+print(total);
+print(f / 2);'''
+
+
+class TestIncremental(unittest.TestCase):
+
+    def assertCompiles(self, compiler, program, optimized=False):
+        self.assertEqual(serialize(compiler.compile(program)),
+                         serialize(compileSource(program, optimized)))
+
+    def testFirstBuild(self):
+        for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.txt'))):
+            with open(path) as f:
+                program = f.read()
+            with self.subTest(path=os.path.basename(path)):
+                self.assertCompiles(IncrementalCompiler(), program)
+
+    def testEdits(self):
+        edits = [
+            # Statement sharing a line with another one.
+            ('int a = 2; int b = a * 3;', 'int a = 2; int b = a * 3 + 1 * 1;'),
+            # Branches added to an if.
+            ('} else {', '} elif (b == 1) {\n    print(b * 2);\n} else {'),
+            ('    print(b - a);', '    print(b - a * 2);\n    print(a);'),
+            ('float f = 1;', 'float f = 1;\nint g = 7;\nprint(g * g);'),
+            ('total = total + b;', ''),
+            ('print(total);', ''),
+        ]
+        for old, new in edits:
+            with self.subTest(edit=new):
+                compiler = IncrementalCompiler()
+                compiler.compile(PROGRAM)
+                self.assertCompiles(compiler, PROGRAM.replace(old, new))
+
+    def testRebuildsOnlyAffectedUnits(self):
+        compiler = IncrementalCompiler()
+        compiler.compile(PROGRAM)
+        self.assertEqual(compiler.rebuilt, len(compiler.units))
+        # The if and the unit before it are checked again, the numbering
+        # after them shifts.
+        self.assertCompiles(compiler, PROGRAM.replace('print(b - a);', 'print(b - a - 1);'))
+        self.assertEqual(compiler.rebuilt, 2)
+        # a and b keep their values, nothing after them is checked again.
+        compiler.compile(PROGRAM)
+        self.assertCompiles(compiler, PROGRAM.replace('int a = 2;', 'int a = 1 + 1;'))
+        self.assertEqual(compiler.rebuilt, 2)
+        # b changes, so do the units reading it and then total.
+        compiler.compile(PROGRAM)
+        self.assertCompiles(compiler, PROGRAM.replace('int a = 2;', 'int a = 5;'))
+        self.assertEqual(compiler.rebuilt, 6)
+        self.assertCompiles(compiler, PROGRAM.replace('int a = 2;', 'int a = 5;'))
+        self.assertEqual(compiler.rebuilt, 0)
+
+    def testKeepsValidStateOnErrors(self):
+        compiler = IncrementalCompiler()
+        compiler.compile(PROGRAM)
+        for program in (PROGRAM.replace('print(b - a);', 'print(c);'),
+                        PROGRAM.replace('int b = a * 3;', 'int b = a * 3'),
+                        PROGRAM.replace('float f = 1;', 'int f = 1.5;'),
+                        PROGRAM.replace('int total = 0;', 'int total = 0;\nint a = 1;')):
+            with self.subTest(program=program):
+                with self.assertRaises(CompileError) as expected:
+                    compileSource(program)
+                with self.assertRaises(CompileError) as context:
+                    compiler.compile(program)
+                self.assertEqual(str(context.exception), str(expected.exception))
+        self.assertCompiles(compiler, PROGRAM.replace('print(a);', 'print(a + 1);'))
+        self.assertEqual(compiler.rebuilt, 2)
+
+    def testOptimized(self):
+        compiler = IncrementalCompiler(optimized=True)
+        compiler.compile(PROGRAM)
+        self.assertCompiles(compiler, PROGRAM.replace('print(f / 2);', 'print(f * 2);'), optimized=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import unittest
+
+from compiler import ir
+from compiler.ir import Constant, Instruction, Label, Opcode, Temp
+from compiler.parser import Parser, VariableTypes
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+
+EXAMPLES = os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+
+class TestIR(unittest.TestCase):
+
+    def _createIR(self, prog):
+        parser = Parser(prog)
+        root = parser.parseProgram(prog)
+        SemanticAnalyzer(root, parser.proglines).checkSemantics()
+        return TACProcessor(root).generateIR()
+
+    def testFormatInstructions(self):
+        t0 = Temp(0)
+        label = Label(3)
+        cases = [
+            (Instruction(Opcode.DECLARE, 'a', type=VariableTypes.STRING), 'declarestring a'),
+            (Instruction(Opcode.COPY, 'a', Constant('hi', VariableTypes.STRING)), 'a = "hi"'),
+            (Instruction(Opcode.ADD, t0, 'a', Constant(2.0, VariableTypes.FLOAT)), 't0 = a + 2.0'),
+            (Instruction(Opcode.AND, t0, Constant(True, VariableTypes.BOOL), 'b'), 't0 = True and b'),
+            (Instruction(Opcode.NEG, t0, 'a'), 't0 = -a'),
+            (Instruction(Opcode.NOT, t0, 'a'), 't0 = not a'),
+            (Instruction(Opcode.TO_FLOAT, t0, Constant(2, VariableTypes.INT)), 't0 = toFloat 2'),
+            (Instruction(Opcode.PRINT, left=t0), 'print t0'),
+            (Instruction(Opcode.LABEL, label), 'LABEL L3'),
+            (Instruction(Opcode.GOTO, label), 'GOTO L3'),
+            (Instruction(Opcode.IFGOTO, label, t0), 't0 IFGOTO L3'),
+        ]
+        for instruction, text in cases:
+            self.assertEqual(ir.formatInstruction(instruction), text)
+
+    def testConstantEquality(self):
+        self.assertEqual(Constant(1, VariableTypes.INT),
+                         Constant(1, VariableTypes.INT))
+        self.assertNotEqual(Constant(1, VariableTypes.INT),
+                            Constant(1.0, VariableTypes.FLOAT))
+        self.assertNotEqual(Constant(True, VariableTypes.BOOL),
+                            Constant(1, VariableTypes.INT))
+        self.assertNotEqual(Constant(0.0, VariableTypes.FLOAT),
+                            Constant(-0.0, VariableTypes.FLOAT))
+
+    def testStructuredOperands(self):
+        instructions = self._createIR('int a = 5;\nfloat b = a + 2.5;')
+        self.assertEqual([i.opcode for i in instructions], [
+            Opcode.DECLARE, Opcode.COPY, Opcode.TO_FLOAT, Opcode.ADD, Opcode.DECLARE, Opcode.COPY])
+        add = instructions[3]
+        self.assertIs(add.left, instructions[2].dst)
+        self.assertEqual(add.right, Constant(2.5, VariableTypes.FLOAT))
+        self.assertEqual(add.type, VariableTypes.FLOAT)
+        self.assertIs(instructions[5].left, add.dst)
+
+    def testLoopNumbering(self):
+        # The loop temporals are numbered in generation order, not in the
+        # order of the instructions.
+        instructions = self._createIR(
+            'for (int i = 0; i < 9; i = i+1) {\n    print(i);\n}')
+        ifgoto = instructions[5]
+        self.assertEqual(ifgoto.opcode, Opcode.IFGOTO)
+        self.assertEqual(ifgoto.left.index, 2)
+        self.assertEqual(ifgoto.dst.index, 1)
+
+    def testExamplesRoundTrip(self):
+        for name in sorted(os.listdir(EXAMPLES)):
+            if not name.endswith('.txt'):
+                continue
+            with open(os.path.join(EXAMPLES, name)) as f:
+                prog = f.read()
+            with open(os.path.join(EXAMPLES, name[:-4] + '.output')) as f:
+                expected = f.read()
+            with self.subTest(example=name):
+                lines = ir.serialize(self._createIR(prog))
+                self.assertEqual(''.join(line + '\n' for line in lines), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 
+from compiler.incremental import IncrementalCompiler
 from compiler.lexer import Lexer, LexerTypes
+from compiler.pipeline import CompileError, compileSource
 
 
 class TestLexer(unittest.TestCase):
@@ -130,6 +132,44 @@ class TestLexer(unittest.TestCase):
         tokens = self._getTokens('?')
         self.assertEqual(len(tokens), 0)
 
+    def testSharedSpecIndependentState(self):
+        other = Lexer()
+        otherLexer = other.createLexer()
+        otherLexer.input('?')
+        otherLexer.token()
+        self.assertEqual(other.n_errors, 1)
+        self.assertEqual(self.instance.n_errors, 0)
+        self.assertEqual(len(self._getTokens('a\nb')), 2)
+        self.assertEqual(self.lexer.lineno, 2)
+        self.assertEqual(otherLexer.lineno, 1)
+
+    def testTokenize(self):
+        tokens = self.instance.tokenize('int a = 2;\nprint(a);')
+        self.assertEqual(len(tokens), 10)
+        self.assertEqual(tokens.tokens[5].type, LexerTypes.PRINT.name)
+        self.assertEqual(tokens.tokens[5].lineno, 2)
+        self.assertEqual(self.instance.n_errors, 0)
+
+    def testTokenizeErrorPosition(self):
+        tokens = self.instance.tokenize('int a = 2;\nint b = ?2;')
+        self.assertEqual(self.instance.n_errors, 1)
+        self.assertEqual(self.instance.errorToken, '?')
+        self.assertEqual(self.instance.errorLine, 1)
+        self.assertEqual(self.instance.errorColumn, 9)
+        self.assertEqual(len(tokens), 8)
+
+    def testEmptyProgram(self):
+        for program in ('', ' \n\t\n'):
+            with self.subTest(program=program):
+                tokens = self.instance.tokenize(program)
+                self.assertEqual(len(tokens), 0)
+                # Still the lexer of the parser, not PLY's global one.
+                self.assertTrue(tokens)
+                for compile in (compileSource, IncrementalCompiler().compile):
+                    with self.assertRaises(CompileError) as context:
+                        compile(program)
+                    self.assertIn('Unexpected end of file', str(context.exception))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from compiler import ir, liveness
+from compiler.ir import Constant, Instruction, Label, Opcode, Temp
+from compiler.parser import Parser, VariableTypes
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+
+
+class TestLiveness(unittest.TestCase):
+
+    def _createIR(self, prog):
+        parser = Parser(prog)
+        root = parser.parseProgram(prog)
+        SemanticAnalyzer(root, parser.proglines).checkSemantics()
+        return TACProcessor(root).generateIR()
+
+    def testExpressionReuse(self):
+        instructions = self._createIR('int a = 1 + 2 + 3 + 4;\nint b = (1 + 2) * (3 + 4);')
+        self.assertEqual(liveness.peakLiveTemps(instructions), 2)
+        self.assertEqual(ir.serialize(liveness.reuseTemps(instructions)), [
+            't0 = 1 + 2', 't0 = t0 + 3', 't0 = t0 + 4', 'declareint a', 'a = t0',
+            't0 = 1 + 2', 't1 = 3 + 4', 't0 = t0 * t1', 'declareint b', 'b = t0'])
+
+    def testLoopKeepsTempsAlive(self):
+        # t0 is computed before the loop and read on every iteration, the
+        # temporals of the body cannot take its name.
+        t0, t1, t2 = Temp(0), Temp(1), Temp(2)
+        start, end = Label(0), Label(1)
+        instructions = [
+            Instruction(Opcode.MUL, t0, 'x', 'y', VariableTypes.INT),
+            Instruction(Opcode.LABEL, start),
+            Instruction(Opcode.LT, t1, 'i', Constant(9, VariableTypes.INT), VariableTypes.BOOL),
+            Instruction(Opcode.IFNOT, end, t1),
+            Instruction(Opcode.ADD, t2, 'i', t0, VariableTypes.INT),
+            Instruction(Opcode.COPY, 'i', t2, type=VariableTypes.INT),
+            Instruction(Opcode.GOTO, start),
+            Instruction(Opcode.LABEL, end),
+        ]
+        intervals = liveness.liveIntervals(instructions)
+        self.assertEqual(intervals[t0], (1, 14))
+        lines = ir.serialize(liveness.reuseTemps(instructions))
+        self.assertEqual(lines[0], 't0 = x * y')
+        self.assertEqual(lines[2], 't1 = i < 9')
+        self.assertEqual(lines[4], 't1 = i + t0')
+
+    def testLargeProgram(self):
+        statements = 20000
+        prog = 'int a = 0;\n' + 'a = (a * 2 - a) + (a - a);\n' * statements
+        instructions = self._createIR(prog)
+        temps = set(instruction.dst for instruction in instructions
+                    if isinstance(instruction.dst, Temp))
+        self.assertEqual(len(temps), 4 * statements)
+        self.assertEqual(liveness.peakLiveTemps(instructions), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
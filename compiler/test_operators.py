@@ -0,0 +1,86 @@
+import unittest
+
+from compiler import operators
+from compiler.parser import ASTTypes, VariableTypes
+
+
+class TestOperators(unittest.TestCase):
+
+    def testIntArithmetic(self):
+        rule = operators.lookup(
+            ASTTypes.SUM, VariableTypes.INT, VariableTypes.INT)
+        self.assertEqual(rule.resultType, VariableTypes.INT)
+        self.assertFalse(rule.coerceLeft)
+        self.assertFalse(rule.coerceRight)
+        self.assertEqual(rule.evaluate(2, 3), 5)
+        self.assertEqual(rule.mnemonic, '+')
+
+    def testMixedArithmeticCoercion(self):
+        rule = operators.lookup(
+            ASTTypes.MULTIPLICATION, VariableTypes.INT, VariableTypes.FLOAT)
+        self.assertEqual(rule.resultType, VariableTypes.FLOAT)
+        self.assertTrue(rule.coerceLeft)
+        self.assertFalse(rule.coerceRight)
+
+    def testDivision(self):
+        rule = operators.lookup(
+            ASTTypes.DIVISION, VariableTypes.INT, VariableTypes.INT)
+        self.assertEqual(rule.evaluate(4, 2), 2)
+        self.assertIsInstance(rule.evaluate(4, 2), int)
+        self.assertEqual(rule.evaluate(3, 2), 1.5)
+
+    def testNegativeExponent(self):
+        rule = operators.lookup(
+            ASTTypes.EXPONENT, VariableTypes.INT, VariableTypes.INT)
+        self.assertEqual(rule.resultType, VariableTypes.INT)
+        promoted = rule.negativeExponent
+        self.assertEqual(promoted.resultType, VariableTypes.FLOAT)
+        self.assertTrue(promoted.coerceLeft)
+        self.assertTrue(promoted.coerceRight)
+
+    def testStringConcatenation(self):
+        rule = operators.lookup(
+            ASTTypes.SUM, VariableTypes.STRING, VariableTypes.FLOAT)
+        self.assertEqual(rule.resultType, VariableTypes.STRING)
+        self.assertEqual(rule.evaluate('a', 2.0), 'a2.0')
+        self.assertIsNone(operators.lookup(
+            ASTTypes.SUM, VariableTypes.STRING, VariableTypes.BOOL))
+
+    def testComparisons(self):
+        self.assertIsNotNone(operators.lookup(
+            ASTTypes.CMP_EQUAL, VariableTypes.BOOL, VariableTypes.STRING))
+        self.assertIsNone(operators.lookup(
+            ASTTypes.CMP_EQUAL, VariableTypes.INT, VariableTypes.STRING))
+        self.assertIsNone(operators.lookup(
+            ASTTypes.CMP_LESS, VariableTypes.BOOL, VariableTypes.BOOL))
+        rule = operators.lookup(
+            ASTTypes.CMP_LESS, VariableTypes.INT, VariableTypes.FLOAT)
+        self.assertEqual(rule.resultType, VariableTypes.BOOL)
+        self.assertFalse(rule.coerceLeft)
+
+    def testBoolOperators(self):
+        rule = operators.lookup(
+            ASTTypes.AND_OP, VariableTypes.INT, VariableTypes.BOOL)
+        self.assertEqual(rule.evaluate(0, True), False)
+        self.assertIsNone(operators.lookup(
+            ASTTypes.OR_OP, VariableTypes.INT, VariableTypes.INT))
+
+    def testUminus(self):
+        rule = operators.lookup(ASTTypes.UMINUS, VariableTypes.FLOAT)
+        self.assertEqual(rule.evaluate(2.5, None), -2.5)
+        self.assertIsNone(operators.lookup(
+            ASTTypes.UMINUS, VariableTypes.STRING))
+
+    def testErrorMessage(self):
+        self.assertEqual(operators.errorMessage(ASTTypes.SUBSTRACT, 1, 'a'),
+                         'Cannot substract values "1" and "a"')
+        self.assertEqual(operators.errorMessage(ASTTypes.UMINUS, True),
+                         'Invalid operation "-True"')
+
+    def testMnemonics(self):
+        for opType in operators.RULE_OPS:
+            self.assertIn(opType, operators.MNEMONICS)
+
+
+if __name__ == '__main__':
+    unittest.main()
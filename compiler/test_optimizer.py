@@ -0,0 +1,396 @@
+import io
+import unittest
+
+from compiler import ir, optimizer
+from compiler.aot import CompiledProgram
+from compiler.ir import Constant, Instruction, Label, Opcode, Temp
+from compiler.parser import Parser, VariableTypes
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+from compiler.vm import VirtualMachine
+
+# Programs run with and without each pass, the printed output must match.
+PROGRAMS = [
+    '''int a = (1-2)*4/2;
+    float b = (a+2)^2;
+    if (a > b) {
+        int c = 2;
+        print(c);
+    }
+    print(b);
+    print(a);
+    ''',
+    '''int s = 0;
+    for (int i = 0; i < 20; i = i + 1) {
+        int a = 2 * 3;
+        s = s + a * i;
+        if (s > 50) {
+            s = s - 50;
+        }
+        elif (s == 12) {
+            print("twelve");
+        }
+        else {
+            print(s / 4);
+        }
+    }
+    print(s);
+    ''',
+    '''float f = 4.0 / 2.0;
+    int p = 2 ^ 10;
+    float n = 2 ^ -2;
+    string s = "v" + p + f;
+    bool b = true and 2 > 1 or false;
+    int k = 0;
+    while (k < 3 and b) {
+        print(s + k);
+        k = k + 1;
+        b = k != 2;
+    }
+    print(-f + n);
+    ''',
+    '''int s = 0;
+    float f = -0.0;
+    print(f + 0.0);
+    print(f - 0);
+    for (int i = 0; i < 6; i = i + 1) {
+        s = s + i ^ 3 + i * 2 - 0 + (i ^ 0) * -1;
+        f = f / 2.0 + i ^ 1 - f * 4;
+        print(0 - s);
+        print(f * 1 - 0);
+    }
+    print(f ^ 2);
+    ''',
+]
+
+
+def compileProgram(prog):
+    parser = Parser(prog)
+    root = parser.parseProgram(prog)
+    SemanticAnalyzer(root, parser.proglines).checkSemantics()
+    return TACProcessor(root).generateIR()
+
+
+def runProgram(instructions):
+    output = io.StringIO()
+    VirtualMachine(instructions).run(output)
+    return output.getvalue()
+
+
+class TestOptimizer(unittest.TestCase):
+
+    def _optimize(self, prog, passes):
+        return ir.serialize(optimizer.optimize(compileProgram(prog), passes))
+
+    def testFoldExpression(self):
+        lines = self._optimize('int a = (1-2)*4/2;\nfloat b = a + 0.5;', ['fold'])
+        self.assertEqual(lines, ['declareint a', 'a = -2', 'declarefloat b', 'b = -1.5'])
+
+    def testFoldConditions(self):
+        lines = self._optimize('while (true) {\nprint(1);\n}', ['fold'])
+        self.assertEqual(lines, ['LABEL L0', 'False IFGOTO L1', 'print 1', 'GOTO L0', 'LABEL L1'])
+
+    def testFoldKeepsTyping(self):
+        # An exact FLOAT division stays a float and 2 ^ -2 was already
+        # promoted to FLOAT by the semantic pass.
+        lines = self._optimize('float a = 4.0 / 2.0;\nfloat b = 2 ^ -2;', ['fold'])
+        self.assertEqual(lines, ['declarefloat a', 'a = 2.0', 'declarefloat b', 'b = 0.25'])
+
+    def testFoldStopsAtLabels(self):
+        prog = '''int a = 1;
+        while (a < 3) {
+            a = a + 1;
+        }
+        print(a);
+        '''
+        lines = self._optimize(prog, ['fold'])
+        self.assertIn('t0 = a < 3', lines)
+        self.assertIn('t1 = a + 1', lines)
+        self.assertEqual(lines[-1], 'print a')
+
+    def testFoldKeepsRuntimeDivision(self):
+        # The loop divides by zero at run time, it must not be folded away.
+        prog = '''int b = 1;
+        for (int i = 0; i < 2; i = i + 1) {
+            int c = 4 / b;
+            b = b - 1;
+        }
+        '''
+        lines = self._optimize(prog, ['fold'])
+        self.assertIn('t2 = 4 / b', lines)
+
+    def testDeadBranches(self):
+        prog = '''int a = 5;
+        if (false) {
+            print(1);
+        }
+        elif (true) {
+            print(2);
+        }
+        else {
+            print(3);
+        }
+        '''
+        lines = self._optimize(prog, ['fold', 'dce'])
+        self.assertNotIn('print 1', lines)
+        self.assertNotIn('print 3', lines)
+        self.assertIn('print 2', lines)
+
+    def testCodeAfterEndlessLoop(self):
+        prog = '''while (true) {
+            print(1);
+        }
+        print(2);
+        '''
+        lines = self._optimize(prog, ['fold', 'dce'])
+        self.assertEqual(lines, ['LABEL L0', 'print 1', 'GOTO L0'])
+
+    def testUnusedTemps(self):
+        temps = [Temp(i) for i in range(4)]
+        instructions = [
+            Instruction(Opcode.ADD, temps[0], 'a', 'b'),
+            Instruction(Opcode.MUL, temps[1], temps[0], 'c'),
+            Instruction(Opcode.DIV, temps[2], 'a', 'b'),
+            Instruction(Opcode.NEG, temps[3], 'a'),
+            Instruction(Opcode.PRINT, left=temps[3]),
+            Instruction(Opcode.LABEL, Label(0)),
+        ]
+        lines = ir.serialize(optimizer.eliminateDeadCode(instructions))
+        # The division can fail at run time so it stays.
+        self.assertEqual(lines, ['t2 = a / b', 't3 = -a', 'print t3'])
+
+    def testUnusedOperationsThatCanFail(self):
+        INT, FLOAT, STRING = VariableTypes.INT, VariableTypes.FLOAT, VariableTypes.STRING
+        operations = [
+            # 0.0 ^ -1 divides by zero, floats overflow.
+            (Opcode.POW, 'f', Constant(-1, INT), FLOAT, True),
+            (Opcode.POW, 'f', Constant(400, INT), FLOAT, True),
+            (Opcode.POW, 'a', Constant(-1, INT), FLOAT, True),
+            (Opcode.POW, 'a', 'b', INT, True),
+            (Opcode.POW, 'a', Constant(2, INT), INT, False),
+            # Big ints overflow converted to floats.
+            (Opcode.DIV, 'a', Constant(3, INT), INT, True),
+            (Opcode.DIV, 'f', Constant(0.0, FLOAT), FLOAT, True),
+            (Opcode.DIV, 'f', Constant(2.0, FLOAT), FLOAT, False),
+            (Opcode.TO_FLOAT, 'a', None, FLOAT, True),
+            (Opcode.ADD, 's', 'a', STRING, True),
+            (Opcode.MUL, 'f', 'g', FLOAT, False),
+        ]
+        for opcode, left, right, type, fails in operations:
+            with self.subTest(operation=(opcode, left, right, type)):
+                instruction = Instruction(opcode, Temp(0), left, right, type)
+                lines = ir.serialize(optimizer.eliminateDeadCode([instruction]))
+                self.assertEqual(len(lines), 1 if fails else 0)
+
+    def testValueNumbering(self):
+        prog = '''int a = 2;
+        int b = 3;
+        print(a*b + b*a);
+        a = a + 1;
+        print(a*b + a*b);
+        '''
+        lines = self._optimize(prog, ['lvn'])
+        self.assertEqual(lines[4:], [
+            't0 = a * b', 't2 = t0 + t0', 'print t2',
+            't3 = a + 1', 'a = t3',
+            't4 = a * b', 't6 = t4 + t4', 'print t6'])
+
+    def testValueNumberingOperandOrder(self):
+        prog = '''int a = 2;
+        bool x = a > 1 and a < 5;
+        bool y = a < 5 and a > 1;
+        string s = "q" + a;
+        string r = a + "q";
+        '''
+        lines = self._optimize(prog, ['lvn'])
+        self.assertIn('y = t2', lines)
+        self.assertIn('t6 = "q" + a', lines)
+        self.assertIn('t7 = a + "q"', lines)
+
+    def testValueNumberingStopsAtLabels(self):
+        prog = '''int a = 2;
+        int b = a * 2;
+        while (a < 5) {
+            a = a * 2;
+        }
+        '''
+        lines = self._optimize(prog, ['lvn'])
+        self.assertEqual(lines.count('t0 = a * 2'), 1)
+        self.assertIn('t2 = a * 2', lines)
+
+    def testPeepholePatterns(self):
+        prog = '''int a = (1-2)*4/2;
+        if (a > 2) {
+            print(a);
+        }
+        while (true) {
+            int d = 3;
+        }
+        '''
+        peephole = optimizer.PeepholeOptimizer()
+        lines = ir.serialize(peephole.optimize(compileProgram(prog)))
+        self.assertEqual(lines, [
+            't0 = 1 - 2', 't1 = t0 * 4', 'declareint a', 'a = t1 / 2',
+            't3 = a > 2', 't3 IFNOTGOTO L0', 'print a',
+            'LABEL L0', 't5 = True', 't5 IFNOTGOTO L2', 'declareint d', 'd = 3', 'GOTO L0',
+            'LABEL L2'])
+        self.assertEqual(peephole.hits['merge-labels'], 1)
+        self.assertEqual(peephole.hits['invert-branch'], 2)
+        self.assertEqual(peephole.hits['coalesce-copy'], 1)
+
+    def testPeepholeJumps(self):
+        end = Label(0)
+        middle = Label(1)
+        unused = Label(2)
+        instructions = [
+            Instruction(Opcode.IFGOTO, middle, 'c'),
+            Instruction(Opcode.GOTO, end),
+            Instruction(Opcode.PRINT, left='a'),
+            Instruction(Opcode.LABEL, unused),
+            Instruction(Opcode.LABEL, middle),
+            Instruction(Opcode.GOTO, end),
+            Instruction(Opcode.LABEL, end),
+        ]
+        peephole = optimizer.PeepholeOptimizer()
+        lines = ir.serialize(peephole.optimize(instructions))
+        # Every jump ends up going to the next instruction.
+        self.assertEqual(lines, [])
+        self.assertEqual(peephole.hits['thread-jumps'], 1)
+        self.assertEqual(peephole.hits['unreachable'], 1)
+        self.assertGreaterEqual(peephole.hits['jump-to-next'], 1)
+
+    def testPeepholeConfiguration(self):
+        peephole = optimizer.PeepholeOptimizer(['invert-branch'])
+        lines = ir.serialize(peephole.optimize(
+            compileProgram('int a = 1;\nif (a > 0) {\nprint(a);\n}')))
+        self.assertEqual(lines, [
+            'declareint a', 'a = 1', 't0 = a > 0', 't0 IFNOTGOTO L0', 'print a', 'LABEL L0'])
+        self.assertEqual(sum(peephole.hits.values()), 1)
+        with self.assertRaises(ValueError):
+            optimizer.PeepholeOptimizer(['no-such-pattern'])
+
+    def testSimplifyAlgebra(self):
+        prog = 'int x = 3;\nint a = x ^ 4 + x * 2 + x * 1 + 0;\nint b = x ^ 0 - x * 1;'
+        lines = self._optimize(prog, ['simplify'])
+        self.assertEqual(lines, [
+            'declareint x', 'x = 3', 't9 = x * x', 't0 = t9 * t9', 't1 = x + x',
+            't2 = t0 + t1', 't3 = x', 't4 = t2 + t3', 'declareint a', 'a = t4',
+            't7 = x', 't8 = 1 - t7', 'declareint b', 'b = t8'])
+
+    def testSimplifyKeepsTyping(self):
+        prog = '''int x = 4;
+        float f = 1.5;
+        float a = f + 0.0;
+        float b = f / 4.0 + f ^ 2.0;
+        int c = x / 2;
+        float d = x ^ -1;
+        float e = f ^ 1.0;
+        '''
+        lines = self._optimize(prog, ['simplify'])
+        # -0.0 + 0.0 is 0.0, float pow is not correctly rounded and an INT
+        # division can give an INT or a FLOAT.
+        self.assertIn('t0 = f + 0.0', lines)
+        self.assertIn('t1 = f * 0.25', lines)
+        self.assertIn('t2 = f ^ 2.0', lines)
+        self.assertIn('t4 = x / 2', lines)
+        self.assertIn('t8 = t5 ^ t7', lines)
+        self.assertIn('t9 = f', lines)
+
+    def testSimplifyNegativeExponent(self):
+        # INT ^ INT with a negative exponent is a FLOAT, x ^ 1.0 too.
+        t0, t1 = Temp(0), Temp(1)
+        instructions = [
+            Instruction(Opcode.DECLARE, 'x', type=VariableTypes.INT),
+            Instruction(Opcode.POW, t0, 'x', Constant(-1, VariableTypes.INT), VariableTypes.FLOAT),
+            Instruction(Opcode.POW, t1, 'x', Constant(1.0, VariableTypes.FLOAT), VariableTypes.FLOAT),
+            Instruction(Opcode.POW, 'x', 'x', Constant(-2, VariableTypes.INT), VariableTypes.INT),
+        ]
+        lines = ir.serialize(optimizer.simplifyAlgebra(instructions))
+        self.assertEqual(lines, ['declareint x', 't0 = x ^ -1', 't1 = toFloat x', 'x = x ^ -2'])
+
+    def testHoistInvariants(self):
+        prog = '''int x = 3;
+        int y = 4;
+        int s = 0;
+        for (int i = 0; i < 10; i = i + 1) {
+            s = s + x * y + 3;
+        }
+        '''
+        lines = self._optimize(prog, ['licm'])
+        self.assertLess(lines.index('t2 = x * y'), lines.index('LABEL L0'))
+        self.assertGreater(lines.index('t3 = s + t2'), lines.index('LABEL L0'))
+
+    def testHoistRespectsNestedWrites(self):
+        prog = '''int x = 3;
+        int y = 3;
+        int s = 0;
+        for (int i = 0; i < 10; i = i + 1) {
+            int j = 0;
+            while (j < 3) {
+                s = s + (x - y) * 2 + x / y;
+                if (s > 100) {
+                    y = 1;
+                }
+                elif (s == 3) {
+                    print(x * 7);
+                }
+                j = j + 1;
+            }
+        }
+        '''
+        lines = self._optimize(prog, ['licm'])
+        # x * 7 leaves both loops, y is written in the inner loop and the
+        # division could fail.
+        self.assertLess(lines.index('t10 = x * 7'), lines.index('LABEL L0'))
+        self.assertGreater(lines.index('t3 = x - y'), lines.index('LABEL L1'))
+        self.assertGreater(lines.index('t6 = x / y'), lines.index('LABEL L1'))
+
+    def testHoistOnlyFailuresThatWouldHappen(self):
+        # The second loop never runs, z ^ -1 would divide by zero.
+        prog = '''float z = 2.0;
+        int i = 0;
+        while (i < 2) {
+            i = i + 1;
+            z = z - 1.0;
+        }
+        int n = 0;
+        while (n > 0) {
+            float q = z ^ -1;
+            n = n - 1;
+        }
+        print("done");
+        '''
+        instructions = optimizer.optimize(compileProgram(prog))
+        self.assertEqual(runProgram(instructions), 'done\n')
+        output = io.StringIO()
+        CompiledProgram(instructions).run(output)
+        self.assertEqual(output.getvalue(), 'done\n')
+        lines = ir.serialize(instructions)
+        self.assertGreater(lines.index('q = z ^ -1.0'), lines.index('LABEL L2'))
+
+    def testHoistFromHeader(self):
+        # The header runs even when the body does not.
+        prog = '''float f = 2.0;
+        int n = 0;
+        while (f ^ 3 > n) {
+            n = n + 1;
+        }
+        print(n);
+        '''
+        lines = self._optimize(prog, ['licm'])
+        self.assertLess(lines.index('t1 = f ^ t0'), lines.index('LABEL L0'))
+
+    def testPassesKeepOutput(self):
+        for prog in PROGRAMS:
+            expected = runProgram(compileProgram(prog))
+            for name in optimizer.PASSES:
+                with self.subTest(optimization=name):
+                    optimized = optimizer.optimize(compileProgram(prog), [name])
+                    self.assertEqual(runProgram(optimized), expected)
+            with self.subTest(optimization='all'):
+                optimized = optimizer.optimize(compileProgram(prog))
+                self.assertEqual(runProgram(optimized), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
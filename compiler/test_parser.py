@@ -1,6 +1,7 @@
 import unittest
 
-from compiler.parser import ASTTypes, Parser, ParserError, VariableTypes
+from compiler.lexer import Lexer
+from compiler.parser import NO_CHILDREN, ASTTypes, Parser, ParserError, VariableTypes
 
 
 class TestParser(unittest.TestCase):
@@ -274,6 +275,36 @@ class TestParser(unittest.TestCase):
         self.assertEqual(
             tree.children[0].children[2].children[0].type, ASTTypes.BLOCK)
 
+    def testElifOrder(self):
+        prog = '''if (1 == 1) {
+            int elifOrder0 = 0;
+        } elif (1 == 2) {
+            int elifOrder1 = 1;
+        } elif (1 == 3) {
+            int elifOrder2 = 2;
+        } elif (1 == 4) {
+            int elifOrder3 = 3;
+        }
+        '''
+        tree = self.instance.parseProgram(prog)
+        ifStatement = tree.children[0]
+        self.assertEqual(len(ifStatement.children), 4)
+        for i in range(1, 4):
+            elifNode = ifStatement.children[i]
+            self.assertEqual(elifNode.type, ASTTypes.ELIF)
+            self.assertEqual(elifNode.lineno, 1 + 2 * i)
+            self.assertEqual(elifNode.children[0].children[1].variableValue, i + 1)
+            self.assertEqual(
+                elifNode.children[1].children[0].variableName, f'elifOrder{i}')
+
+    def testStatementOrder(self):
+        prog = '\n'.join(f'int order{i} = {i};' for i in range(0, 2000))
+        tree = self.instance.parseProgram(prog)
+        self.assertEqual(len(tree.children), 2000)
+        for i in range(0, 2000):
+            self.assertEqual(tree.children[i].variableName, f'order{i}')
+            self.assertEqual(tree.children[i].lineno, i + 1)
+
     def testWhileStatement(self):
         prog = '''while (true) {
             int whileStatement = 5;
@@ -349,3 +380,76 @@ class TestParser(unittest.TestCase):
         }
         '''
         self.assertRaises(ParserError, self.instance.parseProgram, code)
+
+    def testSharedParseTables(self):
+        other = Parser([x for x in range(0, 20)])
+        self.assertIs(self.instance.parser.action, other.parser.action)
+        self.assertIs(self.instance.parser.goto, other.parser.goto)
+        self.assertIsNot(self.instance.parser.productions,
+                         other.parser.productions)
+        self.assertRaises(ParserError, other.parseProgram, 'int a = 2')
+        self.assertEqual(self.instance.first_error, '')
+
+    def testLineNumbersResetPerParse(self):
+        self.instance.parseProgram('int first = 1;\nint second = 2;')
+        tree = self.instance.parseProgram('int third = 3;')
+        self.assertEqual(tree.children[0].lineno, 1)
+
+    def testParseTokenStream(self):
+        code = '''int streamed = 2;
+        print(streamed);
+        '''
+        tokens = Lexer().tokenize(code)
+        tree = self.instance.parseProgram(code, tokens)
+        self.assertEqual(len(tree.children), 2)
+        self.assertEqual(tree.children[1].type, ASTTypes.PRINT)
+        self.assertEqual(tokens.position, len(tokens))
+        # The parser own lexer never saw the program.
+        self.assertIsNone(self.instance.lexer.lexdata)
+
+    def testCompactNodes(self):
+        tree = self.instance.parseProgram('int compact = 1 + 2;')
+        sumNode = tree.children[0].children[0].children[0]
+        self.assertFalse(hasattr(sumNode, '__dict__'))
+        self.assertIs(sumNode.children[0].children, NO_CHILDREN)
+        self.assertIs(sumNode.children[1].children, NO_CHILDREN)
+        self.assertFalse(hasattr(tree.symbolTable, '__dict__'))
+        self.assertFalse(hasattr(tree.symbolTable.table['compact'], '__dict__'))
+
+    def testBindings(self):
+        prog = '''int outer = 1;
+        if (outer == 1) {
+            int inner = outer;
+            inner = 2;
+        }
+        if (outer == 2) {
+            int inner = 3;
+        }
+        '''
+        tree = self.instance.parseProgram(prog)
+        self.assertEqual(tree.children[0].binding, (0, 0))
+        firstBlock = tree.children[1].children[0].children[1]
+        self.assertEqual(firstBlock.children[0].binding, (1, 0))
+        self.assertEqual(
+            firstBlock.children[0].children[0].children[0].binding, (0, 0))
+        self.assertEqual(firstBlock.children[1].binding, (1, 0))
+        secondBlock = tree.children[2].children[0].children[1]
+        self.assertEqual(secondBlock.children[0].binding, (2, 0))
+        self.assertEqual(len(self.instance.scopes), 3)
+        self.assertIs(self.instance.scopes[2], secondBlock.symbolTable)
+
+    def testRedeclareInNestedScope(self):
+        prog = '''int redeclared = 1;
+        while (true) {
+            int redeclared = 2;
+        }
+        '''
+        self.assertRaises(ParserError, self.instance.parseProgram, prog)
+
+    def testVariableOutOfScope(self):
+        prog = '''while (true) {
+            int scoped = 2;
+        }
+        print(scoped);
+        '''
+        self.assertRaises(ParserError, self.instance.parseProgram, prog)
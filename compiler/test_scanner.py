@@ -0,0 +1,150 @@
+import glob
+import os
+import tempfile
+import unittest
+
+from compiler import batch, server
+from compiler.cache import CompileCache
+from compiler.ir import serialize
+from compiler.lexer import Lexer
+from compiler.parser import Parser, ParserError
+from compiler.pipeline import CompileError, compileSource
+from compiler.scanner import TOKEN_TYPES, Scanner
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+PROGRAMS = [
+    '',
+    'int a = 1;\nfloat b = 2.5;\nprint(a + b);',
+    'if (a >= 1 and b != 2 or c <= 3) { a = a ^ 2; } elif (a == 0) {} else {}',
+    'string s = "say \\"hi\\"";\n\n\t print(s);',
+    'int_ x1 = 12.;\n_if while for true false bool',
+    # Strings do not span lines, the quote is a token of its own.
+    'print("a\nb");',
+    '1.2.3 4..5 06',
+]
+
+ERRORS = [
+    'int a = 1;\nint b = a @ 2;',
+    'int a = 1 ! 2;',
+    'int a = 1;\r\n',
+    # Invalid characters up to the next token are errors, the last is
+    # reported.
+    'int a = @.\n$\n  1;',
+    '@',
+]
+
+
+def _plyTokens(program, firstLine=1):
+    lexerInstance = Lexer()
+    tokens = lexerInstance.tokenize(program, firstLine).tokens
+    return ([(tok.type, tok.value, tok.lineno, tok.lexpos - program.rfind('\n', 0, tok.lexpos))
+             for tok in tokens],
+            (lexerInstance.n_errors, lexerInstance.errorToken,
+             lexerInstance.errorLine, lexerInstance.errorColumn))
+
+
+def _scannerTokens(program, firstLine=1):
+    scanner = Scanner()
+    buffer = scanner.scan(program, firstLine)
+    return ([(TOKEN_TYPES[code], value, line, column) for code, value, line, column
+             in zip(buffer.types, buffer.values, buffer.lines, buffer.columns)],
+            (scanner.n_errors, scanner.errorToken, scanner.errorLine, scanner.errorColumn))
+
+
+def _examples():
+    for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.txt'))):
+        with open(path) as f:
+            yield os.path.basename(path), f.read()
+
+
+class TestScanner(unittest.TestCase):
+
+    def assertSameTokens(self, program, firstLine=1):
+        expected = _plyTokens(program, firstLine)
+        found = _scannerTokens(program, firstLine)
+        self.assertEqual(found, expected)
+        self.assertEqual([type(value) for _, value, _, _ in found[0]],
+                         [type(value) for _, value, _, _ in expected[0]])
+
+    def testSameTokensAsLexer(self):
+        for program in PROGRAMS + ERRORS:
+            with self.subTest(program=program):
+                self.assertSameTokens(program)
+                self.assertSameTokens(program, firstLine=7)
+
+    def testExamples(self):
+        for name, program in _examples():
+            with self.subTest(path=name):
+                self.assertSameTokens(program)
+
+    def testKeywords(self):
+        for word, tokenType in Lexer.reserved.items():
+            buffer = Scanner().scan(word)
+            self.assertEqual(TOKEN_TYPES[buffer.types[0]], tokenType)
+            self.assertEqual(buffer.values[0], word)
+
+    def testStream(self):
+        stream = Scanner().tokenize('int a = 1;\nprint(a);')
+        self.assertEqual(len(stream), 10)
+        tok = stream.token()
+        self.assertEqual((tok.type, tok.value, tok.lineno), ('INTDCL', 'int', 1))
+        while stream.token() != None:
+            pass
+        self.assertEqual(stream.position, 10)
+        # An empty stream is still a lexer to the parser.
+        self.assertTrue(Scanner().tokenize(''))
+
+    def testParsesTheSame(self):
+        for name, program in _examples():
+            with self.subTest(path=name):
+                self.assertEqual(serialize(compileSource(program, lexerClass=Scanner)),
+                                 serialize(compileSource(program)))
+
+    def testSameDiagnostics(self):
+        for program in ERRORS + ['int a = 1', 'int a = 1;\nprint(b);']:
+            with self.subTest(program=program):
+                with self.assertRaises(CompileError) as expected:
+                    compileSource(program)
+                with self.assertRaises(CompileError) as context:
+                    compileSource(program, lexerClass=Scanner)
+                self.assertEqual(str(context.exception), str(expected.exception))
+
+    def testParserLineNumbers(self):
+        program = 'int a = 1;\n\nint b = a +;'
+        lines = program.splitlines()
+        errors = []
+        for tokens in (Lexer().tokenize(program), Scanner().tokenize(program)):
+            parserInstance = Parser(lines)
+            with self.assertRaises(ParserError):
+                parserInstance.parseProgram(program, tokens)
+            errors.append(parserInstance.first_error)
+        self.assertEqual(errors[0], errors[1])
+
+    def testEveryMode(self):
+        scanned = []
+
+        class RecordingScanner(Scanner):
+            def scan(self, program, firstLine=1):
+                scanned.append(program)
+                return super().scan(program, firstLine)
+
+        program = 'int a = 2;\nprint(a * 3);'
+        expected = serialize(compileSource(program))
+        entry, cached = CompileCache().lookup(program, lexerClass=RecordingScanner)
+        self.assertEqual((entry.tac, cached), (expected, False))
+        self.assertEqual(server.handleRequest({'source': program}, lexerClass=RecordingScanner)['tac'],
+                         expected)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.txt')
+            with open(path, 'w') as f:
+                f.write(program)
+            results = batch.compileBatch([path], jobs=1, lexerClass=RecordingScanner)
+            self.assertTrue(results[0].ok)
+            with open(batch.outputPath(path)) as f:
+                self.assertEqual(f.read().splitlines(), expected)
+        self.assertEqual(scanned, [program] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,6 +28,17 @@ class TestSemantics(unittest.TestCase):
         self.assertEqual(len(tree.children[1].children), 1)
         self.assertEqual(tree.children[1].variableValue, 3)
 
+    def testForVariableScope(self):
+        code = '''for (int i = 0; i < 3; i = i + 1) {
+            print(i);
+        }
+        int i = 7;
+        '''
+        tree = self._prepareSemantics(code)
+        self.assertEqual(tree.symbolTable.table['i'].value, 7)
+        forTable = tree.children[0].children[3].symbolTable
+        self.assertEqual(forTable.table['i'].value, 1)
+
     def testIntegerSum(self):
         tree = self._prepareSemantics('int integerSum = 5+2;')
         self.assertEqual(len(tree.children), 1)
@@ -127,6 +138,14 @@ class TestSemantics(unittest.TestCase):
         self.assertEqual(len(tree.children[0].children), 1)
         self.assertEqual(tree.children[0].variableValue, -21)
 
+    def testUMinusVariable(self):
+        code = '''int uminusBase = 2;
+        int uminusVariable = -uminusBase;
+        '''
+        tree = self._prepareSemantics(code)
+        self.assertEqual(tree.children[1].variableType, VariableTypes.INT)
+        self.assertEqual(tree.children[1].variableValue, -2)
+
     def testCmpEqual(self):
         tree = self._prepareSemantics(
             'bool cmpequal = true == "true";')
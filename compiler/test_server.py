@@ -0,0 +1,175 @@
+import errno
+import importlib
+import io
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from compiler import server
+from compiler.cache import CompileCache
+from compiler.ir import serialize
+from compiler.pipeline import compileSource
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'compiler.sock')
+        self.server = server.CompileServer(self.path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.thread.join()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def testCompile(self):
+        with server.CompileClient(self.path, timeout=10) as client:
+            response = client.compile('int a = 2 * 3;\nprint(a);')
+            self.assertTrue(response['ok'])
+            self.assertEqual(response['tac'], ['t0 = 2 * 3', 'declareint a', 'a = t0', 'print a'])
+            response = client.compile('int a = 2 * 3;\nprint(a);', optimize=True)
+            self.assertEqual(response['tac'], ['declareint a', 'a = 6', 'print 6'])
+
+    def testDiagnostics(self):
+        with server.CompileClient(self.path, timeout=10) as client:
+            response = client.compile('int a = 1;\nprint(b);')
+            self.assertFalse(response['ok'])
+            self.assertIn('"b" does not exist', response['error'])
+            # The connection keeps working after an invalid program.
+            self.assertTrue(client.compile('print(1);')['ok'])
+
+    def testInvalidMessage(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(10)
+        connection.connect(self.path)
+        connection.sendall(server.HEADER.pack(3) + b'{x]')
+        response = server.receiveMessage(connection)
+        connection.close()
+        self.assertFalse(response['ok'])
+        self.assertIn('Invalid JSON', response['error'])
+
+    def testConcurrentClients(self):
+        programs = [f'int a = {i};\nfor (int j = 0; j < {i}; j = j + 1) {{\na = a + j;\n}}\nprint(a);'
+                    for i in range(8)]
+        responses = [None] * len(programs)
+
+        def request(index):
+            with server.CompileClient(self.path, timeout=10) as client:
+                for _ in range(5):
+                    responses[index] = client.compile(programs[index])
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(len(programs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for program, response in zip(programs, responses):
+            self.assertEqual(response['tac'], serialize(compileSource(program)))
+
+    def testCache(self):
+        cached = server.CompileServer(os.path.join(self.directory.name, 'cached.sock'), CompileCache())
+        thread = threading.Thread(target=cached.serve_forever)
+        thread.start()
+        try:
+            with server.CompileClient(cached.path, timeout=10) as client:
+                first = client.compile('int a = 2 * 3;\nprint(a);')
+                second = client.compile('int a = 2 * 3;\nprint(a);')
+                error = client.compile('print(b);')
+        finally:
+            cached.stop()
+            thread.join()
+            cached.server_close()
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(first['tac'], second['tac'])
+        self.assertFalse(error['ok'])
+        self.assertEqual(cached.cache.stats['hits'], 1)
+        self.assertEqual(cached.cache.stats['misses'], 2)
+
+    def testShutdown(self):
+        with server.CompileClient(self.path, timeout=10) as client:
+            client.shutdown()
+        self.thread.join(10)
+        self.assertFalse(self.thread.is_alive())
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def testKeepsOtherFiles(self):
+        path = os.path.join(self.directory.name, 'notes.txt')
+        with open(path, 'w') as f:
+            f.write('notes')
+        with self.assertRaises(OSError) as context:
+            server.CompileServer(path)
+        self.assertEqual(context.exception.errno, errno.EADDRINUSE)
+        with open(path) as f:
+            self.assertEqual(f.read(), 'notes')
+
+    def testKeepsLiveSocket(self):
+        with self.assertRaises(OSError) as context:
+            server.CompileServer(self.path)
+        self.assertEqual(context.exception.errno, errno.EADDRINUSE)
+        with server.CompileClient(self.path, timeout=10) as client:
+            self.assertTrue(client.compile('print(1);')['ok'])
+
+    def testReplacesStaleSocket(self):
+        path = os.path.join(self.directory.name, 'stale.sock')
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        replacement = server.CompileServer(path)
+        replacement.server_close()
+        self.assertFalse(os.path.exists(path))
+
+    def testClosesOnlyItsSocket(self):
+        # Another server took the path over after this one was removed.
+        os.unlink(self.path)
+        other = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        other.bind(self.path)
+        self.server.server_close()
+        self.assertTrue(os.path.exists(self.path))
+        other.close()
+
+    def testRefusesRequestsWhenStopping(self):
+        with server.CompileClient(self.path, timeout=10) as client:
+            self.assertTrue(client.compile('print(1);')['ok'])
+            with self.server.busy:
+                self.server.stopping = True
+            response = client.compile('print(1);')
+        self.assertFalse(response['ok'])
+        self.assertIn('shutting down', response['error'])
+
+    def testClientConnectionClosed(self):
+        path = os.path.join(self.directory.name, 'closing.sock')
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+        listener.listen()
+
+        def closeConnection():
+            connection, _ = listener.accept()
+            # Closed without answering the request.
+            server.receiveMessage(connection)
+            connection.close()
+
+        thread = threading.Thread(target=closeConnection)
+        thread.start()
+        source = os.path.join(self.directory.name, 'a.txt')
+        with open(source, 'w') as f:
+            f.write('print(1);')
+        stdout = io.StringIO()
+        with mock.patch('sys.argv', ['compiler', '--connect', path, source]), mock.patch('sys.stdout', stdout):
+            with self.assertRaises(SystemExit):
+                importlib.import_module('compiler.__main__').Run()
+        thread.join()
+        listener.close()
+        self.assertIn(f'Compile server at {path}: connection closed', stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -295,3 +295,18 @@ class TestTac(unittest.TestCase):
         self.assertEqual(lines[12], 't8 = t3 + t7')
         self.assertEqual(lines[13], 'declarefloat c')
         self.assertEqual(lines[14], 'c = t8')
+
+    def testElifWithoutElse(self):
+        prog = '''int a = 1;
+        if (a == 1) {
+            print(1);
+        }
+        elif (a == 2) {
+            print(2);
+        }
+        '''
+        lines = self._createTac(prog)
+        self.assertEqual(lines[2:], [
+            't0 = a == 1', 't2 = not t0', 't2 IFGOTO L0', 'print 1', 'GOTO L2', 'LABEL L0',
+            't1 = a == 2', 't3 = not t1', 't3 IFGOTO L1', 'print 2', 'GOTO L2', 'LABEL L1',
+            'LABEL L2'])
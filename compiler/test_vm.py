@@ -0,0 +1,101 @@
+import io
+import unittest
+
+from compiler.parser import Parser
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+from compiler.vm import VirtualMachine, VMError
+
+
+class TestVM(unittest.TestCase):
+
+    def _run(self, prog):
+        parser = Parser(prog)
+        root = parser.parseProgram(prog)
+        SemanticAnalyzer(root, parser.proglines).checkSemantics()
+        self.vm = VirtualMachine(TACProcessor(root).generateIR())
+        output = io.StringIO()
+        self.executed = self.vm.run(output)
+        return output.getvalue().splitlines()
+
+    def testArithmetic(self):
+        prog = '''int a = 5 + 3 * 2;
+        float b = a / 2;
+        int c = -a ^ 2;
+        print(a);
+        print(b);
+        print(c);
+        '''
+        self.assertEqual(self._run(prog), ['11', '5.5', '121'])
+
+    def testStrings(self):
+        output = self._run('string s = "n: " + 5;\nprint(s + 2.5);')
+        self.assertEqual(output, ['n: 52.5'])
+
+    def testBooleans(self):
+        prog = '''bool a = 1 < 2 and 3 != 3;
+        bool b = a or true;
+        print(a);
+        print(b);
+        '''
+        self.assertEqual(self._run(prog), ['False', 'True'])
+
+    def testForLoop(self):
+        prog = '''int s = 0;
+        for (int i = 0; i < 10; i = i + 1) {
+            s = s + i;
+        }
+        print(s);
+        '''
+        self.assertEqual(self._run(prog), ['45'])
+        self.assertEqual(self.vm.getValue('i'), 10)
+
+    def testWhileLoop(self):
+        prog = '''int a = 3;
+        while (a > 0) {
+            print(a);
+            a = a - 1;
+        }
+        '''
+        self.assertEqual(self._run(prog), ['3', '2', '1'])
+
+    def testIfChain(self):
+        prog = '''for (int i = 0; i < 4; i = i + 1) {
+            if (i == 0) {
+                print("zero");
+            }
+            elif (i == 1) {
+                print("one");
+            }
+            elif (i == 2) {
+                print("two");
+            }
+        }
+        '''
+        self.assertEqual(self._run(prog), ['zero', 'one', 'two'])
+
+    def testExecutedCount(self):
+        # The declaration copy, then the condition, not, ifgoto, print, sum,
+        # update copy and goto 3 times, plus the last check.
+        self._run('for (int i = 0; i < 3; i = i + 1) {\nprint(i);\n}')
+        self.assertEqual(self.executed, 1 + 3 * 7 + 3)
+
+    def testDivisionByZero(self):
+        prog = '''int a = 1;
+        int b = 1;
+        for (int i = 0; i < 2; i = i + 1) {
+            a = a / b;
+            b = b - 1;
+        }
+        '''
+        with self.assertRaises(VMError):
+            self._run(prog)
+
+    def testIntTooLongToPrint(self):
+        with self.assertRaises(VMError) as context:
+            self._run('int a = 10 ^ 5000;\nprint(a);')
+        self.assertIn('Instruction', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
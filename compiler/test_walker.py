@@ -0,0 +1,88 @@
+import unittest
+
+from compiler import walker
+from compiler.parser import ASTNode, ASTTypes, Parser
+from compiler.semantics import SemanticAnalyzer
+from compiler.tac import TACProcessor
+
+
+class TestWalker(unittest.TestCase):
+
+    def _createTree(self):
+        left = ASTNode(ASTTypes.INT, variableValue=1)
+        right = ASTNode(ASTTypes.INT, variableValue=2)
+        operation = ASTNode(ASTTypes.SUM, children=[left, right])
+        return ASTNode(ASTTypes.BLOCK, children=[operation])
+
+    def _compile(self, prog):
+        lines = prog.splitlines()
+        parser = Parser(lines)
+        root = parser.parseProgram(prog)
+        SemanticAnalyzer(root, lines).checkSemantics()
+        return root, TACProcessor(root).generateTAC()
+
+    def testWalkOrder(self):
+        visited = []
+        walker.walk(self._createTree(),
+                    lambda node: visited.append(('enter', node.type.name)),
+                    lambda node: visited.append(('leave', node.type.name)))
+        self.assertEqual(visited, [
+            ('enter', 'BLOCK'), ('enter', 'SUM'),
+            ('enter', 'INT'), ('leave', 'INT'),
+            ('enter', 'INT'), ('leave', 'INT'),
+            ('leave', 'SUM'), ('leave', 'BLOCK')])
+
+    def testWalkSkipChildren(self):
+        visited = []
+
+        def enter(node):
+            visited.append(node.type.name)
+            return node.type != ASTTypes.SUM
+
+        walker.walk(self._createTree(), enter)
+        self.assertEqual(visited, ['BLOCK', 'SUM'])
+
+    def testRunReturnsValues(self):
+        def count(node):
+            total = 1
+            for c in node.children:
+                total += yield count(c)
+            return total
+
+        self.assertEqual(walker.run(count(self._createTree())), 4)
+
+    def testRunPropagatesErrors(self):
+        def fail(depth):
+            if depth == 0:
+                raise ValueError('bottom')
+            try:
+                return (yield fail(depth - 1))
+            except ValueError:
+                return depth
+
+        self.assertEqual(walker.run(fail(3)), 1)
+
+    def testDeepExpression(self):
+        depth = 100000
+        root, lines = self._compile('int a = ' + '+'.join(['1'] * depth) + ';')
+        self.assertEqual(root.children[0].variableValue, depth)
+        self.assertEqual(len(lines), depth + 1)
+        self.assertEqual(lines[-1], f'a = t{depth - 2}')
+
+    def testDeepUminus(self):
+        depth = 100000
+        root, lines = self._compile('int a = ' + '-' * depth + '1;')
+        self.assertEqual(root.children[0].variableValue, 1)
+        self.assertEqual(len(lines), depth + 2)
+
+    def testDeepNestedBlocks(self):
+        depth = 100000
+        prog = 'if (true) {\n' * depth + 'print(1);\n' + '}\n' * depth
+        root, lines = self._compile(prog)
+        self.assertEqual(len(lines), 4 * depth + 1)
+        self.assertEqual(lines[depth * 3], 'print 1')
+        self.assertEqual(lines[-1], f'LABEL L{depth - 1}')
+
+
+if __name__ == '__main__':
+    unittest.main()
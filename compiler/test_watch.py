@@ -0,0 +1,88 @@
+import os
+import queue
+import tempfile
+import threading
+import unittest
+
+from compiler import batch, watch
+from compiler.ir import serialize
+from compiler.pipeline import compileSource
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        os.mkdir(os.path.join(self.root, 'nested'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, name, program, mtime=None):
+        path = os.path.join(self.root, name)
+        with open(path, 'w') as f:
+            f.write(program)
+        if mtime != None:
+            os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def testChangeDetector(self):
+        a = self._write('a.txt', 'print(1);')
+        c = self._write('nested/c.txt', 'print(3);')
+        self._write('notes.md', 'ignored')
+        detector = watch.ChangeDetector([self.root])
+        self.assertEqual(detector.poll(), [a, c])
+        self.assertEqual(detector.poll(), [])
+        # Same contents written again is not a change.
+        self._write('a.txt', 'print(1);')
+        self.assertEqual(detector.poll(), [])
+        b = self._write('b.txt', 'print(2);')
+        os.unlink(c)
+        self.assertEqual(detector.poll(), [b])
+        self.assertEqual(sorted(detector.states), [a, b])
+
+    def testSameSizeAndMtime(self):
+        mtime = 10**18
+        a = self._write('a.txt', 'print(1);', mtime)
+        detector = watch.ChangeDetector([a])
+        self.assertEqual(detector.poll(), [a])
+        # Written when it was checked, only the contents tell.
+        detector.states[a].checked = mtime
+        self._write('a.txt', 'print(2);', mtime)
+        self.assertEqual(detector.poll(), [a])
+        # Checked long after it was written, mtime and size are trusted.
+        detector.states[a].checked = mtime + 2 * watch.MTIME_RESOLUTION_NS
+        self._write('a.txt', 'print(3);', mtime)
+        self.assertEqual(detector.poll(), [])
+
+    def testWatcher(self):
+        a = self._write('a.txt', 'int a = 1;\nprint(a);')
+        b = self._write('b.txt', 'print(2);')
+        watcher = watch.Watcher([self.root], interval=0.01, debounce=0.05)
+        reports = queue.Queue()
+        thread = threading.Thread(target=watcher.run,
+                                  args=(lambda results, seconds: reports.put(results),))
+        thread.start()
+        try:
+            results = reports.get(timeout=10)
+            self.assertEqual([(result.path, result.ok) for result in results], [(a, True), (b, True)])
+            os.unlink(batch.outputPath(b))
+            self._write('a.txt', 'int a = 1;\nprint(a * 2);')
+            results = reports.get(timeout=10)
+            self.assertEqual([result.path for result in results], [a])
+            self.assertFalse(os.path.exists(batch.outputPath(b)))
+            with open(batch.outputPath(a)) as f:
+                self.assertEqual(f.read().splitlines(),
+                                 serialize(compileSource('int a = 1;\nprint(a * 2);')))
+            self._write('a.txt', 'int a = 1;\nprint(b);')
+            result, = reports.get(timeout=10)
+            self.assertFalse(result.ok)
+            self.assertIn('"b" does not exist', result.message)
+        finally:
+            watcher.stop.set()
+            thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
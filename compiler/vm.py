@@ -0,0 +1,148 @@
+import operator
+import sys
+from typing import List, TextIO
+from compiler import ir, operators
+from compiler.ir import Constant, Instruction, Opcode
+from compiler.parser import VariableTypes
+
+
+class VMError(Exception):
+    pass
+
+
+# Kinds of the loaded instructions, in the order the dispatch loop tests them.
+BINARY = 0
+COPY = 1
+JUMP_IF = 2
+JUMP = 3
+UNARY = 4
+PRINT = 5
+JUMP_IF_NOT = 6
+
+UNARY_FUNCTIONS = {
+    Opcode.NEG: operator.neg,
+    Opcode.NOT: operator.not_,
+    Opcode.TO_FLOAT: float,
+}
+
+
+class VirtualMachine:
+    """Executes the TAC instructions of a TACProcessor.
+
+    Loading resolves every label to an instruction index and every
+    variable, temporal and constant to a register index, so running does
+    no name lookups. DECLARE and LABEL do nothing at run time and are
+    dropped while loading.
+    """
+
+    def __init__(self, instructions: List[Instruction]) -> None:
+        self.registerIndexes = {}
+        self.initialRegisters = []
+        self.code = []
+        self._load(instructions)
+
+    def _getRegister(self, operand) -> int:
+        index = self.registerIndexes.get(operand)
+        if index == None:
+            index = len(self.initialRegisters)
+            self.registerIndexes[operand] = index
+            # Constants live in registers loaded before running.
+            self.initialRegisters.append(
+                operand.value if isinstance(operand, Constant) else None)
+        return index
+
+    def _load(self, instructions: List[Instruction]) -> None:
+        # Labels are numbered by the position they will have once DECLARE
+        # and LABEL are dropped.
+        labelTargets = {}
+        position = 0
+        for instruction in instructions:
+            if instruction.opcode == Opcode.LABEL:
+                labelTargets[instruction.dst] = position
+            elif instruction.opcode != Opcode.DECLARE:
+                position += 1
+        # Type of every variable and temporal at this point of the
+        # program, the binary operators need it to pick their rule.
+        types = {}
+        for instruction in instructions:
+            opcode = instruction.opcode
+            if opcode == Opcode.DECLARE:
+                types[instruction.dst] = instruction.type
+                continue
+            if opcode == Opcode.LABEL:
+                continue
+            if opcode in ir.BINARY_OPS:
+                leftType = self._getType(instruction.left, types)
+                rightType = self._getType(instruction.right, types)
+                rule = operators.lookup(
+                    ir.BINARY_OPERATIONS[opcode], leftType, rightType)
+                if rule == None:
+                    raise VMError(
+                        f'No operation for {ir.formatInstruction(instruction)}')
+                self.code.append((BINARY, self._getRegister(instruction.dst),
+                                  self._getRegister(instruction.left),
+                                  self._getRegister(instruction.right), rule.evaluate))
+            elif opcode == Opcode.COPY:
+                self.code.append((COPY, self._getRegister(instruction.dst),
+                                  self._getRegister(instruction.left), None, None))
+            elif opcode in UNARY_FUNCTIONS:
+                self.code.append((UNARY, self._getRegister(instruction.dst),
+                                  self._getRegister(instruction.left), None, UNARY_FUNCTIONS[opcode]))
+            elif opcode == Opcode.IFGOTO:
+                self.code.append((JUMP_IF, labelTargets[instruction.dst],
+                                  self._getRegister(instruction.left), None, None))
+            elif opcode == Opcode.IFNOT:
+                self.code.append((JUMP_IF_NOT, labelTargets[instruction.dst],
+                                  self._getRegister(instruction.left), None, None))
+            elif opcode == Opcode.GOTO:
+                self.code.append(
+                    (JUMP, labelTargets[instruction.dst], None, None, None))
+            elif opcode == Opcode.PRINT:
+                self.code.append(
+                    (PRINT, None, self._getRegister(instruction.left), None, None))
+            if opcode in ir.VALUE_OPS:
+                types[instruction.dst] = instruction.type
+
+    def _getType(self, operand, types: dict) -> VariableTypes:
+        if isinstance(operand, Constant):
+            return operand.type
+        return types.get(operand)
+
+    def run(self, output: TextIO = None) -> int:
+        """Runs the program from the start, print writes a line to output
+        (stdout by default). Returns the number of executed instructions."""
+        write = (output if output != None else sys.stdout).write
+        code = self.code
+        end = len(code)
+        self.registers = registers = list(self.initialRegisters)
+        pc = 0
+        executed = 0
+        try:
+            while pc < end:
+                kind, dst, left, right, function = code[pc]
+                pc += 1
+                executed += 1
+                if kind == BINARY:
+                    registers[dst] = function(registers[left], registers[right])
+                elif kind == COPY:
+                    registers[dst] = registers[left]
+                elif kind == JUMP_IF:
+                    if registers[left]:
+                        pc = dst
+                elif kind == JUMP:
+                    pc = dst
+                elif kind == JUMP_IF_NOT:
+                    if not registers[left]:
+                        pc = dst
+                elif kind == UNARY:
+                    registers[dst] = function(registers[left])
+                else:
+                    write(f'{registers[left]}\n')
+        # ValueError: ints too long to print.
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise VMError(f'Instruction {pc - 1} failed: {e}') from e
+        return executed
+
+    def getValue(self, name: str):
+        """Value of a variable after run."""
+        return self.registers[self.registerIndexes[name]]
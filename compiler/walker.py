@@ -0,0 +1,60 @@
+from typing import Callable, Generator
+
+
+def walk(root, enter: Callable = None, leave: Callable = None):
+    """Visits a tree depth first with an explicit stack instead of recursion.
+
+    enter(node) runs before the children of node and leave(node) after all
+    of them. Children are read from node.children when node is entered, if
+    enter returns False they are skipped (leave still runs).
+    """
+    # Each entry is (node, entered), leave runs when the node comes back
+    # to the top of the stack with entered set.
+    stack = [(root, False)]
+    while stack:
+        node, entered = stack.pop()
+        if entered:
+            leave(node)
+            continue
+        descend = enter(node) if enter != None else None
+        if leave != None:
+            stack.append((node, True))
+        if descend == False:
+            continue
+        children = node.children
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((children[i], False))
+
+
+def run(task: Generator):
+    """Runs a generator based pass without growing the Python call stack.
+
+    Wherever a pass would call itself it yields the sub task generator
+    instead, and gets back the value the sub task returns. Exceptions raised
+    by a sub task are thrown into the task that yielded it, just like a
+    recursive call would.
+    """
+    stack = [task]
+    value = None
+    error = None
+    while stack:
+        current = stack[-1]
+        try:
+            if error != None:
+                pending, error = error, None
+                child = current.throw(pending)
+            else:
+                child = current.send(value)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            continue
+        except BaseException as e:
+            stack.pop()
+            if not stack:
+                raise
+            error = e
+            continue
+        stack.append(child)
+        value = None
+    return value
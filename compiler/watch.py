@@ -0,0 +1,154 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, List
+from compiler import batch, emit, pipeline
+from compiler.incremental import IncrementalCompiler
+
+# Files a watched directory holds are the ones with this suffix.
+SOURCE_SUFFIX = '.txt'
+# Coarsest modification time resolution expected from a file system (FAT
+# has 2 s). A file written this close to the time it was checked can change
+# again without changing its mtime, its contents are hashed until then.
+MTIME_RESOLUTION_NS = 2 * 10**9
+
+
+class FileState:
+    __slots__ = ('mtime', 'size', 'digest', 'checked')
+
+    def __init__(self, mtime: int, size: int, digest: bytes, checked: int) -> None:
+        self.mtime = mtime
+        self.size = size
+        self.digest = digest
+        # Time the digest was taken, in nanoseconds.
+        self.checked = checked
+
+    def isRacy(self) -> bool:
+        return self.checked < self.mtime + MTIME_RESOLUTION_NS
+
+
+def _digest(path: str) -> bytes:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+class ChangeDetector:
+    """Polls files and directories (every source file under them,
+    recursively) for changes.
+
+    A file whose mtime and size did not change is taken as unchanged
+    without reading it, unless it was written too close to the last check
+    for its mtime to tell (see MTIME_RESOLUTION_NS). Otherwise its contents
+    are hashed, so touching a file or saving it unchanged is not a change.
+    """
+
+    def __init__(self, paths: List[str]) -> None:
+        self.paths = paths
+        self.states = {}
+
+    def files(self) -> List[str]:
+        files = []
+        for path in self.paths:
+            if not os.path.isdir(path):
+                files.append(path)
+                continue
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                files.extend(os.path.join(directory, name) for name in sorted(names)
+                             if name.endswith(SOURCE_SUFFIX))
+        return files
+
+    def poll(self) -> List[str]:
+        """Files created or changed since the previous poll, the first one
+        returns every file."""
+        changed = []
+        present = set()
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+                present.add(path)
+                state = self.states.get(path)
+                if (state != None and state.mtime == stat.st_mtime_ns
+                        and state.size == stat.st_size and not state.isRacy()):
+                    continue
+                checked = time.time_ns()
+                digest = _digest(path)
+            except OSError:
+                # Removed, or replaced while it was read.
+                continue
+            self.states[path] = FileState(stat.st_mtime_ns, stat.st_size, digest, checked)
+            if state == None or state.digest != digest:
+                changed.append(path)
+        for path in self.states.keys() - present:
+            del self.states[path]
+        return changed
+
+
+class Watcher:
+    """Recompiles the source files under paths into their .output files
+    whenever they change, until stop is set.
+
+    The parse tables are built once and every file keeps an
+    IncrementalCompiler, so a rebuild only pays for what the edit touched.
+    Changes are collected until none came for debounce seconds, an editor
+    saving several files or writing one in steps triggers one rebuild.
+    Only the files that changed are compiled and their outputs rewritten.
+    """
+
+    def __init__(self, paths: List[str], optimized: bool = False,
+                 interval: float = 0.2, debounce: float = 0.1) -> None:
+        pipeline.warmUp()
+        self.detector = ChangeDetector(paths)
+        self.optimized = optimized
+        self.interval = interval
+        self.debounce = debounce
+        # Path -> IncrementalCompiler of every file built.
+        self.compilers = {}
+        self.stop = threading.Event()
+
+    def rebuild(self, paths: List[str]) -> List[batch.FileResult]:
+        results = []
+        for path in paths:
+            start = time.perf_counter()
+            compiler = self.compilers.get(path)
+            if compiler == None:
+                compiler = self.compilers[path] = IncrementalCompiler(self.optimized)
+            try:
+                with open(path, 'r') as f:
+                    program = f.read()
+                instructions = compiler.compile(program)
+                emit.writeLines(batch.outputPath(path), emit.instructionLines(instructions))
+            except pipeline.CompileError as e:
+                results.append(batch.FileResult(path, False, str(e), time.perf_counter() - start))
+                continue
+            except Exception as e:
+                results.append(batch.FileResult(path, False, f'{type(e).__name__}: {e}',
+                                                time.perf_counter() - start))
+                continue
+            results.append(batch.FileResult(path, True, seconds=time.perf_counter() - start,
+                                            instructions=len(instructions)))
+        return results
+
+    def run(self, report: Callable[[List[batch.FileResult], float], None]) -> None:
+        """Builds every file, then rebuilds the ones that change. report
+        gets the results and the seconds of every rebuild."""
+        pending = set()
+        lastChange = 0.0
+        while not self.stop.is_set():
+            changed = self.detector.poll()
+            now = time.monotonic()
+            if changed:
+                pending.update(changed)
+                lastChange = now
+            if pending and now - lastChange >= self.debounce:
+                start = time.perf_counter()
+                results = self.rebuild(sorted(pending))
+                report(results, time.perf_counter() - start)
+                pending.clear()
+                for path in self.compilers.keys() - self.detector.states.keys():
+                    del self.compilers[path]
+            self.stop.wait(min(self.interval, self.debounce) if pending else self.interval)